@@ -0,0 +1,116 @@
+"""
+Write throughput of V1Model and Transactions as the data grows.
+
+Times V1Model.add_key_value and update_key_value against data files of increasing size, with
+the default JSON file and with the write-ahead log storage, loading a model and reading a key
+with the JSON file and with the memory-mapped storage, and Transactions.commit_transaction with
+increasingly long operation queues.
+
+Usage:
+    python -m benchmarks.bench_model [--sizes 100,1000,10000] [--queues 100,1000,10000]
+"""
+import argparse
+from functools import partial
+import json
+import time
+from typing import Dict, Optional, Sequence
+
+from benchmarks.harness import Metrics, print_results, scratch_directory, summarize, time_calls
+from models.storage.v1_MmapStorage import V1MmapStorage
+from models.storage.v1_Storage import StorageFactory
+from models.storage.v1_WalStorage import V1WalStorage
+from models.transaction.v1_Transaction import Transactions
+from models.v1_Model import V1Model
+
+DATA_SIZES = (100, 1000, 10000)
+QUEUE_SIZES = (100, 1000, 10000)
+
+
+def record(number: int) -> dict:
+    """A value the size of a typical stored record."""
+    return {"id": number, "title": f"Record {number}", "status": "pending", "tags": ["benchmark", "model"]}
+
+
+def seeded_model(file_path: str, size: int, storage: Optional[StorageFactory] = None) -> V1Model:
+    """Returns a model whose data file already holds size keys."""
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump({f"key_{number}": record(number) for number in range(size)}, f)
+    return V1Model(file_path=file_path, storage=storage)
+
+
+def bench_model_writes(size: int, iterations: int, name: str = "model",
+                       storage: Optional[StorageFactory] = None) -> Dict[str, Metrics]:
+    model = seeded_model(f"bench_{name}_{size}.json", size, storage)
+    counter = iter(range(size, size + iterations + 10))
+    add = time_calls(lambda: model.add_key_value(f"key_{next(counter)}", record(0)), iterations, warmup=1)
+    update = time_calls(lambda: model.update_key_value(key_0=record(1)), iterations, warmup=1)
+    return {f"{name}.add_key_value.{size}": add, f"{name}.update_key_value.{size}": update}
+
+
+def bench_model_reads(size: int, iterations: int, name: str = "model",
+                      storage: Optional[StorageFactory] = None) -> Dict[str, Metrics]:
+    """Times building a model, as a process does at startup, and reading one key from it."""
+    file_path = f"bench_{name}_reads_{size}.json"
+    seeded_model(file_path, size)
+    V1Model(file_path=file_path, storage=storage)  # Lets the memory-mapped storage save its index
+    load = time_calls(lambda: V1Model(file_path=file_path, storage=storage), iterations)
+    model = V1Model(file_path=file_path, storage=storage)
+    get = time_calls(lambda: model.get_key_value(f"key_{size // 2}"), iterations * 10, warmup=1)
+    return {f"{name}.load.{size}": load, f"{name}.get_key_value.{size}": get}
+
+
+def bench_commit(queue_size: int, repeat: int) -> Metrics:
+    """Times commit_transaction alone; queueing the operations is not measured."""
+    samples = []
+    for run_number in range(repeat):
+        transaction = Transactions(V1Model(file_path="bench_transaction_base.json"))
+        transaction.begin_transaction()
+        try:
+            for number in range(queue_size):
+                transaction.add(f"tx{run_number}_{number}", record(number))
+            started = time.perf_counter()
+            transaction.commit_transaction()
+            samples.append(time.perf_counter() - started)
+        finally:
+            transaction.end_transaction()
+    metrics = summarize(samples)
+    metrics["operations_per_s"] = queue_size * metrics["ops_per_s"]
+    return metrics
+
+
+def run(quick: bool = False, sizes: Optional[Sequence[int]] = None,
+        queues: Optional[Sequence[int]] = None) -> Dict[str, Metrics]:
+    """Benchmarks model writes and transaction commits. Must run in a scratch working directory."""
+    sizes = sizes or (DATA_SIZES[:2] if quick else DATA_SIZES)
+    queues = queues or (QUEUE_SIZES[:2] if quick else QUEUE_SIZES)
+    results: Dict[str, Metrics] = {}
+    for size in sizes:
+        # Each write rewrites the whole file, so fewer iterations are needed as it grows
+        results.update(bench_model_writes(size, max(5, min(200, 200000 // size)) // (4 if quick else 1)))
+        # Appends cost the same whatever the size; "never" measures the log, not the disk
+        results.update(bench_model_writes(size, 200 // (4 if quick else 1), "model_wal",
+                                          partial(V1WalStorage, fsync="never")))
+        reads = max(5, min(100, 100000 // size)) // (4 if quick else 1)
+        results.update(bench_model_reads(size, reads))
+        results.update(bench_model_reads(size, reads, "model_mmap", V1MmapStorage))
+    for queue_size in queues:
+        results[f"transactions.commit.{queue_size}"] = bench_commit(queue_size, 3 if quick else 5)
+    return results
+
+
+def parse_sizes(value: str) -> Sequence[int]:
+    return tuple(int(size) for size in value.split(",") if size.strip())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure V1Model and transaction write throughput.")
+    parser.add_argument("--sizes", type=parse_sizes, default=DATA_SIZES, help="Keys in the data file, comma-separated.")
+    parser.add_argument("--queues", type=parse_sizes, default=QUEUE_SIZES,
+                        help="Operations per committed transaction, comma-separated.")
+    args = parser.parse_args()
+    with scratch_directory():
+        print_results(run(sizes=args.sizes, queues=args.queues))
+
+
+if __name__ == "__main__":
+    main()
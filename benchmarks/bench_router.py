@@ -0,0 +1,87 @@
+"""
+Dispatch cost of V1Router.route.
+
+Registers a route table the size of a large app, then times route() for a static route, a
+route with path parameters, a 405 and a 404, and the compiled table's match() on its own,
+so the router's overhead can be told apart from the controller's.
+
+Usage:
+    python -m benchmarks.bench_router [--routes 1000] [--iterations 20000]
+"""
+import argparse
+from typing import Dict, Optional
+
+from benchmarks.harness import Metrics, print_results, scratch_directory, time_calls
+from controllers.v1_Controller import V1AbstractController
+from routers.v1_Router import MethodNotAllowedError, V1Router
+from views.v1_View import V1BaseView
+
+
+class BenchController(V1AbstractController):
+    def __init__(self):
+        pass
+
+    def show(self, **kwargs):
+        return kwargs
+
+
+class BenchView(V1BaseView):
+    content_type = V1BaseView.CONTENT_TYPES["PLAIN"]
+
+    def __init__(self):
+        pass
+
+    def render(self, **kwargs):
+        return "ok"
+
+
+def expect(exception: type, function, *args, **kwargs) -> None:
+    try:
+        function(*args, **kwargs)
+    except exception:
+        return
+    raise AssertionError(f"{function.__name__} did not raise {exception.__name__}")
+
+
+def run(quick: bool = False, routes: int = 1000, iterations: Optional[int] = None) -> Dict[str, Metrics]:
+    """Benchmarks dispatch over routes routes, half static and half with parameters."""
+    iterations = iterations or (2000 if quick else 20000)
+    saved = V1Router._shared_routes, V1Router._route_table
+    V1Router._shared_routes, V1Router._route_table = {}, None
+    try:
+        # Pickled state, as the stand-in classes live in __main__ when this module is run directly
+        router = V1Router(file_path="bench_router_state.pkl")
+        with router.batch():
+            for number in range(routes // 2):
+                router.add_route(f"/items{number}", BenchController, "show", BenchView, "GET", lifecycle="thread")
+                router.add_route(f"/items{number}/{{id:int}}/notes/{{slug}}", BenchController, "show", BenchView,
+                                 "GET", lifecycle="thread")
+        table = router.get_route_table()
+        last = routes // 2 - 1
+
+        return {
+            "router.route_static": time_calls(lambda: router.route(f"/items{last}"), iterations, warmup=100),
+            "router.route_params": time_calls(lambda: router.route(f"/items{last}/42/notes/hello"), iterations,
+                                              warmup=100),
+            "router.route_405": time_calls(lambda: expect(MethodNotAllowedError, router.route, f"/items{last}",
+                                                          method="POST"), iterations, warmup=100),
+            "router.route_404": time_calls(lambda: expect(ValueError, router.route, "/missing/42"), iterations,
+                                           warmup=100),
+            "router.table_match_params": time_calls(lambda: table.match(f"/items{last}/42/notes/hello"), iterations,
+                                                    warmup=100),
+        }
+    finally:
+        V1Router._shared_routes, V1Router._route_table = saved
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the dispatch cost of V1Router.route.")
+    parser.add_argument("--routes", type=int, default=1000, help="Number of routes registered.")
+    parser.add_argument("--iterations", type=int, default=20000, help="Calls timed per case.")
+    args = parser.parse_args()
+    with scratch_directory():
+        print_results(run(routes=args.routes, iterations=args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Cold-start benchmark of the router.
+
+Generates a package of controllers and views, registers a route per controller action and
+measures, for the legacy pickled state and for the JSON route manifest:
+
+- registration: add_route for every route, saving after each one (pickle) or once (manifest batch);
+- cold load: a fresh interpreter importing the router and loading the saved routes;
+- first request: the first route() call in that interpreter, which imports its controller and view.
+
+Usage:
+    python -m benchmarks.bench_router_startup [--routes 500] [--modules 50] [--repeat 5]
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "bench_routes_app"
+
+MODULE_TEMPLATE = '''\
+import csv
+import decimal
+import json
+from controllers.v1_Controller import V1AbstractController
+from views.v1_View import V1BaseView
+
+# Stands in for the code and data a real controller module carries
+LOOKUP = {{f"key{{i}}": i * 3 for i in range(2000)}}
+
+
+class Controller{index}(V1AbstractController):
+    def __init__(self):
+        pass
+
+{actions}
+
+class View{index}(V1BaseView):
+    content_type = V1BaseView.CONTENT_TYPES["JSON"]
+
+    def __init__(self):
+        pass
+
+    def render(self, **kwargs):
+        return self.render_json(kwargs.get("controller_response") or {{}})
+'''
+
+ACTION_TEMPLATE = '''\
+    def action{number}(self, **kwargs):
+        return {{"action": {number}, "id": kwargs.get("id")}}
+'''
+
+COLD_START_SCRIPT = '''\
+import json, sys, time
+started = time.perf_counter()
+from routers.v1_Router import V1Router
+router = V1Router(file_path=sys.argv[1])
+router.get_route_table()
+loaded = time.perf_counter()
+router.route(sys.argv[2])
+answered = time.perf_counter()
+imported = sum(1 for name in sys.modules if name.startswith("{package}."))
+print(json.dumps({{"load": loaded - started, "first_request": answered - loaded, "imported": imported}}))
+'''.format(package=PACKAGE)
+
+
+def write_package(directory: str, routes: int, modules: int) -> None:
+    """Writes the generated controllers and views, spreading the routes' actions over the modules."""
+    package_dir = os.path.join(directory, PACKAGE)
+    os.makedirs(package_dir)
+    open(os.path.join(package_dir, "__init__.py"), "w").close()
+    for index in range(modules):
+        actions = "\n".join(ACTION_TEMPLATE.format(number=number) for number in range(index, routes, modules))
+        with open(os.path.join(package_dir, f"module{index}.py"), "w") as f:
+            f.write(MODULE_TEMPLATE.format(index=index, actions=actions))
+
+
+def register_routes(file_path: str, routes: int, modules: int, batch: bool) -> float:
+    """Registers the routes into file_path in this process and returns the time it took, in seconds."""
+    from routers.v1_Router import V1Router
+
+    module_objects = [importlib.import_module(f"{PACKAGE}.module{index}") for index in range(modules)]
+    V1Router._shared_routes, V1Router._route_table = {}, None
+    router = V1Router(file_path=file_path)
+
+    started = time.perf_counter()
+    if batch:
+        with router.batch():
+            add_routes(router, module_objects, routes)
+    else:
+        add_routes(router, module_objects, routes)
+    return time.perf_counter() - started
+
+
+def add_routes(router, module_objects: list, routes: int) -> None:
+    """Adds route number n, served by action n of the controller in module n % len(module_objects)."""
+    for number in range(routes):
+        index = number % len(module_objects)
+        module = module_objects[index]
+        router.add_route(f"/items{number}/{{id:int}}", getattr(module, f"Controller{index}"), f"action{number}",
+                         getattr(module, f"View{index}"), "GET")
+
+
+def cold_start(file_path: str, directory: str, repeat: int) -> dict:
+    """Runs the cold start script repeat times in fresh interpreters and returns the median timings."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([REPO_ROOT, directory]))
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", COLD_START_SCRIPT, file_path, "/items0/1"], env=env,
+                                cwd=directory, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure router registration and cold start times.")
+    parser.add_argument("--routes", type=int, default=500, help="Number of routes to register.")
+    parser.add_argument("--modules", type=int, default=50, help="Number of controller/view modules.")
+    parser.add_argument("--repeat", type=int, default=5, help="Cold starts per format; the median is reported.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_package(directory, args.routes, args.modules)
+        sys.path.insert(0, directory)
+        stdout = sys.stdout
+        print(f"{args.routes} routes over {args.modules} modules, median of {args.repeat} cold starts\n")
+        print(f"{'format':<10}{'register':>12}{'cold load':>12}{'1st request':>13}{'modules imported':>18}")
+        for name, file_name, batch in (("pickle", "router_state.pkl", False), ("manifest", "router_manifest.json", True)):
+            file_path = os.path.join(directory, file_name)
+            sys.stdout = open(os.devnull, "w")  # Silence the router's per-route debug prints
+            try:
+                registration = register_routes(file_path, args.routes, args.modules, batch)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+            timings = cold_start(file_path, directory, args.repeat)
+            print(f"{name:<10}{registration * 1000:>10.1f}ms{timings['load'] * 1000:>10.1f}ms"
+                  f"{timings['first_request'] * 1000:>11.1f}ms{int(timings['imported']):>18}")
+
+
+if __name__ == "__main__":
+    main()
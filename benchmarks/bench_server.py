@@ -0,0 +1,216 @@
+"""
+Load test of the HTTP server on the tasks API.
+
+Spawns a server process in the working directory, serving the routes of projects/tasks, and
+drives it over raw sockets from client threads, each on its own keep-alive connection, to
+measure requests per second and latency percentiles of GET /tasks and POST /tasks/create.
+
+Usage:
+    python -m benchmarks.bench_server [--clients 8] [--requests 500] [--engine sync] [--workers 8]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.harness import REPO_ROOT, Metrics, print_results, scratch_directory, summarize
+
+# Tasks in the data file before the run, so GET /tasks returns a realistic body
+SEED_TASKS = 100
+
+SERVER_SCRIPT = '''\
+import sys
+from loggings.v1_Logging import configure_logging
+from projects.tasks.controller import TaskController
+from projects.tasks.view import TaskJsonView
+from routers.v1_Router import V1Router
+from servers.v1_HttpServer import run_async_server, run_server
+
+configure_logging("WARNING", console=False)
+router = V1Router(file_path="router_manifest.json")
+with router.batch():
+    router.add_route("/tasks", TaskController, "list_tasks", TaskJsonView, "GET")
+    router.add_route("/tasks/create", TaskController, "create_task", TaskJsonView, "POST")
+router.get_route_table()
+
+port, engine, workers = int(sys.argv[1]), sys.argv[2], int(sys.argv[3])
+if engine == "async":
+    run_async_server(router, "127.0.0.1", port, workers=workers or None, backlog=512)
+else:
+    run_server(router, "127.0.0.1", port, workers=workers, backlog=512, max_connections=4096)
+'''
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed_tasks(count: int) -> None:
+    """Writes the tasks data file the server's model reads, in the working directory."""
+    tasks = [{"id": i, "title": f"Task {i}", "description": "Seeded for the benchmark", "status": "pending",
+              "priority": "low"} for i in range(1, count + 1)]
+    with open("tasks_model.json", "w", encoding="utf-8") as f:
+        json.dump({"tasks": tasks}, f)
+
+
+def start_server(port: int, engine: str, workers: int) -> subprocess.Popen:
+    """
+    Starts the server in a child process and waits until it accepts connections.
+
+    Raises:
+        RuntimeError: If the server exits or does not listen within 10 seconds.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])))
+    process = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, str(port), engine, str(workers)], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited: {process.stderr.read().decode(errors='replace')}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Server did not start listening within 10 seconds.")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def read_response(client: socket.socket, buffer: bytearray) -> bytes:
+    """
+    Reads one response with a Content-Length body off a keep-alive connection.
+
+    Raises:
+        ConnectionError: If the server closes the connection first.
+    """
+    while b"\r\n\r\n" not in buffer:
+        chunk = client.recv(65536)
+        if not chunk:
+            raise ConnectionError("Connection closed before the response head")
+        buffer += chunk
+    head_end = buffer.index(b"\r\n\r\n") + 4
+    length = 0
+    for line in bytes(buffer[:head_end]).split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    while len(buffer) < head_end + length:
+        chunk = client.recv(65536)
+        if not chunk:
+            raise ConnectionError("Connection closed before the end of the body")
+        buffer += chunk
+    response = bytes(buffer[:head_end + length])
+    del buffer[:head_end + length]
+    return response
+
+
+def build_request(method: str, path: str, body: Optional[dict] = None) -> bytes:
+    if body is None:
+        return f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("ascii")
+    payload = json.dumps(body).encode("utf-8")
+    return (f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n").encode("ascii") + payload
+
+
+def run_client(port: int, request: bytes, count: int, samples: List[float], errors: List[str],
+               start: threading.Barrier) -> None:
+    """Sends count requests one after the other, reconnecting when the server closes the connection."""
+    clock = time.perf_counter
+    client: Optional[socket.socket] = None
+    buffer = bytearray()
+    start.wait()
+    try:
+        for _ in range(count):
+            if client is None:
+                client = socket.create_connection(("127.0.0.1", port), timeout=30)
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                buffer.clear()
+            started = clock()
+            try:
+                client.sendall(request)
+                response = read_response(client, buffer)
+            except (ConnectionError, socket.timeout) as e:
+                errors.append(str(e))
+                client.close()
+                client = None
+                continue
+            samples.append(clock() - started)
+            if not response.startswith(b"HTTP/1.1 200"):
+                errors.append(response.split(b"\r\n", 1)[0].decode("latin-1"))
+            if b"Connection: close" in response.partition(b"\r\n\r\n")[0]:
+                client.close()
+                client = None
+    finally:
+        if client is not None:
+            client.close()
+
+
+def load(port: int, request: bytes, clients: int, requests_per_client: int) -> Metrics:
+    """Runs clients concurrent connections and summarizes their latencies and the overall throughput."""
+    per_client: List[List[float]] = [[] for _ in range(clients)]
+    errors: List[str] = []
+    start = threading.Barrier(clients + 1)
+    threads = [threading.Thread(target=run_client, args=(port, request, requests_per_client, samples, errors, start))
+               for samples in per_client]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    metrics = summarize([sample for samples in per_client for sample in samples], elapsed)
+    metrics["errors"] = len(errors)
+    return metrics
+
+
+def run(quick: bool = False, clients: int = 8, requests: Optional[int] = None, engine: str = "sync",
+        workers: int = 8) -> Dict[str, Metrics]:
+    """Benchmarks GET /tasks and POST /tasks/create. Must run in a scratch working directory."""
+    requests = requests or (100 if quick else 500)
+    seed_tasks(SEED_TASKS)
+    port = get_free_port()
+    process = start_server(port, engine, workers)
+    try:
+        # Warm up every worker thread's route handlers and the model before measuring
+        load(port, build_request("GET", "/tasks"), clients, 10)
+        results = {
+            f"server.{engine}.tasks_get": load(port, build_request("GET", "/tasks"), clients, requests),
+            f"server.{engine}.tasks_post": load(port, build_request("POST", "/tasks/create", {
+                "title": "Benchmark task", "description": "Created by the load test"}), clients, requests),
+        }
+    finally:
+        stop_server(process)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the server on the tasks API.")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent keep-alive connections.")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per client and endpoint.")
+    parser.add_argument("--engine", choices=("sync", "async"), default="sync", help="Server engine.")
+    parser.add_argument("--workers", type=int, default=8, help="Worker threads of the server.")
+    args = parser.parse_args()
+    with scratch_directory():
+        print_results(run(clients=args.clients, requests=args.requests, engine=args.engine, workers=args.workers))
+
+
+if __name__ == "__main__":
+    main()
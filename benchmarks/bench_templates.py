@@ -0,0 +1,41 @@
+"""
+Throughput of render_template on every template in templates/.
+
+Usage:
+    python -m benchmarks.bench_templates [--iterations 2000]
+"""
+import argparse
+import glob
+import os
+from typing import Dict, Optional
+
+from benchmarks.harness import Metrics, print_results, scratch_directory, time_calls
+from views.v1_Render import render_template
+
+# Placeholders filled in every template, whether it uses them or not, as a view passes its whole context
+TEMPLATE_DATA = {"message": "Task created", "title": "Tasks", "user": "benchmark", "count": 100,
+                 "description": "Rendered by the template benchmark"}
+
+
+def run(quick: bool = False, iterations: Optional[int] = None) -> Dict[str, Metrics]:
+    """Benchmarks rendering each template of templates/ in the working directory."""
+    iterations = iterations or (200 if quick else 2000)
+    results = {}
+    for path in sorted(glob.glob(os.path.join("templates", "*.html"))):
+        name = os.path.basename(path)
+        metrics = time_calls(lambda: render_template(name, TEMPLATE_DATA), iterations, warmup=10)
+        metrics["bytes_per_s"] = os.path.getsize(path) * metrics["ops_per_s"]
+        results[f"templates.{os.path.splitext(name)[0]}"] = metrics
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure render_template throughput.")
+    parser.add_argument("--iterations", type=int, default=2000, help="Renders timed per template.")
+    args = parser.parse_args()
+    with scratch_directory():
+        print_results(run(iterations=args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Timing, result files and regression comparison shared by the benchmarks.
+
+Every benchmark reports a dict of metrics per case, e.g. {"p50_ms": 0.4, "ops_per_s": 2500}.
+Metrics ending in "_per_s" are better when higher, every other metric when lower.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+RESULTS_VERSION = 1
+
+Metrics = Dict[str, float]
+
+
+def percentile(sorted_samples: Sequence[float], q: float) -> float:
+    """Returns the q-quantile (0 to 1) of sorted samples, interpolating between the closest ranks."""
+    if not sorted_samples:
+        return 0.0
+    position = (len(sorted_samples) - 1) * q
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_samples) - 1)
+    return sorted_samples[lower] + (sorted_samples[upper] - sorted_samples[lower]) * (position - lower)
+
+
+def summarize(samples: Sequence[float], elapsed: Optional[float] = None) -> Metrics:
+    """
+    Summarizes call durations, in seconds, as latency percentiles in milliseconds and a throughput.
+
+    Args:
+        samples (Sequence[float]): The duration of every call.
+        elapsed (Optional[float]): Wall time of the whole run, for throughput when calls overlapped.
+            Defaults to the sum of the samples.
+    """
+    ordered = sorted(samples)
+    total = elapsed if elapsed is not None else sum(ordered)
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 0.5) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "ops_per_s": len(ordered) / total if total > 0 else 0.0,
+    }
+
+
+def time_calls(function: Callable[[], Any], iterations: int, warmup: int = 0) -> Metrics:
+    """Calls function iterations times, after warmup untimed calls, and summarizes the durations."""
+    for _ in range(warmup):
+        function()
+    samples: List[float] = []
+    clock = time.perf_counter
+    for _ in range(iterations):
+        started = clock()
+        function()
+        samples.append(clock() - started)
+    return summarize(samples)
+
+
+@contextmanager
+def scratch_directory() -> Iterator[str]:
+    """
+    Runs the enclosed benchmarks in a temporary working directory holding a copy of templates/.
+
+    Models, routers and templates resolve their files against the working directory, so this
+    keeps the repository's data and log files untouched.
+    """
+    from loggings.v1_Logging import _settings, configure_logging
+
+    previous_directory, previous_log_dir = os.getcwd(), _settings["log_dir"]
+    with tempfile.TemporaryDirectory(prefix="v1-bench-") as directory:
+        shutil.copytree(os.path.join(REPO_ROOT, "templates"), os.path.join(directory, "templates"))
+        os.chdir(directory)
+        configure_logging(log_dir=directory)
+        try:
+            yield directory
+        finally:
+            configure_logging(log_dir=previous_log_dir)
+            os.chdir(previous_directory)
+
+
+def git_commit() -> Optional[str]:
+    """Returns the checked out commit, with "-dirty" if the tree has changes, or None outside a git checkout."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def build_report(results: Dict[str, Metrics], options: Dict[str, Any]) -> Dict[str, Any]:
+    """Wraps results with what is needed to compare them fairly: commit, interpreter, machine and options."""
+    return {
+        "version": RESULTS_VERSION,
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": options,
+        "results": results,
+    }
+
+
+def save_report(report: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Writes a report as JSON, by default to benchmarks/results/<commit>.json, and returns its path."""
+    if path is None:
+        path = os.path.join(RESULTS_DIR, f"{report['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    """
+    Reads a report written by save_report.
+
+    Raises:
+        ValueError: If the file is not a benchmark report of a supported version.
+    """
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    if not isinstance(report, dict) or report.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{path} is not a version {RESULTS_VERSION} benchmark report.")
+    return report
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_s")
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = 0.10) -> List[Tuple[str, str, float, float, float, bool]]:
+    """
+    Compares the metrics both reports have.
+
+    Args:
+        baseline (Dict[str, Any]): The report to compare against, e.g. of the parent commit.
+        current (Dict[str, Any]): The new report.
+        threshold (float): Relative change beyond which a worse metric is a regression.
+
+    Returns:
+        List[Tuple[str, str, float, float, float, bool]]: For every shared metric, the case, the metric,
+            the baseline and current values, the relative change and whether it is a regression.
+    """
+    rows = []
+    for case, metrics in sorted(current["results"].items()):
+        baseline_metrics = baseline["results"].get(case, {})
+        for metric, value in sorted(metrics.items()):
+            if metric == "count" or metric not in baseline_metrics:
+                continue
+            previous = baseline_metrics[metric]
+            if previous:
+                change = (value - previous) / previous
+            else:  # E.g. errors going from 0 to some
+                change = math.inf if value > 0 else 0.0
+            worse = -change if higher_is_better(metric) else change
+            rows.append((case, metric, previous, value, change, worse > threshold))
+    return rows
+
+
+def print_results(results: Dict[str, Metrics], stream=sys.stdout) -> None:
+    for case, metrics in sorted(results.items()):
+        values = "  ".join(f"{metric}={value:.4g}" for metric, value in sorted(metrics.items()))
+        print(f"{case:<40} {values}", file=stream)
@@ -0,0 +1,75 @@
+"""
+Runs the benchmark suite and saves the results as JSON, for comparison between commits.
+
+Everything runs offline: the server benchmark spawns its own server on a free local port, and
+every benchmark works in a scratch directory, so the repository's data files are not touched.
+
+Usage:
+    python -m benchmarks.run [--quick] [--only router,templates,model,server] [--output FILE]
+                             [--compare BASELINE.json] [--threshold 0.1]
+
+Results go to benchmarks/results/<commit>.json unless --output is given. With --compare, the
+metrics that got worse than the baseline by more than the threshold are listed and the exit
+status is 1, so the suite can gate a CI job.
+"""
+import argparse
+import sys
+from typing import Callable, Dict
+
+from benchmarks import bench_model, bench_router, bench_server, bench_templates
+from benchmarks.harness import (Metrics, build_report, compare_reports, load_report, print_results, save_report,
+                                scratch_directory)
+
+SUITES: Dict[str, Callable[..., Dict[str, Metrics]]] = {
+    "router": bench_router.run,
+    "templates": bench_templates.run,
+    "model": bench_model.run,
+    "server": bench_server.run,
+}
+
+
+def print_comparison(rows, threshold: float) -> int:
+    """Prints the comparison table and returns the number of regressions."""
+    regressions = 0
+    print(f"\n{'case':<40}{'metric':<18}{'baseline':>12}{'current':>12}{'change':>10}")
+    for case, metric, previous, value, change, regressed in rows:
+        regressions += regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{case:<40}{metric:<18}{previous:>12.4g}{value:>12.4g}{change:>+10.1%}{flag}")
+    print(f"\n{regressions} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and save its results as JSON.")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations, for a smoke run.")
+    parser.add_argument("--only", default=",".join(SUITES),
+                        help=f"Comma-separated suites to run, among: {', '.join(SUITES)}.")
+    parser.add_argument("--output", help="Where to save the results. Defaults to benchmarks/results/<commit>.json.")
+    parser.add_argument("--compare", help="Results file to compare against, e.g. those of the parent commit.")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative change beyond which a worse metric is reported as a regression.")
+    args = parser.parse_args()
+
+    suites = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = [name for name in suites if name not in SUITES]
+    if unknown:
+        parser.error(f"Unknown suite(s) {', '.join(unknown)}. Available suites are: {', '.join(SUITES)}")
+    baseline = load_report(args.compare) if args.compare else None
+
+    results: Dict[str, Metrics] = {}
+    with scratch_directory():
+        for name in suites:
+            print(f"Running {name} benchmarks...", file=sys.stderr)
+            results.update(SUITES[name](quick=args.quick))
+
+    report = build_report(results, {"quick": args.quick, "suites": suites})
+    print_results(results)
+    print(f"\nResults saved to {save_report(report, args.output)}")
+
+    if baseline is not None and print_comparison(compare_reports(baseline, report, args.threshold), args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+from benchmarks.harness import build_report, compare_reports, load_report, percentile, save_report, summarize
+
+
+class TestHarness(unittest.TestCase):
+    def test_summarize_percentiles_and_throughput(self):
+        """Test that latencies are reported in milliseconds and throughput uses the wall time when given."""
+        samples = [i / 1000 for i in range(1, 101)]  # 1 ms to 100 ms
+        metrics = summarize(samples)
+        self.assertAlmostEqual(metrics["p50_ms"], 50.5)
+        self.assertAlmostEqual(metrics["p99_ms"], 99.01)
+        self.assertAlmostEqual(metrics["ops_per_s"], 100 / sum(samples))
+        self.assertAlmostEqual(summarize(samples, elapsed=2.0)["ops_per_s"], 50.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_compare_flags_regressions_by_metric_direction(self):
+        """Test that slower latencies and lower throughputs beyond the threshold are regressions."""
+        baseline = build_report({"router.route_static": {"count": 10, "p50_ms": 1.0, "ops_per_s": 1000.0,
+                                                         "errors": 0}}, {})
+        current = build_report({"router.route_static": {"count": 20, "p50_ms": 1.05, "ops_per_s": 800.0,
+                                                        "errors": 2},
+                                "router.new_case": {"p50_ms": 5.0}}, {})
+        rows = {(case, metric): regressed for case, metric, _, _, _, regressed in compare_reports(baseline, current)}
+        self.assertEqual(rows, {("router.route_static", "errors"): True,
+                                ("router.route_static", "ops_per_s"): True,
+                                ("router.route_static", "p50_ms"): False})
+
+    def test_reports_round_trip(self):
+        """Test that a saved report loads back and files of another kind are refused."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = save_report(build_report({"case": {"p50_ms": 1.0}}, {"quick": True}),
+                               os.path.join(directory, "results", "run.json"))
+            self.assertEqual(load_report(path)["results"], {"case": {"p50_ms": 1.0}})
+            other = os.path.join(directory, "other.json")
+            with open(other, "w") as f:
+                f.write("[]")
+            with self.assertRaises(ValueError):
+                load_report(other)
+
+
+if __name__ == "__main__":
+    unittest.main()
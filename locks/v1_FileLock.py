@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+import os
+import tempfile
+import threading
+from typing import Dict, Iterator, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock, locking becomes a no-op there
+    fcntl = None
+
+# Locks held by the current thread: lock path -> (open lock file, nesting depth)
+_held_locks = threading.local()
+
+
+def _get_held_locks() -> Dict[str, Tuple[object, int]]:
+    if not hasattr(_held_locks, "locks"):
+        _held_locks.locks = {}
+    return _held_locks.locks
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False) -> Iterator[None]:
+    """
+    Holds an advisory lock on "<path>.lock" for the duration of the block, so that
+    several server processes (or threads) never read and write the same file at once.
+
+    The lock is re-entrant within a thread: nesting file_lock for the same path only
+    locks once, and a nested exclusive request inside a shared lock upgrades it.
+
+    Args:
+        path (str): The file being protected.
+        shared (bool): Take a shared (read) lock instead of an exclusive (write) lock.
+    """
+    lock_path = os.path.abspath(path) + ".lock"
+    held = _get_held_locks()
+
+    if lock_path in held:
+        lock_file, depth = held[lock_path]
+        if not shared and fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        held[lock_path] = (lock_file, depth + 1)
+        try:
+            yield
+        finally:
+            held[lock_path] = (lock_file, held[lock_path][1] - 1)
+        return
+
+    lock_file = open(lock_path, "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        held[lock_path] = (lock_file, 1)
+        try:
+            yield
+        finally:
+            del held[lock_path]
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    finally:
+        lock_file.close()
+
+
+def atomic_write(path: str, data: bytes, fsync: bool = False) -> None:
+    """
+    Replaces the content of a file atomically with a uniquely named temporary file
+    in the same directory, so concurrent writers never share a temporary file.
+
+    Args:
+        path (str): The file to replace.
+        data (bytes): The new content.
+        fsync (bool): Flush the new content and the directory entry to disk, so the
+            replacement survives a power loss, not only a crash of the process.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_file = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_file, path)
+        if fsync:
+            fsync_directory(directory)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def fsync_directory(directory: str) -> None:
+    """Flushes a directory's entries to disk, e.g. after creating or renaming a file in it. A no-op on Windows."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import tempfile
+import time
+import unittest
+from loggings import v1_Logging
+from loggings.v1_Logging import (V1QueueHandler, configure_logging, error_logger, framework_logger, get_logger,
+                                 info_logger, stop_logging)
+
+
+class CountingArgument:
+    """Log argument counting how many times it is formatted."""
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "argument"
+
+
+class TestFrameworkLogging(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(framework_logger.setLevel, framework_logger.level)
+
+    def test_component_loggers_are_children_of_the_framework_logger(self):
+        """Test that get_logger names component loggers under "v1" and they inherit its level."""
+        logger = get_logger("router")
+        self.assertEqual(logger.name, "v1.router")
+        configure_logging("warning")
+        self.assertEqual(logger.getEffectiveLevel(), logging.WARNING)
+
+    def test_debug_messages_are_not_formatted_above_debug_level(self):
+        """Test that messages below the level cost no formatting, and are emitted once it is lowered."""
+        logger = get_logger("http_server")
+        argument = CountingArgument()
+
+        configure_logging(logging.INFO)
+        logger.debug("Received request: %s", argument)
+        self.assertEqual(argument.formatted, 0)
+
+        configure_logging("DEBUG")
+        with self.assertLogs("v1.http_server", logging.DEBUG) as logs:
+            logger.debug("Received request: %s", argument)
+        self.assertEqual(logs.output, ["DEBUG:v1.http_server:Received request: argument"])
+
+    def test_unknown_level_is_rejected(self):
+        """Test that an unknown level name raises ValueError."""
+        with self.assertRaises(ValueError):
+            configure_logging("verbose")
+
+    def test_framework_logs_do_not_reach_the_root_logger(self):
+        """Test that framework records go through the logging queue only."""
+        self.assertFalse(framework_logger.propagate)
+        self.assertTrue(any(isinstance(handler, V1QueueHandler) for handler in framework_logger.handlers))
+
+
+class TestLoggingPipeline(unittest.TestCase):
+    def setUp(self):
+        """Log to a temporary directory, restoring the current configuration afterwards."""
+        saved_settings = dict(v1_Logging._settings)
+        self.addCleanup(configure_logging, framework_logger.level, **saved_settings)
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        self.log_dir = log_dir.name
+
+    def read_lines(self, file_name):
+        with open(os.path.join(self.log_dir, file_name)) as f:
+            return f.read().splitlines()
+
+    def test_json_lines_reach_the_file_of_their_logger(self):
+        """Test that each logger writes JSON lines to its own file, tracebacks apart from the message."""
+        configure_logging(log_dir=self.log_dir, json_format=True, console=False)
+        info_logger.info("Transaction %s started.", 7)
+        try:
+            raise KeyError("tasks")
+        except KeyError:
+            error_logger.exception("Failed to write data")
+        get_logger("router").warning("Not a file logger")
+        stop_logging()
+
+        info = [json.loads(line) for line in self.read_lines("info.log")]
+        self.assertEqual([(entry["level"], entry["logger"], entry["message"]) for entry in info],
+                         [("INFO", "info", "Transaction 7 started.")])
+        [error] = [json.loads(line) for line in self.read_lines("error.log")]
+        self.assertEqual(error["message"], "Failed to write data")
+        self.assertIn("KeyError: 'tasks'", error["exception"])
+        self.assertFalse(os.path.exists(os.path.join(self.log_dir, "warning.log")))
+
+    def test_files_are_rotated_by_size(self):
+        """Test that a log reaching max_bytes is rotated, keeping backup_count old files."""
+        configure_logging(log_dir=self.log_dir, rotation="size", max_bytes=200, backup_count=2, json_format=False)
+        for number in range(20):
+            info_logger.info("Transaction %d committed.", number)
+        stop_logging()
+
+        self.assertEqual(sorted(name for name in os.listdir(self.log_dir) if name.startswith("info.log")),
+                         ["info.log", "info.log.1", "info.log.2"])
+        self.assertTrue(self.read_lines("info.log")[-1].endswith("Transaction 19 committed."))
+        self.assertLessEqual(os.path.getsize(os.path.join(self.log_dir, "info.log.1")), 200)
+
+    def test_logging_does_not_wait_for_slow_handlers(self):
+        """Test that a record is queued while the listener is blocked writing, and written afterwards."""
+        configure_logging(log_dir=self.log_dir, rotation="none", json_format=False)
+        file_handler = next(handler for handler in v1_Logging._listener.handlers
+                            if getattr(handler, "baseFilename", "").endswith("error.log"))
+        file_handler.acquire()  # Any write to error.log now blocks the listener thread
+        try:
+            started = time.perf_counter()
+            for number in range(100):
+                error_logger.error("Failed to write data: %d", number)
+            self.assertLess(time.perf_counter() - started, 1)
+        finally:
+            file_handler.release()
+        stop_logging()
+        self.assertEqual(len(self.read_lines("error.log")), 100)
+
+    def test_unknown_rotation_is_rejected(self):
+        """Test that an unknown rotation raises ValueError and leaves logging running."""
+        with self.assertRaises(ValueError):
+            configure_logging(rotation="weekly")
+        self.assertIsNotNone(v1_Logging._listener)
+
+
+if __name__ == "__main__":
+    unittest.main()
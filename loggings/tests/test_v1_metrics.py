@@ -0,0 +1,94 @@
+import threading
+import unittest
+from loggings import v1_Metrics
+from loggings.v1_Metrics import Histogram, V1Metrics, configure_metrics
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles_are_interpolated_within_buckets(self):
+        """Test that quantiles fall in the bucket holding their rank, and slower requests than every bound clamp."""
+        histogram = Histogram()
+        for _ in range(90):
+            histogram.observe(0.003)  # (0.0025, 0.005] bucket
+        for _ in range(10):
+            histogram.observe(0.2)  # (0.1, 0.25] bucket
+        self.assertTrue(0.0025 < histogram.quantile(0.5) <= 0.005)
+        self.assertTrue(0.1 < histogram.quantile(0.95) <= 0.25)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.sum, 90 * 0.003 + 10 * 0.2)
+
+        histogram.observe(60)
+        self.assertEqual(histogram.buckets[-1], 1)
+        self.assertEqual(histogram.quantile(1.0), v1_Metrics.DURATION_BUCKETS[-1])
+        self.assertEqual(Histogram().quantile(0.99), 0.0)
+
+
+class TestV1Metrics(unittest.TestCase):
+    def test_threads_record_into_their_own_shards(self):
+        """Test that every thread gets its own shard and collect adds them up."""
+        metrics = V1Metrics()
+
+        def record():
+            for _ in range(1000):
+                metrics.observe_request("/tasks/{id:int}", "GET", 200, 0.001, 10)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(metrics._shards), 4)
+        stats = metrics.collect().routes[("/tasks/{id:int}", "GET")]
+        self.assertEqual(stats.responses, {200: 4000})
+        self.assertEqual(stats.duration.count, 4000)
+        self.assertEqual(stats.request_bytes, 40000)
+
+    def test_render_prometheus_text(self):
+        """Test the exposition format: cumulative buckets, quantiles, counters and escaped labels."""
+        metrics = V1Metrics()
+        metrics.observe_request("/tasks", "POST", 201, 0.002, 42)
+        metrics.observe_request("/tasks", "POST", 400, 0.02)
+        metrics.observe_request('/say/"hi"', "GET", 200, 0.001)
+        metrics.observe_phase("routing", 0.00001)
+        metrics.add_in_flight(1)
+        metrics.add_response_bytes(512)
+        metrics.count_error("send")
+
+        text = metrics.render()
+        self.assertTrue(text.endswith("\n"))
+        self.assertIn('v1_requests_total{route="/tasks",method="POST",status="201"} 1', text)
+        self.assertIn('v1_requests_total{route="/tasks",method="POST",status="400"} 1', text)
+        self.assertIn('v1_request_duration_seconds_bucket{route="/tasks",method="POST",le="0.0025"} 1', text)
+        self.assertIn('v1_request_duration_seconds_bucket{route="/tasks",method="POST",le="+Inf"} 2', text)
+        self.assertIn('v1_request_duration_seconds_count{route="/tasks",method="POST"} 2', text)
+        self.assertIn('v1_request_duration_quantile_seconds{route="/tasks",method="POST",quantile="0.99"}', text)
+        self.assertIn('v1_request_phase_seconds_count{phase="routing"} 1', text)
+        self.assertIn('v1_request_bytes_total{route="/tasks",method="POST"} 42', text)
+        self.assertIn('route="/say/\\"hi\\""', text)
+        self.assertIn("v1_response_bytes_total 512", text)
+        self.assertIn("v1_requests_in_flight 1", text)
+        self.assertIn('v1_errors_total{kind="send"} 1', text)
+        for family in ("v1_requests_total", "v1_request_duration_seconds", "v1_errors_total"):
+            self.assertEqual(text.count(f"# TYPE {family} "), 1)
+
+    def test_unknown_methods_share_one_label(self):
+        """Test that methods outside the known set are recorded under OTHER, whatever the client sent."""
+        metrics = V1Metrics()
+        for method in ("FOO", "BAR", "get"):
+            metrics.observe_request("/tasks", method, 405, 0.001)
+        metrics.observe_request("/tasks", "GET", 200, 0.001)
+        self.assertEqual(sorted(metrics.collect().routes), [("/tasks", "GET"), ("/tasks", "OTHER")])
+        self.assertEqual(metrics.collect().routes[("/tasks", "OTHER")].responses, {405: 3})
+
+    def test_configure_metrics(self):
+        """Test that metrics start from zero when enabled and are dropped when disabled."""
+        self.addCleanup(setattr, v1_Metrics, "metrics", v1_Metrics.metrics)
+        configure_metrics()
+        self.assertIsInstance(v1_Metrics.metrics, V1Metrics)
+        configure_metrics(False)
+        self.assertIsNone(v1_Metrics.metrics)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import io
+import json
+import os
+import pstats
+import tempfile
+import tracemalloc
+import unittest
+from loggings import v1_Profiling
+from loggings.v1_Profiling import V1Profiler, aggregate, configure_profiling, load_profiles, route_slug
+
+
+def build_rows(count=2000):
+    return [{"id": i, "title": f"Task {i}"} for i in range(count)]
+
+
+def fail():
+    raise RuntimeError("controller failed")
+
+
+class TestV1Profiler(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_cpu_profile_is_written_per_route(self):
+        """Test that a profiled call writes a pstats file and its metadata under the route's directory."""
+        profiler = V1Profiler(self.directory, sample_rate=1.0)
+        self.assertEqual(len(profiler.profile("/tasks/{id:int}", "GET", build_rows, count=10)), 10)
+
+        files = sorted(os.listdir(os.path.join(self.directory, "tasks_id_int")))
+        self.assertEqual([os.path.splitext(name)[1] for name in files], [".json", ".prof"])
+        stats = pstats.Stats(os.path.join(self.directory, "tasks_id_int", files[1]))
+        self.assertTrue(any(function == "build_rows" for _, _, function in stats.stats))
+        with open(os.path.join(self.directory, "tasks_id_int", files[0])) as f:
+            entry = json.load(f)
+        self.assertEqual((entry["route"], entry["method"], entry["memory"]), ("/tasks/{id:int}", "GET", None))
+
+    def test_memory_profile_lists_allocation_sites(self):
+        """Test that tracemalloc reports the request's allocations and is stopped afterwards."""
+        self.assertFalse(tracemalloc.is_tracing())
+        profiler = V1Profiler(self.directory, cpu=False, memory=True)
+        rows = profiler.profile("/tasks", "GET", build_rows)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        (entry,) = load_profiles(self.directory)[("/tasks", "GET")]
+        self.assertIsNone(entry["prof"])
+        self.assertGreater(entry["memory"]["peak_bytes"], 0)
+        self.assertTrue(any(site["file"] == __file__ for site in entry["memory"]["top"]))
+        del rows
+
+    def test_failing_handler_is_profiled_and_raises(self):
+        """Test that the handler's exception propagates and its profile is still written."""
+        profiler = V1Profiler(self.directory, memory=True)
+        with self.assertRaises(RuntimeError):
+            profiler.profile("/tasks", "POST", fail)
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(len(load_profiles(self.directory)[("/tasks", "POST")]), 1)
+
+    def test_header_forces_a_profile_only_with_the_token(self):
+        """Test sampling: the header needs the configured token, and forces one request only."""
+        profiler = V1Profiler(self.directory, sample_rate=0.0, token="secret")
+        self.assertTrue(profiler.should_profile("secret"))
+        self.assertFalse(profiler.should_profile())
+        self.assertFalse(profiler.should_profile("guess"))
+
+        untokened = V1Profiler(self.directory)
+        self.assertFalse(untokened.should_profile(None))
+        self.assertTrue(V1Profiler(self.directory, sample_rate=1.0).should_profile())
+        with self.assertRaises(ValueError):
+            V1Profiler(self.directory, sample_rate=1.5)
+
+    def test_one_profile_per_profiler_at_a_time(self):
+        """Test that a request arriving while the profilers are busy is run unprofiled instead of failing."""
+        profiler = V1Profiler(self.directory, memory=True)
+        first = profiler.start("/tasks", "GET")
+        try:
+            second = profiler.start("/tasks", "GET")
+            self.assertIsNone(second)
+            self.assertEqual(profiler.profile("/tasks", "GET", build_rows, count=5), build_rows(5))
+        finally:
+            profiler.finish(first)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        cpu_only = V1Profiler(self.directory)
+        first = cpu_only.start("/tasks", "POST")
+        self.assertIsNone(cpu_only.start("/tasks", "POST"))
+        cpu_only.finish(first)
+        self.assertIsNotNone(first.cpu_profile)
+        cpu_only.profile("/tasks", "POST", build_rows)
+        self.assertEqual(len(load_profiles(self.directory)[("/tasks", "POST")]), 2)
+
+    def test_aggregate_merges_profiles_per_route(self):
+        """Test that the aggregation merges every profile of a route and writes the merged stats."""
+        profiler = V1Profiler(self.directory, memory=True)
+        for _ in range(3):
+            profiler.profile("/tasks", "GET", build_rows, count=100)
+        profiler.profile("/tasks/{id:int}", "GET", build_rows, count=1)
+
+        report = io.StringIO()
+        merged = os.path.join(self.directory, "merged")
+        aggregate(self.directory, route="/tasks", output=merged, stream=report)
+        text = report.getvalue()
+        self.assertIn("=== GET /tasks: 3 profile(s)", text)
+        self.assertNotIn("/tasks/{id:int}", text)
+        self.assertIn("build_rows", text)
+        self.assertIn("Memory: 3 profile(s)", text)
+        stats = pstats.Stats(os.path.join(merged, f"{route_slug('/tasks')}-GET.prof"))
+        calls = [value[1] for (_, _, function), value in stats.stats.items() if function == "build_rows"]
+        self.assertEqual(calls, [3])
+
+    def test_configure_profiling(self):
+        """Test that profiling is on with a directory and off without one."""
+        self.addCleanup(setattr, v1_Profiling, "profiler", v1_Profiling.profiler)
+        configure_profiling(self.directory, sample_rate=0.5)
+        self.assertEqual(v1_Profiling.profiler.sample_rate, 0.5)
+        configure_profiling(None)
+        self.assertIsNone(v1_Profiling.profiler)
+
+
+if __name__ == "__main__":
+    unittest.main()
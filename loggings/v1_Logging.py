@@ -1,25 +1,214 @@
+import atexit
+import copy
+from datetime import datetime, timezone
+import json
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+import os
+import queue
+import sys
+from typing import Any, Dict, List, Optional, Union
 
-# Set up error logging to error.log
-error_logger = logging.getLogger('error')
-error_handler = logging.FileHandler('error.log')
-error_handler.setLevel(logging.ERROR)
-error_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-error_handler.setFormatter(error_formatter)
-error_logger.addHandler(error_handler)
+# Loggers writing to their own file: logger name -> (file name, lowest level written)
+LOG_FILES = {
+    "error": ("error.log", logging.ERROR),
+    "info": ("info.log", logging.INFO),
+    "warning": ("warning.log", logging.WARNING),
+}
 
-# Set up info logging to info.log
-info_logger = logging.getLogger('info')
-info_handler = logging.FileHandler('info.log')
-info_handler.setLevel(logging.INFO)
-info_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-info_handler.setFormatter(info_formatter)
-info_logger.addHandler(info_handler)
+# Default settings, each of which configure_logging() can change
+DEFAULT_LOG_LEVEL = "INFO"
+LOG_DIR = "."
+LOG_ROTATION = "size"  # "size", "time" or "none"
+LOG_MAX_BYTES = 10 * 1024 * 1024  # Size at which a file is rotated, with LOG_ROTATION = "size"
+LOG_WHEN = "midnight"  # Rotation interval, with LOG_ROTATION = "time" (see TimedRotatingFileHandler)
+LOG_BACKUP_COUNT = 5  # Rotated files kept per log
+LOG_JSON = False  # Write JSON lines instead of text
+LOG_CONSOLE = True  # Write the framework's "v1" logs to stdout
+
+ROTATIONS = ("size", "time", "none")
 
-# Set up info logging to warning.log
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - [%(name)s] %(message)s'
+
+error_logger = logging.getLogger('error')
+info_logger = logging.getLogger('info')
 warning_logger = logging.getLogger('warning')
-warning_handler = logging.FileHandler('warning.log')
-warning_handler.setLevel(logging.WARNING)
-warning_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-warning_handler.setFormatter(warning_formatter)
-warning_logger.addHandler(warning_handler)
\ No newline at end of file
+
+# Console logging of the framework itself, under the "v1" logger: every component logs to a
+# child of it, e.g. "v1.http_server". Per-request messages are logged at DEBUG, so they cost a
+# level check and nothing else unless the level is lowered, e.g. with MVC_LOG_LEVEL=DEBUG.
+framework_logger = logging.getLogger('v1')
+
+for _name, (_, _level) in LOG_FILES.items():
+    logging.getLogger(_name).setLevel(_level)
+for _logger in (error_logger, info_logger, warning_logger, framework_logger):
+    _logger.propagate = False  # Everything goes through the queue, nothing to the root logger
+
+class V1JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class V1QueueHandler(QueueHandler):
+    """
+    Queues records with their arguments merged into the message, so the listener thread never
+    formats objects a request may still be changing. Unlike QueueHandler, the traceback is kept
+    apart from the message, in exc_text, for the JSON formatter.
+    """
+    exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# The logging pipeline: loggers only put records on a queue, and a listener thread formats
+# them and does the file and console I/O, so logging never blocks the request being served.
+_queue_handler: Optional[V1QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_settings: Dict[str, Any] = {}
+
+
+def get_logger(component: str) -> logging.Logger:
+    """Returns the logger of a framework component, e.g. get_logger("router") for "v1.router"."""
+    return logging.getLogger(f"v1.{component}")
+
+
+def build_file_handler(path: str, rotation: str, max_bytes: int, when: str, backup_count: int) -> logging.Handler:
+    """Creates the handler of one log file, rotating it by size or time. The file is opened on the first record."""
+    if rotation == "size":
+        return RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+    if rotation == "time":
+        return TimedRotatingFileHandler(path, when=when, backupCount=backup_count, delay=True)
+    return logging.FileHandler(path, delay=True)
+
+
+def build_handlers(settings: Dict[str, Any]) -> List[logging.Handler]:
+    """Creates the handlers the listener writes records with, each taking the records of one logger."""
+    handlers = []
+    for logger_name, (file_name, level) in LOG_FILES.items():
+        handler = build_file_handler(os.path.join(settings["log_dir"], file_name), settings["rotation"],
+                                     settings["max_bytes"], settings["when"], settings["backup_count"])
+        handler.setLevel(level)
+        handler.addFilter(logging.Filter(logger_name))
+        handler.setFormatter(V1JsonFormatter() if settings["json_format"] else logging.Formatter(TEXT_FORMAT))
+        handlers.append(handler)
+
+    if settings["console"]:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.addFilter(logging.Filter(framework_logger.name))
+        handler.setFormatter(V1JsonFormatter() if settings["json_format"] else logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(handler)
+    return handlers
+
+
+def start_listener(handlers: List[logging.Handler]) -> None:
+    """Starts a listener thread writing with handlers, and points every logger at its queue."""
+    global _queue_handler, _listener
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = V1QueueHandler(log_queue)
+    for logger_name in (*LOG_FILES, framework_logger.name):
+        logger = logging.getLogger(logger_name)
+        if _queue_handler is not None:
+            logger.removeHandler(_queue_handler)
+        logger.addHandler(queue_handler)
+    _queue_handler = queue_handler
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """
+    Writes out every queued record, then stops the listener thread and closes the log files.
+
+    Until configure_logging() starts a listener again, records only reach stderr, and only
+    warnings and worse, through logging's last resort handler.
+    """
+    global _queue_handler, _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    for logger_name in (*LOG_FILES, framework_logger.name):
+        logging.getLogger(logger_name).removeHandler(_queue_handler)
+    _queue_handler = None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def configure_logging(level: Union[int, str, None] = None, log_dir: Optional[str] = None,
+                      rotation: Optional[str] = None, max_bytes: Optional[int] = None, when: Optional[str] = None,
+                      backup_count: Optional[int] = None, json_format: Optional[bool] = None,
+                      console: Optional[bool] = None) -> None:
+    """
+    Configures logging: the single entry point for levels, files, rotation and format.
+
+    Arguments left to None keep their current value. Changing only the level takes effect
+    immediately; changing anything else writes out the queued records and restarts the
+    listener with new handlers.
+
+    Args:
+        level (Union[int, str, None]): Level of the framework's "v1" logs, e.g. "DEBUG" to log every request.
+        log_dir (Optional[str]): Directory of error.log, info.log and warning.log.
+        rotation (Optional[str]): "size" to rotate at max_bytes, "time" to rotate every `when`, "none" to never rotate.
+        max_bytes (Optional[int]): Size in bytes at which a log file is rotated.
+        when (Optional[str]): Rotation interval of TimedRotatingFileHandler, e.g. "midnight" or "H".
+        backup_count (Optional[int]): Number of rotated files kept per log.
+        json_format (Optional[bool]): Whether records are written as JSON lines instead of text.
+        console (Optional[bool]): Whether the framework's logs are written to stdout.
+
+    Raises:
+        ValueError: If the level name or rotation is unknown.
+    """
+    if level is not None:
+        framework_logger.setLevel(level.upper() if isinstance(level, str) else level)
+
+    changes = {"log_dir": log_dir, "rotation": rotation, "max_bytes": max_bytes, "when": when,
+               "backup_count": backup_count, "json_format": json_format, "console": console}
+    changes = {name: value for name, value in changes.items() if value is not None}
+    if rotation is not None and rotation not in ROTATIONS:
+        raise ValueError(f"Unknown log rotation '{rotation}'. Available rotations are: {', '.join(ROTATIONS)}")
+    if _listener is not None and not changes:
+        return
+
+    settings = {**_settings, **changes}
+    handlers = build_handlers(settings)
+    stop_logging()
+    _settings.update(settings)
+    start_listener(handlers)
+
+
+def _restart_listener_in_child() -> None:
+    """Gives a forked process its own listener; the parent's thread does not exist in the child."""
+    global _listener
+    if _listener is not None:
+        _listener = None  # Its queue may hold the parent's records, which the parent writes itself
+        start_listener(build_handlers(_settings))
+
+
+_settings.update(log_dir=LOG_DIR, rotation=LOG_ROTATION, max_bytes=LOG_MAX_BYTES, when=LOG_WHEN,
+                 backup_count=LOG_BACKUP_COUNT, json_format=LOG_JSON, console=LOG_CONSOLE)
+configure_logging(os.environ.get("MVC_LOG_LEVEL", DEFAULT_LOG_LEVEL))
+atexit.register(stop_logging)
+if hasattr(os, "register_at_fork"):  # Not available on Windows, which has no fork
+    os.register_at_fork(after_in_child=_restart_listener_in_child)
@@ -0,0 +1,257 @@
+from bisect import bisect_left
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds, in seconds, of the latency histogram buckets; slower observations go to +Inf
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Where a request spends its time, in order
+PHASES = ("parse", "upload", "routing", "controller", "render", "send")
+
+# Quantiles estimated from the latency histograms for every route
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Route label of requests that matched no route, and of static files
+UNMATCHED_ROUTE = "<unmatched>"
+STATIC_ROUTE = "/static/*"
+
+# Method labels: any other method, as sent by the client, is recorded as OTHER_METHOD
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"))
+OTHER_METHOD = "OTHER"
+
+METRICS_PATH = "/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# The metrics being collected, None while metrics are turned off
+metrics: Optional["V1Metrics"] = None
+
+
+class Histogram:
+    """Latency histogram: a count per bucket of DURATION_BUCKETS, plus +Inf, with the sum of all observations."""
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect_left(DURATION_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        for index, count in enumerate(other.buckets):
+            self.buckets[index] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by linear interpolation within its bucket, as Prometheus' histogram_quantile does."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                if index == len(DURATION_BUCKETS):
+                    return DURATION_BUCKETS[-1]  # Only known to be above the largest bound
+                lower = DURATION_BUCKETS[index - 1] if index else 0.0
+                return lower + (DURATION_BUCKETS[index] - lower) * (rank - seen) / count
+            seen += count
+        return DURATION_BUCKETS[-1]
+
+
+class RouteStats:
+    """What is recorded for one route and HTTP method."""
+    __slots__ = ("duration", "responses", "request_bytes")
+
+    def __init__(self):
+        self.duration = Histogram()
+        self.responses: Dict[int, int] = {}  # Status code -> count
+        self.request_bytes = 0
+
+
+class MetricsShard:
+    """The metrics of one thread. Only that thread writes them, so recording takes no lock."""
+    __slots__ = ("routes", "phases", "in_flight", "response_bytes", "errors", "route")
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.phases = {phase: Histogram() for phase in PHASES}
+        self.in_flight = 0
+        self.response_bytes = 0
+        self.errors: Dict[str, int] = {}
+        self.route: Optional[str] = None  # Route pattern of the request this thread is dispatching
+
+
+class V1Metrics:
+    """
+    Request metrics: per-route latency histograms, status and byte counts, time per phase,
+    requests in flight and errors, rendered in the Prometheus text format.
+
+    Every thread records into its own MetricsShard, so the request path never waits for a
+    lock nor allocates beyond a dict entry for a route seen for the first time; the shards
+    are only added up when the metrics are rendered.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[MetricsShard] = []
+        self._lock = threading.Lock()  # Guards _shards, taken once per thread
+
+    def shard(self) -> MetricsShard:
+        """Returns the calling thread's shard, creating it on the thread's first call."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = MetricsShard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def observe_phase(self, phase: str, seconds: float) -> None:
+        """Records the time spent in one of PHASES."""
+        self.shard().phases[phase].observe(seconds)
+
+    def set_route(self, route: Optional[str]) -> None:
+        """Labels the request being dispatched by this thread with its route pattern."""
+        self.shard().route = route
+
+    def take_route(self) -> Optional[str]:
+        """Returns the route set by set_route on this thread, and clears it."""
+        shard = self.shard()
+        route, shard.route = shard.route, None
+        return route
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float, request_bytes: int = 0) -> None:
+        """
+        Records a handled request.
+
+        Args:
+            route (str): The route pattern, UNMATCHED_ROUTE or STATIC_ROUTE; never the raw path.
+            method (str): The HTTP method. Methods outside METHODS are recorded as OTHER_METHOD, so
+                clients cannot create any number of series.
+            status (int): The response status code.
+            seconds (float): Time from parsing the body to building the response.
+            request_bytes (int): Size of the request body.
+        """
+        if method not in METHODS:
+            method = OTHER_METHOD
+        routes = self.shard().routes
+        stats = routes.get((route, method))
+        if stats is None:
+            stats = routes[(route, method)] = RouteStats()
+        stats.duration.observe(seconds)
+        stats.responses[status] = stats.responses.get(status, 0) + 1
+        stats.request_bytes += request_bytes
+
+    def add_in_flight(self, delta: int) -> None:
+        """Adds delta to the requests in flight; a request's increment and decrement must happen on the same thread."""
+        self.shard().in_flight += delta
+
+    def add_response_bytes(self, nbytes: int) -> None:
+        """Records bytes written to a client, heads included."""
+        self.shard().response_bytes += nbytes
+
+    def count_error(self, kind: str) -> None:
+        """Counts an error: "bad_request", "handler" or "send"."""
+        errors = self.shard().errors
+        errors[kind] = errors.get(kind, 0) + 1
+
+    def collect(self) -> MetricsShard:
+        """Adds up every thread's shard into one."""
+        with self._lock:
+            shards = list(self._shards)
+        total = MetricsShard()
+        for shard in shards:
+            for key, stats in list(shard.routes.items()):
+                merged = total.routes.get(key)
+                if merged is None:
+                    merged = total.routes[key] = RouteStats()
+                merged.duration.merge(stats.duration)
+                for status, count in list(stats.responses.items()):
+                    merged.responses[status] = merged.responses.get(status, 0) + count
+                merged.request_bytes += stats.request_bytes
+            for phase, histogram in shard.phases.items():
+                total.phases[phase].merge(histogram)
+            total.in_flight += shard.in_flight
+            total.response_bytes += shard.response_bytes
+            for kind, count in list(shard.errors.items()):
+                total.errors[kind] = total.errors.get(kind, 0) + count
+        return total
+
+    def render(self) -> str:
+        """Renders the metrics in the Prometheus text exposition format."""
+        total = self.collect()
+        lines: List[str] = []
+
+        lines += ["# HELP v1_requests_total Requests handled, by route, method and status.",
+                  "# TYPE v1_requests_total counter"]
+        for (route, method), stats in sorted(total.routes.items()):
+            for status, count in sorted(stats.responses.items()):
+                lines.append(f'v1_requests_total{{{labels(route=route, method=method, status=status)}}} {count}')
+
+        lines += ["# HELP v1_request_duration_seconds Time from parsing a request to building its response.",
+                  "# TYPE v1_request_duration_seconds histogram"]
+        for (route, method), stats in sorted(total.routes.items()):
+            lines += render_histogram("v1_request_duration_seconds", stats.duration, route=route, method=method)
+
+        lines += ["# HELP v1_request_duration_quantile_seconds Latency quantiles estimated from the histogram.",
+                  "# TYPE v1_request_duration_quantile_seconds gauge"]
+        for (route, method), stats in sorted(total.routes.items()):
+            for q in QUANTILES:
+                lines.append(f'v1_request_duration_quantile_seconds{{{labels(route=route, method=method, quantile=q)}}} '
+                             f'{stats.duration.quantile(q):.6g}')
+
+        lines += ["# HELP v1_request_phase_seconds Time spent in each phase of handling a request.",
+                  "# TYPE v1_request_phase_seconds histogram"]
+        for phase in PHASES:
+            lines += render_histogram("v1_request_phase_seconds", total.phases[phase], phase=phase)
+
+        lines += ["# HELP v1_request_bytes_total Request body bytes received, by route and method.",
+                  "# TYPE v1_request_bytes_total counter"]
+        for (route, method), stats in sorted(total.routes.items()):
+            lines.append(f'v1_request_bytes_total{{{labels(route=route, method=method)}}} {stats.request_bytes}')
+
+        lines += ["# HELP v1_response_bytes_total Response bytes sent, heads included.",
+                  "# TYPE v1_response_bytes_total counter",
+                  f"v1_response_bytes_total {total.response_bytes}",
+                  "# HELP v1_requests_in_flight Requests being handled or sent.",
+                  "# TYPE v1_requests_in_flight gauge",
+                  f"v1_requests_in_flight {total.in_flight}",
+                  "# HELP v1_errors_total Requests that failed, by kind.",
+                  "# TYPE v1_errors_total counter"]
+        for kind, count in sorted(total.errors.items()):
+            lines.append(f'v1_errors_total{{{labels(kind=kind)}}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def labels(**values) -> str:
+    """Formats Prometheus labels, escaping backslashes, quotes and newlines in their values."""
+    return ",".join(f'{name}="{escape_label(str(value))}"' for name, value in values.items())
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_histogram(name: str, histogram: Histogram, **label_values) -> Iterable[str]:
+    """Renders a histogram as cumulative _bucket series, then _sum and _count."""
+    base = labels(**label_values)
+    cumulative = 0
+    for bound, count in zip((*DURATION_BUCKETS, "+Inf"), histogram.buckets):
+        cumulative += count
+        yield f'{name}_bucket{{{base},le="{bound}"}} {cumulative}'
+    yield f"{name}_sum{{{base}}} {histogram.sum:.6g}"
+    yield f"{name}_count{{{base}}} {histogram.count}"
+
+
+def configure_metrics(enabled: bool = True) -> None:
+    """
+    Turns request metrics on, starting from zero, or off.
+
+    While they are off, instrumented code costs one check of the module's metrics global.
+    """
+    global metrics
+    metrics = V1Metrics() if enabled else None
@@ -0,0 +1,350 @@
+"""
+Per-request profiling with cProfile and tracemalloc, and the command aggregating the profiles.
+
+A sampled fraction of requests, or a request carrying the X-V1-Profile header with the
+configured token, is dispatched under cProfile and/or tracemalloc by the profiling middleware
+(servers/v1_ProfilingMiddleware.py). Each
+profile is written to the profile directory as <route>/<time>-<method>-<pid>-<n>.prof (pstats)
+next to a .json file with the route, method, duration and the top allocation sites.
+
+Usage:
+    python -m loggings.v1_Profiling PROFILE_DIR [--route /tasks] [--sort cumulative] [--limit 20]
+                                    [--output MERGED_DIR]
+"""
+import argparse
+import cProfile
+from collections import defaultdict
+import glob
+import itertools
+import json
+from loggings.v1_Logging import get_logger
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+logger = get_logger("profiling")
+
+# Request header asking for a profile of the request; its value must be the configured token
+PROFILE_HEADER = "X-V1-Profile"
+
+# The profiler of the running server, None while profiling is turned off
+profiler: Optional["V1Profiler"] = None
+
+
+def route_slug(route: str) -> str:
+    """Turns a route pattern into a directory name, e.g. "/tasks/{id:int}" into "tasks_id_int"."""
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", route).strip("_") or "root"
+
+
+class ProfileSession(NamedTuple):
+    """A profile being recorded, from V1Profiler.start to V1Profiler.finish."""
+    route: str
+    method: str
+    cpu_profile: Optional[cProfile.Profile]
+    trace_memory: bool
+    started_tracing: bool  # Whether tracemalloc was started for this profile, and is stopped after it
+    before: Optional[tracemalloc.Snapshot]
+    started: float
+
+
+class V1Profiler:
+    """
+    Profiles sampled requests and writes one profile per request.
+
+    cProfile and tracemalloc each allow one profile at a time per process: since Python 3.12,
+    enabling a second cProfile.Profile while one is active raises ValueError. So one request at
+    a time is profiled for CPU and one for memory; a request sampled while both are busy is not
+    profiled at all, and one sampled while only one is busy gets the other kind of profile.
+    tracemalloc traces the whole process, so its allocation sites can include allocations made
+    by other threads during that request.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.0, cpu: bool = True, memory: bool = False,
+                 token: Optional[str] = None, top_allocations: int = 50, memory_frames: int = 1):
+        """
+        Args:
+            directory (str): Where profiles are written.
+            sample_rate (float): Fraction of requests profiled, from 0 to 1.
+            cpu (bool): Whether requests are profiled with cProfile.
+            memory (bool): Whether requests are traced with tracemalloc.
+            token (Optional[str]): Value of the X-V1-Profile header that forces a profile. Without
+                a token the header is ignored, so clients cannot make the server profile at will.
+            top_allocations (int): Allocation sites kept per memory profile.
+            memory_frames (int): Frames of traceback stored per allocation by tracemalloc.
+
+        Raises:
+            ValueError: If sample_rate is outside [0, 1] or neither cpu nor memory is profiled.
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"Sample rate must be between 0 and 1, got {sample_rate}.")
+        if not (cpu or memory):
+            raise ValueError("At least one of cpu and memory profiling must be enabled.")
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.cpu = cpu
+        self.memory = memory
+        self.token = token
+        self.top_allocations = top_allocations
+        self.memory_frames = memory_frames
+        self._cpu_lock = threading.Lock()  # Held by the one request profiled by cProfile
+        self._memory_lock = threading.Lock()  # Held by the one request traced by tracemalloc
+        self._counter = itertools.count()
+
+    def should_profile(self, header_value: Optional[str] = None) -> bool:
+        """
+        Whether to profile a request: forced by its X-V1-Profile header carrying the token, or sampled.
+
+        Args:
+            header_value (Optional[str]): The request's X-V1-Profile header, if any.
+        """
+        if self.token is not None and header_value == self.token:
+            return True
+        return self.sample_rate > 0.0 and random.random() < self.sample_rate
+
+    def profile(self, route: str, method: str, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Runs function(*args, **kwargs) under the profilers available and writes the profile.
+
+        A view streaming its body returns an iterator, whose generation happens later while it is
+        sent and is therefore not included.
+
+        Args:
+            route (str): The route pattern, used to group the profiles.
+            method (str): The HTTP method.
+            function (Callable[..., Any]): The function profiled, e.g. a request handler.
+
+        Returns:
+            Any: What function returned. Its exceptions propagate; the profile is written anyway.
+        """
+        session = self.start(route, method)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if session is not None:
+                self.finish(session)
+
+    def start(self, route: str, method: str) -> Optional[ProfileSession]:
+        """
+        Starts profiling the current thread, with the profilers no other request is using.
+
+        Args:
+            route (str): The route pattern, used to group the profiles.
+            method (str): The HTTP method.
+
+        Returns:
+            Optional[ProfileSession]: The profile to pass to finish, on the same thread, or None if
+                every enabled profiler is busy with another request.
+        """
+        cpu_profile = None
+        if self.cpu and self._cpu_lock.acquire(blocking=False):
+            cpu_profile = cProfile.Profile()
+            try:
+                cpu_profile.enable()
+            except ValueError:  # Another profiler is active, e.g. the whole server runs under cProfile
+                cpu_profile = None
+                self._cpu_lock.release()
+        trace_memory = self.memory and self._memory_lock.acquire(blocking=False)
+        if cpu_profile is None and not trace_memory:
+            return None
+
+        started_tracing = False
+        before = None
+        if trace_memory:
+            if tracemalloc.is_tracing():
+                before = tracemalloc.take_snapshot()  # Traced by someone else: report the difference
+            else:
+                tracemalloc.start(self.memory_frames)
+                started_tracing = True
+            tracemalloc.reset_peak()
+        return ProfileSession(route, method, cpu_profile, trace_memory, started_tracing, before, time.perf_counter())
+
+    def finish(self, session: ProfileSession) -> None:
+        """Stops the profilers of a profile started on this thread and writes it."""
+        duration = time.perf_counter() - session.started
+        try:
+            if session.cpu_profile is not None:
+                session.cpu_profile.disable()
+            memory = self._memory_report(session.before) if session.trace_memory else None
+            self._write(session.route, session.method, duration, session.cpu_profile, memory)
+        finally:
+            if session.cpu_profile is not None:
+                self._cpu_lock.release()
+            if session.trace_memory:
+                if session.started_tracing:
+                    tracemalloc.stop()
+                self._memory_lock.release()
+
+    def _memory_report(self, before: Optional[tracemalloc.Snapshot]) -> Dict[str, Any]:
+        """Summarizes the allocations made since tracing started, or since the before snapshot."""
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        if before is not None:
+            statistics = [(stat.traceback, stat.size_diff, stat.count_diff)
+                          for stat in snapshot.compare_to(before, "lineno") if stat.size_diff > 0]
+        else:
+            statistics = [(stat.traceback, stat.size, stat.count) for stat in snapshot.statistics("lineno")]
+        statistics.sort(key=lambda item: item[1], reverse=True)
+        return {
+            "peak_bytes": peak,
+            "allocated_bytes": sum(size for _, size, _ in statistics),
+            "top": [{"file": traceback[0].filename, "line": traceback[0].lineno, "size": size, "count": count}
+                    for traceback, size, count in statistics[:self.top_allocations]],
+        }
+
+    def _write(self, route: str, method: str, duration: float, cpu_profile: Optional[cProfile.Profile],
+               memory: Optional[Dict[str, Any]]) -> None:
+        """Writes one request's profile; a failure is logged, never raised into the request."""
+        directory = os.path.join(self.directory, route_slug(route))
+        stem = os.path.join(directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{method}-{os.getpid()}-"
+                                       f"{next(self._counter)}")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            if cpu_profile is not None:
+                cpu_profile.dump_stats(stem + ".prof")
+            entry = {"route": route, "method": method, "duration": duration, "created": time.time(),
+                     "cpu": cpu_profile is not None, "memory": memory}
+            with open(stem + ".json", "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+        except OSError as e:
+            logger.warning("Failed to write the profile of %s %s: %s", method, route, e)
+            return
+        logger.debug("Profiled %s %s in %.1f ms to %s", method, route, duration * 1000, stem)
+
+
+def configure_profiling(directory: Optional[str], sample_rate: float = 0.0, cpu: bool = True, memory: bool = False,
+                        token: Optional[str] = None) -> None:
+    """
+    Turns per-request profiling on, writing profiles to directory, or off when directory is None.
+
+    Requests are profiled by V1ProfilingMiddleware, which must be in the middleware chain; while
+    profiling is off, it costs one check of the module's profiler global per request.
+    See V1Profiler for the arguments.
+    """
+    global profiler
+    profiler = V1Profiler(directory, sample_rate, cpu, memory, token) if directory else None
+
+
+def load_profiles(directory: str, route: Optional[str] = None) -> Dict[tuple, List[Dict[str, Any]]]:
+    """
+    Reads the profiles written to directory, grouped by (route, method).
+
+    Args:
+        directory (str): The profile directory.
+        route (Optional[str]): Only read the profiles of this route pattern.
+
+    Returns:
+        Dict[tuple, List[Dict[str, Any]]]: The entries of each route and method, each with a
+            "prof" key holding the path of its cProfile output, or None.
+    """
+    groups: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    pattern = os.path.join(directory, route_slug(route) if route else "*", "*.json")
+    for path in sorted(glob.glob(pattern)):
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping unreadable profile %s: %s", path, e)
+            continue
+        if route and entry.get("route") != route:
+            continue
+        prof = path[:-len(".json")] + ".prof"
+        entry["prof"] = prof if os.path.exists(prof) else None
+        groups[(entry["route"], entry["method"])].append(entry)
+    return groups
+
+
+def merge_cpu(entries: Iterable[Dict[str, Any]]) -> Optional[pstats.Stats]:
+    """Merges the cProfile outputs of entries into one Stats, or None if none has one."""
+    paths = [entry["prof"] for entry in entries if entry["prof"]]
+    if not paths:
+        return None
+    stats = pstats.Stats(paths[0], stream=sys.stdout)
+    for path in paths[1:]:
+        stats.add(path)
+    return stats
+
+
+def merge_memory(entries: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sums the allocation sites of entries, returning the mean and max peak and the sites by total size."""
+    sites: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+    peaks = []
+    for entry in entries:
+        memory = entry.get("memory")
+        if not memory:
+            continue
+        peaks.append(memory["peak_bytes"])
+        for site in memory["top"]:
+            totals = sites[(site["file"], site["line"])]
+            totals[0] += site["size"]
+            totals[1] += site["count"]
+    return {
+        "profiles": len(peaks),
+        "mean_peak_bytes": sum(peaks) / len(peaks) if peaks else 0,
+        "max_peak_bytes": max(peaks, default=0),
+        "sites": sorted(((file, line, size, count) for (file, line), (size, count) in sites.items()),
+                        key=lambda site: site[2], reverse=True),
+    }
+
+
+def aggregate(directory: str, route: Optional[str] = None, sort: str = "cumulative", limit: int = 20,
+              output: Optional[str] = None, stream=sys.stdout) -> None:
+    """
+    Prints, per route and method, the merged CPU profile and the largest allocation sites.
+
+    Args:
+        directory (str): The profile directory.
+        route (Optional[str]): Only report this route pattern.
+        sort (str): pstats sort key of the CPU report, e.g. "cumulative" or "tottime".
+        limit (int): Functions and allocation sites listed per route.
+        output (Optional[str]): Directory to also write each route's merged .prof to, e.g. for snakeviz.
+    """
+    groups = load_profiles(directory, route)
+    if not groups:
+        print(f"No profiles found in {directory}.", file=stream)
+        return
+
+    for (route_pattern, method), entries in sorted(groups.items()):
+        durations = sorted(entry["duration"] for entry in entries)
+        print(f"=== {method} {route_pattern}: {len(entries)} profile(s), "
+              f"median {durations[len(durations) // 2] * 1000:.2f} ms, max {durations[-1] * 1000:.2f} ms ===",
+              file=stream)
+
+        stats = merge_cpu(entries)
+        if stats is not None:
+            stats.stream = stream
+            stats.sort_stats(sort).print_stats(limit)
+            if output:
+                os.makedirs(output, exist_ok=True)
+                stats.dump_stats(os.path.join(output, f"{route_slug(route_pattern)}-{method}.prof"))
+
+        memory = merge_memory(entries)
+        if memory["profiles"]:
+            print(f"Memory: {memory['profiles']} profile(s), mean peak {memory['mean_peak_bytes'] / 1024:.1f} KiB, "
+                  f"max peak {memory['max_peak_bytes'] / 1024:.1f} KiB", file=stream)
+            for file, line, size, count in memory["sites"][:limit]:
+                print(f"  {size / 1024:>10.1f} KiB {count:>8} blocks  {file}:{line}", file=stream)
+        print(file=stream)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge the request profiles written by the server, per route.")
+    parser.add_argument("directory", help="The profile directory (MVC_PROFILE_DIR).")
+    parser.add_argument("--route", help="Only report this route pattern, e.g. '/tasks/{id:int}'.")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key, e.g. cumulative, tottime, calls.")
+    parser.add_argument("--limit", type=int, default=20, help="Functions and allocation sites listed per route.")
+    parser.add_argument("--output", help="Directory to write each route's merged .prof to.")
+    args = parser.parse_args()
+    aggregate(args.directory, args.route, args.sort, args.limit, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,3 +33,15 @@ class DefaultError(Exception):
     Inherits from the built-in Exception class.
     """
     pass
+
+class ReadOnlyModelError(Exception):
+    """
+    Exception raised when changing the data of a model opened read-only.
+
+    This exception is used when add, update, delete or overwrite operations
+    are attempted on a model whose storage cannot be written, such as the
+    memory-mapped storage of read-heavy deployments.
+
+    Inherits from the built-in Exception class.
+    """
+    pass
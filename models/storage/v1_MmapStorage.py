@@ -0,0 +1,217 @@
+from collections import OrderedDict
+import json
+from locks.v1_FileLock import atomic_write, file_lock
+from loggings.v1_Logging import warning_logger
+from models.error.v1_Error import ReadOnlyModelError
+from models.storage.v1_Storage import FileSignature, StorageData, V1Storage, get_file_signature, signature_of
+import mmap
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Tuple
+
+# Where each top-level value lies in the file: key -> (start, end) byte offsets
+KeyIndex = Dict[str, Tuple[int, int]]
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_STRING_OR_BRACKET = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]', re.DOTALL)
+_SCALAR = re.compile(rb"[^,}\s]+")
+
+
+def build_index(buffer: Any) -> KeyIndex:
+    """
+    Finds the byte range of every top-level value of a JSON object, without decoding them.
+
+    Strings are skipped by regular expressions and containers by counting brackets outside
+    strings, so the cost is one step per string and bracket instead of a full decode.
+
+    Args:
+        buffer (Any): The JSON document: bytes, or any buffer such as an mmap.
+
+    Returns:
+        KeyIndex: The top-level keys and their value ranges.
+
+    Raises:
+        ValueError: If the document is not a JSON object.
+    """
+    index: KeyIndex = {}
+    position = _WHITESPACE.match(buffer, 0).end()
+    if buffer[position:position + 1] != b"{":
+        raise ValueError("The document is not a JSON object.")
+    position = _WHITESPACE.match(buffer, position + 1).end()
+    if buffer[position:position + 1] == b"}":
+        return index
+
+    while True:
+        match = _STRING.match(buffer, position)
+        if match is None:
+            raise ValueError(f"Expected a key at offset {position}.")
+        key = json.loads(match.group())
+        position = _WHITESPACE.match(buffer, match.end()).end()
+        if buffer[position:position + 1] != b":":
+            raise ValueError(f"Expected ':' at offset {position}.")
+        start = _WHITESPACE.match(buffer, position + 1).end()
+
+        first = buffer[start:start + 1]
+        if first == b'"':
+            match = _STRING.match(buffer, start)
+            end = match.end() if match else -1
+        elif first in (b"{", b"["):
+            depth, end = 0, -1
+            for token in _STRING_OR_BRACKET.finditer(buffer, start):
+                bracket = token.group()
+                if bracket[0] == ord('"'):
+                    continue
+                depth += 1 if bracket in (b"{", b"[") else -1
+                if depth == 0:
+                    end = token.end()
+                    break
+        else:
+            match = _SCALAR.match(buffer, start)
+            end = match.end() if match else -1
+        if end < 0:
+            raise ValueError(f"Unterminated value of {key!r} at offset {start}.")
+        index[key] = (start, end)
+
+        position = _WHITESPACE.match(buffer, end).end()
+        separator = buffer[position:position + 1]
+        if separator == b"}":
+            return index
+        if separator != b",":
+            raise ValueError(f"Expected ',' or '}}' at offset {position}.")
+        position = _WHITESPACE.match(buffer, position + 1).end()
+
+
+class V1MmapData(Mapping):
+    """
+    The data of a memory-mapped JSON file as a read-only mapping: a value is decoded from its
+    byte range on first access and kept in a small LRU cache of decoded values.
+    """
+
+    def __init__(self, buffer: Any, index: KeyIndex, cache_size: int):
+        self._buffer = buffer
+        self._index = index
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __getitem__(self, key: str) -> Any:
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+        start, end = self._index[key]
+        value = json.loads(self._buffer[start:end])
+        with self._cache_lock:
+            self.misses += 1
+            self._cache[key] = value
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def copy(self) -> Dict[str, Any]:
+        """Decodes every value, leaving the cache alone."""
+        return {key: json.loads(self._buffer[start:end]) for key, (start, end) in self._index.items()}
+
+
+class V1MmapStorage(V1Storage):
+    """
+    Read-only storage for read-heavy deployments of large JSON data files.
+
+    Loading maps the file into memory and indexes the byte range of every top-level value,
+    without decoding any: a value is decoded when first read, so memory follows the keys in
+    use rather than the size of the file, and the operating system pages the file in and out
+    as needed. The index is cached next to the file in "<file_path>.idx", tied to the file's
+    signature, so later starts of the same file content skip the scan altogether.
+
+    The file keeps being written by processes using V1JsonStorage; as those replace it, a
+    refresh maps and indexes the new file. Changing the data through this storage raises
+    ReadOnlyModelError.
+    """
+    read_only = True
+
+    def __init__(self, file_path: str, cache_size: int = 128, cache_index: bool = True):
+        """
+        Args:
+            file_path (str): The JSON data file.
+            cache_size (int): How many decoded values to keep, the most recently read ones.
+            cache_index (bool): Save the index to "<file_path>.idx" and reuse it while the file is unchanged.
+        """
+        super().__init__(file_path)
+        self.index_path = file_path + ".idx"
+        self.cache_size = cache_size
+        self.cache_index = cache_index
+        self._signature: Optional[FileSignature] = None  # Of the file currently mapped
+
+    def load(self) -> StorageData:
+        """
+        Maps and indexes the file. If the file does not exist, is empty or is not a JSON object,
+        an empty mapping is used.
+        """
+        with file_lock(self.file_path, shared=True):
+            try:
+                with open(self.file_path, "rb") as f:
+                    self._signature = signature_of(os.fstat(f.fileno()))
+                    if self._signature[3] == 0:
+                        return {}
+                    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                self._signature = None
+                return {}
+
+        index = self._read_index()
+        if index is None:
+            try:
+                index = build_index(buffer)
+            except ValueError as e:
+                warning_logger.warning("Could not index %s, using no data: %s", self.file_path, e)
+                return {}
+            self._write_index(index)
+        return V1MmapData(buffer, index, self.cache_size)
+
+    def is_stale(self) -> bool:
+        return get_file_signature(self.file_path) != self._signature
+
+    def refresh(self, data: StorageData) -> Optional[StorageData]:
+        return self.load() if self.is_stale() else None
+
+    def write(self, data: StorageData, changes: Dict[str, Any], deleted: Iterable[str] = ()) -> StorageData:
+        raise ReadOnlyModelError(f"{self.file_path} is opened read-only.")
+
+    def replace(self, data: StorageData) -> StorageData:
+        raise ReadOnlyModelError(f"{self.file_path} is opened read-only.")
+
+    def _read_index(self) -> Optional[KeyIndex]:
+        if not self.cache_index:
+            return None
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(cached, dict) or cached.get("signature") != list(self._signature):
+            return None
+        return {key: (start, end) for key, start, end in cached["keys"]}
+
+    def _write_index(self, index: KeyIndex) -> None:
+        if not self.cache_index:
+            return
+        keys = [[key, start, end] for key, (start, end) in index.items()]
+        cached = {"signature": list(self._signature), "keys": keys}
+        try:
+            atomic_write(self.index_path, json.dumps(cached).encode("utf-8"))
+        except OSError as e:  # E.g. a read-only directory: the index is rebuilt on every load instead
+            warning_logger.warning("Could not save the index of %s: %s", self.file_path, e)
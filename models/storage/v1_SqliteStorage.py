@@ -0,0 +1,183 @@
+import argparse
+from contextlib import contextmanager
+import json
+from locks.v1_FileLock import file_lock
+from models.storage.v1_Storage import StorageData, V1JsonStorage, V1Storage
+from models.storage.v1_WalStorage import V1WalStorage
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS data (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID"
+
+
+class V1SqliteStorage(V1Storage):
+    """
+    Stores a model's data in an SQLite database, one row per top-level key with its value encoded as JSON.
+
+    The model holds a V1SqliteRows view of the table instead of the data itself: get_key_value reads
+    one row, a change writes only the rows of its keys, and nothing is loaded into memory up front.
+    The database runs in WAL journal mode, so readers never wait for a writer and any number of
+    processes can share it; it never goes stale, as every read sees the latest committed rows.
+
+    Each thread uses its own connection, as sqlite3 connections cannot be shared between threads.
+    """
+
+    def __init__(self, file_path: str, timeout: float = 5.0, synchronous: str = "NORMAL"):
+        """
+        Args:
+            file_path (str): The database file, created if needed.
+            timeout (float): Seconds a write waits for another process's write to finish before failing.
+            synchronous (str): SQLite's synchronous setting. "NORMAL" may lose the last transactions on a
+                power loss, never on a crash of the process; "FULL" syncs every commit to disk.
+        """
+        super().__init__(file_path)
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self.rows = V1SqliteRows(self)
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The connection of the current thread, opened on first use and again after a fork."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.file_path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA synchronous={self.synchronous}")
+            connection.execute(SCHEMA)
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def load(self) -> "V1SqliteRows":
+        return self.rows
+
+    def is_stale(self) -> bool:
+        return False
+
+    def refresh(self, data: StorageData) -> Optional[StorageData]:
+        return None
+
+    def write(self, data: StorageData, changes: Dict[str, Any], deleted: Iterable[str] = ()) -> "V1SqliteRows":
+        rows = [(key, json.dumps(value)) for key, value in changes.items()]
+        deleted = list(deleted)
+        with self._transaction() as connection:
+            if rows:
+                connection.executemany("INSERT OR REPLACE INTO data (key, value) VALUES (?, ?)", rows)
+            if deleted:
+                connection.executemany("DELETE FROM data WHERE key = ?", [(key,) for key in deleted])
+        return self.rows
+
+    def replace(self, data: StorageData) -> "V1SqliteRows":
+        rows = [(key, json.dumps(value)) for key, value in data.items()]
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM data")
+            connection.executemany("INSERT INTO data (key, value) VALUES (?, ?)", rows)
+        return self.rows
+
+    def close(self) -> None:
+        """Closes the current thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local.connection = None
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Runs the block in a transaction, committed if it succeeds and rolled back if it raises."""
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")  # Takes the write lock up front, waiting up to the timeout
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+
+class V1SqliteRows(Mapping):
+    """The data of a V1SqliteStorage as a read-only mapping, decoding rows as they are accessed."""
+
+    def __init__(self, storage: V1SqliteStorage):
+        self._storage = storage
+
+    def __getitem__(self, key: str) -> Any:
+        row = self._storage.connection.execute("SELECT value FROM data WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        return self._storage.connection.execute("SELECT 1 FROM data WHERE key = ?", (key,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter([key for (key,) in self._storage.connection.execute("SELECT key FROM data")])
+
+    def __len__(self) -> int:
+        return self._storage.connection.execute("SELECT COUNT(*) FROM data").fetchone()[0]
+
+    def copy(self) -> Dict[str, Any]:
+        """Returns every row, decoded, in a single query."""
+        rows = self._storage.connection.execute("SELECT key, value FROM data")
+        return {key: json.loads(value) for key, value in rows}
+
+
+def migrate(json_path: str, database_path: Optional[str] = None, replace: bool = False) -> int:
+    """
+    Imports a model's JSON data file into an SQLite database, under the file lock of the JSON file.
+
+    A write-ahead log left by V1WalStorage next to the file is replayed first.
+
+    Args:
+        json_path (str): The JSON data file, e.g. tasks_model.json.
+        database_path (Optional[str]): The database. Defaults to the JSON file's path with a .db extension.
+        replace (bool): Empty the database first, instead of adding the keys to it and overwriting those it has.
+
+    Returns:
+        int: The number of keys imported.
+
+    Raises:
+        FileNotFoundError: If the JSON file does not exist.
+    """
+    if not os.path.exists(json_path):
+        raise FileNotFoundError(f"{json_path} does not exist.")
+    source = V1WalStorage(json_path) if os.path.exists(json_path + ".wal") else V1JsonStorage(json_path)
+    target = V1SqliteStorage(database_path or os.path.splitext(json_path)[0] + ".db")
+    try:
+        with file_lock(json_path):
+            data = source.load()
+            if replace:
+                target.replace(data)
+            else:
+                target.write(target.rows, dict(data))
+    finally:
+        source.close()
+        target.close()
+    return len(data)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Import V1Model JSON data files into SQLite databases.")
+    parser.add_argument("json_files", nargs="+", help="JSON data files, e.g. tasks_model.json v1_model.json.")
+    parser.add_argument("--database", help="The database to import into, when importing a single file. "
+                                           "Defaults to each file's path with a .db extension.")
+    parser.add_argument("--replace", action="store_true", help="Empty each database before importing into it.")
+    args = parser.parse_args(argv)
+    if args.database and len(args.json_files) > 1:
+        parser.error("--database can only be used with a single JSON file.")
+
+    for json_path in args.json_files:
+        database_path = args.database or os.path.splitext(json_path)[0] + ".db"
+        try:
+            count = migrate(json_path, database_path, args.replace)
+        except (OSError, sqlite3.Error) as e:
+            parser.exit(1, f"Failed to import {json_path}: {e}\n")
+        print(f"Imported {count} key(s) from {json_path} into {database_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+from abc import ABC, abstractmethod
+import json
+from json.decoder import JSONDecodeError
+from locks.v1_FileLock import atomic_write, file_lock
+import os
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+# The data a model holds, as returned by its storage: a dict, or a mapping reading the store on access
+StorageData = Mapping[str, Any]
+
+# Builds the storage of a data file from its path: a V1Storage subclass, or a functools.partial of one
+StorageFactory = Callable[[str], "V1Storage"]
+
+# Identity of a data file's current content: (device, inode, mtime in ns, size). atomic_write
+# replaces the file, so every write gives it a new inode even within the mtime's resolution.
+FileSignature = Tuple[int, int, int, int]
+
+
+def get_file_signature(path: str) -> Optional[FileSignature]:
+    """Returns the signature of a file, or None if it does not exist."""
+    try:
+        return signature_of(os.stat(path))
+    except FileNotFoundError:
+        return None
+
+
+def signature_of(stat: os.stat_result) -> FileSignature:
+    return stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class V1Storage(ABC):
+    """
+    Storage engine of a V1Model: where its key-value data lives and how changes reach it.
+
+    The model holds the data returned by load, write, replace and refresh, and only changes it
+    itself in write-behind mode: there it sets and deletes keys of a dict in place, then passes
+    the same changes to write. A storage may return the same object again after changing it in
+    place, or a new one.
+    Every method is called by a single thread at a time per process, and under the model's file
+    lock within lock(), but another process may use the same store at the same time.
+    """
+    # Whether write and replace always raise ReadOnlyModelError
+    read_only = False
+
+    def __init__(self, file_path: str):
+        """
+        Args:
+            file_path (str): The data file, or the directory entry the store is named after.
+        """
+        self.file_path = file_path
+
+    @abstractmethod
+    def load(self) -> StorageData:
+        """Reads the stored data. A store that does not exist yet holds no data."""
+
+    @abstractmethod
+    def is_stale(self) -> bool:
+        """Whether the store changed since this storage last read or wrote it, e.g. by another process."""
+
+    @abstractmethod
+    def refresh(self, data: StorageData) -> Optional[StorageData]:
+        """
+        Brings the data held up to date with the store.
+
+        Returns:
+            Optional[StorageData]: The data to hold from now on, or None if it was up to date.
+        """
+
+    @abstractmethod
+    def write(self, data: StorageData, changes: Dict[str, Any], deleted: Iterable[str] = ()) -> StorageData:
+        """
+        Stores a change.
+
+        Args:
+            data (StorageData): The data held.
+            changes (Dict[str, Any]): The keys to set and their new values.
+            deleted (Iterable[str]): The keys to delete. Deleting a missing key does nothing.
+
+        Returns:
+            StorageData: The data to hold from now on, with the change.
+        """
+
+    @abstractmethod
+    def replace(self, data: StorageData) -> StorageData:
+        """
+        Replaces everything stored with data.
+
+        Returns:
+            StorageData: The data to hold from now on.
+        """
+
+    def close(self) -> None:
+        """Releases the files or connections held. The storage reopens them if used again."""
+
+
+class V1JsonStorage(V1Storage):
+    """
+    The default storage: the data as one JSON file, rewritten whole, atomically, on every change.
+    A change is written on top of the file's current content, so that keys written meanwhile by
+    another process are kept.
+    """
+
+    def __init__(self, file_path: str):
+        super().__init__(file_path)
+        self._signature: Optional[FileSignature] = None  # Of the file content last read or written
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Reads the JSON file. If the file does not exist or is invalid, an empty dictionary is used.
+        """
+        try:
+            with file_lock(self.file_path, shared=True), open(self.file_path, mode='r', encoding="utf-8") as fp:
+                self._signature = signature_of(os.fstat(fp.fileno()))
+                return json.load(fp)
+        except FileNotFoundError:
+            self._signature = None
+        except JSONDecodeError:
+            pass
+        return {}
+
+    def is_stale(self) -> bool:
+        return get_file_signature(self.file_path) != self._signature
+
+    def refresh(self, data: StorageData) -> Optional[Dict[str, Any]]:
+        return self.load() if self.is_stale() else None
+
+    def write(self, data: StorageData, changes: Dict[str, Any], deleted: Iterable[str] = ()) -> Dict[str, Any]:
+        with file_lock(self.file_path):
+            current = self.refresh(data)
+            if current is not None:  # Possibly empty, e.g. after another process cleared the data
+                data = current
+            updated = {**data, **changes}
+            for key in deleted:
+                updated.pop(key, None)
+            return self.replace(updated)
+
+    def replace(self, data: StorageData) -> Dict[str, Any]:
+        """
+        Writes data as the new JSON file. A temporary file is used to avoid corrupting it midway,
+        and the file lock keeps concurrent server processes from interleaving writes.
+        """
+        content = json.dumps(data).encode("utf-8")
+        with file_lock(self.file_path):
+            atomic_write(self.file_path, content)
+            self._signature = get_file_signature(self.file_path)
+        return dict(data)
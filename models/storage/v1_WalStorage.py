@@ -0,0 +1,243 @@
+import json
+from json.decoder import JSONDecodeError
+from locks.v1_FileLock import atomic_write, file_lock
+from loggings.v1_Logging import warning_logger
+from models.storage.v1_Storage import FileSignature, V1Storage, get_file_signature, signature_of
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+FSYNC_POLICIES = ("always", "batch", "never")
+
+# How far a storage has read its files: (snapshot signature, log device, log inode, log offset)
+WalPosition = Tuple[Optional[FileSignature], int, int, int]
+
+
+class V1WalStorage(V1Storage):
+    """
+    Stores a model's data as a JSON snapshot plus an append-only write-ahead log of the changes made since.
+
+    A change appends one line to "<file_path>.wal" holding the keys it sets and deletes, so it costs
+    the size of the change instead of the size of the data. Loading reads the snapshot and replays
+    the log over it. Once the log outgrows the snapshot it is compacted: the data is written as the
+    new snapshot and the log emptied. The snapshot is the JSON file V1Model writes by default, so an
+    existing data file can be switched to this storage as is, and back after a compaction.
+
+    Records hold whole values, so replaying one twice is harmless and a crash between writing the
+    snapshot and emptying the log loses nothing. A torn last record, left by a crash mid-append, is
+    ignored and cut off. Processes sharing the files append under the file lock, after replaying what
+    the others appended meanwhile.
+    """
+
+    def __init__(self, file_path: str, fsync: str = "batch", fsync_interval_ms: float = 5.0,
+                 compact_min_bytes: int = 1 << 20, compact_ratio: float = 1.0):
+        """
+        Args:
+            file_path (str): The JSON snapshot. The log is "<file_path>.wal".
+            fsync (str): When appended records reach the disk: "always" before each write returns, "batch"
+                within fsync_interval_ms, from a background thread, or "never", left to the operating system.
+                Only a power loss or kernel crash can lose the writes not flushed yet, not a crash of the process.
+            fsync_interval_ms (float): How long "batch" lets records accumulate before flushing them together.
+            compact_min_bytes (int): Log size below which the log is never compacted.
+            compact_ratio (float): Compact once the log is larger than this fraction of the snapshot.
+
+        Raises:
+            ValueError: If fsync is not one of FSYNC_POLICIES.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync!r}. Use one of: {', '.join(FSYNC_POLICIES)}.")
+        super().__init__(file_path)
+        self.wal_path = file_path + ".wal"
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.compact_min_bytes = compact_min_bytes
+        self.compact_ratio = compact_ratio
+        self._fd: Optional[int] = None  # The log, opened for appending
+        self._position: WalPosition = (None, 0, 0, 0)
+        self._sync_lock = threading.Lock()  # Guards _fd against the flusher and _sync_timer
+        self._sync_timer: Optional[threading.Timer] = None
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Reads the snapshot and replays the log over it.
+
+        Returns:
+            Dict[str, Any]: The data, empty if there is no snapshot or it is not valid JSON.
+        """
+        with file_lock(self.file_path):
+            return self._load()
+
+    def is_stale(self) -> bool:
+        """Whether the files changed since this storage last read or wrote them, e.g. by another process."""
+        try:
+            log = os.stat(self.wal_path)
+        except FileNotFoundError:
+            return True
+        return (get_file_signature(self.file_path), log.st_dev, log.st_ino, log.st_size) != self._position
+
+    def refresh(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Brings data up to date with the files: replays the records appended since onto it, or
+        reloads everything if the log was compacted meanwhile.
+
+        Args:
+            data (Dict[str, Any]): The data loaded by this storage.
+
+        Returns:
+            Optional[Dict[str, Any]]: data, or the reloaded data, if the files changed, else None.
+        """
+        with file_lock(self.file_path):
+            return self._catch_up(data)
+
+    def write(self, data: Dict[str, Any], changes: Dict[str, Any], deleted: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Appends a change to the log and applies it to data.
+
+        Args:
+            data (Dict[str, Any]): The data loaded by this storage, first brought up to date with the
+                records other processes appended since it was last read.
+            changes (Dict[str, Any]): The keys to set and their new values.
+            deleted (Iterable[str]): The keys to delete. Deleting a missing key does nothing.
+
+        Returns:
+            Dict[str, Any]: data with the change, or the reloaded data with it if the log was compacted meanwhile.
+
+        Raises:
+            TypeError: If a value cannot be encoded as JSON. Nothing is written then.
+        """
+        record: Dict[str, Any] = {}
+        if changes:
+            record["set"] = changes
+        deleted = list(deleted)
+        if deleted:
+            record["del"] = deleted
+        if not record:
+            return data
+        line = (json.dumps(record) + "\n").encode("utf-8")
+
+        with file_lock(self.file_path):
+            caught_up = self._catch_up(data)
+            if caught_up is not None:  # Possibly empty, e.g. after another process cleared the data
+                data = caught_up
+            view = memoryview(line)
+            while view:  # The log is opened with O_APPEND, and the file lock keeps other appends out
+                view = view[os.write(self._fd, view):]
+            apply_record(data, record)
+            snapshot, device, inode, _ = self._position
+            self._position = (snapshot, device, inode, os.fstat(self._fd).st_size)
+
+            if self.fsync == "always":
+                os.fsync(self._fd)
+            elif self.fsync == "batch":
+                self._schedule_sync()
+            if self._position[3] > max(self.compact_min_bytes, self.compact_ratio * (snapshot[3] if snapshot else 0)):
+                self._compact(data)
+        return data
+
+    def replace(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Writes data as the new snapshot and empties the log, dropping whatever the files held."""
+        with file_lock(self.file_path):
+            self._compact(data)
+        return data
+
+    def sync(self) -> None:
+        """Flushes the records appended so far to disk."""
+        with self._sync_lock:
+            self._sync_timer = None
+            if self._fd is not None:
+                os.fsync(self._fd)
+
+    def close(self) -> None:
+        """Flushes and closes the log. The storage reopens it if used again."""
+        with self._sync_lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if self._fd is not None:
+                if self.fsync != "never":
+                    os.fsync(self._fd)
+                os.close(self._fd)
+                self._fd = None
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.file_path, mode="r", encoding="utf-8") as fp:
+                snapshot = signature_of(os.fstat(fp.fileno()))
+                data = json.load(fp)
+        except FileNotFoundError:
+            data, snapshot = {}, None
+        except JSONDecodeError:
+            data, snapshot = {}, get_file_signature(self.file_path)
+
+        self._reopen()
+        log = os.fstat(self._fd)
+        self._position = (snapshot, log.st_dev, log.st_ino, 0)
+        self._replay(data)
+        return data
+
+    def _catch_up(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Replays the new records onto data, or reloads. None if up to date. Must hold the file lock."""
+        snapshot, device, inode, offset = self._position
+        try:
+            log = os.stat(self.wal_path)
+        except FileNotFoundError:
+            log = None
+        if (self._fd is not None and log is not None and (log.st_dev, log.st_ino) == (device, inode)
+                and log.st_size >= offset and get_file_signature(self.file_path) == snapshot):
+            if log.st_size == offset:
+                return None
+            self._replay(data)
+            return data
+        return self._load()  # Compacted, or replaced, by someone else
+
+    def _replay(self, data: Dict[str, Any]) -> None:
+        """Applies the records after the current offset to data. Must hold the file lock."""
+        snapshot, device, inode, offset = self._position
+        end = os.fstat(self._fd).st_size
+        with open(self.wal_path, "rb") as log:
+            log.seek(offset)
+            for line in log:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("record not terminated")
+                    record = json.loads(line)
+                except ValueError as e:
+                    warning_logger.warning("Cutting torn record at offset %d off %s: %s", offset, self.wal_path, e)
+                    os.ftruncate(self._fd, offset)
+                    end = offset
+                    break
+                apply_record(data, record)
+                offset += len(line)
+        self._position = (snapshot, device, inode, min(offset, end))
+
+    def _compact(self, data: Dict[str, Any]) -> None:
+        """Writes data as the snapshot, then empties the log. Must hold the file lock."""
+        durable = self.fsync != "never"
+        atomic_write(self.file_path, json.dumps(data).encode("utf-8"), fsync=durable)
+        atomic_write(self.wal_path, b"", fsync=durable)
+        self._reopen()
+        log = os.fstat(self._fd)
+        self._position = (get_file_signature(self.file_path), log.st_dev, log.st_ino, 0)
+
+    def _reopen(self) -> None:
+        """Opens the log at its path, creating it if needed, in place of the one held."""
+        fd = os.open(self.wal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        with self._sync_lock:
+            previous, self._fd = self._fd, fd
+        if previous is not None:
+            os.close(previous)
+
+    def _schedule_sync(self) -> None:
+        with self._sync_lock:
+            if self._sync_timer is not None and self._sync_timer.is_alive():
+                return  # The pending flush will cover this record too
+            self._sync_timer = threading.Timer(self.fsync_interval, self.sync)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+
+def apply_record(data: Dict[str, Any], record: Dict[str, Any]) -> None:
+    """Applies a log record to data. Deleting a missing key is a no-op, so records can be replayed twice."""
+    data.update(record.get("set", {}))
+    for key in record.get("del", ()):
+        data.pop(key, None)
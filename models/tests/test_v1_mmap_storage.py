@@ -0,0 +1,98 @@
+from functools import partial
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from models.error.v1_Error import ReadOnlyModelError
+from models.storage.v1_MmapStorage import V1MmapStorage, build_index
+from models.v1_Model import V1Model
+
+DOCUMENT = {
+    "tasks": [{"id": 1, "title": "Braces } ] and \"quotes\" in strings", "tags": []}, {"id": 2}],
+    "owner": "ada \\ lovelace",
+    "count": -12.5e3,
+    "done": True,
+    "empty": None,
+    "nested": {"a": {"b": [[], {}]}},
+    "café": "unicode key",
+}
+
+
+class TestBuildIndex(unittest.TestCase):
+    def test_ranges_decode_to_each_value(self):
+        for encoded in (json.dumps(DOCUMENT), json.dumps(DOCUMENT, indent=4, ensure_ascii=False)):
+            buffer = encoded.encode("utf-8")
+            index = build_index(buffer)
+            self.assertEqual(list(index), list(DOCUMENT))
+            for key, (start, end) in index.items():
+                self.assertEqual(json.loads(buffer[start:end]), DOCUMENT[key])
+
+    def test_empty_object(self):
+        self.assertEqual(build_index(b" { } "), {})
+
+    def test_invalid_documents(self):
+        for buffer in (b"[1, 2]", b'{"a": [1, 2}', b'{"a" 1}', b'{"a": 1 "b": 2}', b'{"a": "open'):
+            with self.assertRaises(ValueError, msg=buffer):
+                build_index(buffer)
+
+
+class TestV1MmapStorage(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.file_path = os.path.join(directory, "tasks_model.json")
+        V1Model(file_path=self.file_path).overwrite_data(**{key: value for key, value in DOCUMENT.items()
+                                                          if key.isidentifier() and value is not None})
+
+    def model(self, **options) -> V1Model:
+        return V1Model(file_path=self.file_path, storage=partial(V1MmapStorage, **options))
+
+    def test_values_are_decoded_on_first_access(self):
+        model = self.model(cache_size=2)
+        data = model._data
+        self.assertEqual(data.misses, 0)
+        self.assertEqual(model.get_key_value("tasks"), DOCUMENT["tasks"])
+        self.assertEqual(model.get_key_value("tasks"), DOCUMENT["tasks"])
+        self.assertEqual((data.hits, data.misses), (1, 1))
+
+        model.get_key_value("owner")
+        model.get_key_value("count")  # Evicts "tasks", the least recently read
+        model.get_key_value("tasks")
+        self.assertEqual((data.hits, data.misses), (1, 4))
+        self.assertIsNone(model.get_key_value("missing"))
+        self.assertEqual(model.get_data(), V1Model(file_path=self.file_path).get_data())
+
+    def test_changes_are_refused(self):
+        model = self.model()
+        with self.assertRaises(ReadOnlyModelError):
+            model.add_key_value("title", "new")
+        with self.assertRaises(ReadOnlyModelError):
+            model.update_key_value(owner="grace")
+        with self.assertRaises(ReadOnlyModelError):
+            model.delete_key_value("owner")
+
+    def test_rewritten_file_is_mapped_again(self):
+        """Test that a refresh follows a writer replacing the file, and that the saved index is reused."""
+        model = self.model()
+        writer = V1Model(file_path=self.file_path)
+        writer.update_key_value(owner="grace")
+        self.assertTrue(model.is_stale())
+        self.assertTrue(model.refresh())
+        self.assertEqual(model.get_key_value("owner"), "grace")
+
+        with patch("models.storage.v1_MmapStorage.build_index") as build:
+            self.assertEqual(self.model().get_key_value("owner"), "grace")
+            build.assert_not_called()
+
+    def test_missing_or_invalid_file_holds_no_data(self):
+        os.remove(self.file_path)
+        self.assertEqual(self.model().get_data(), {})
+        with open(self.file_path, "w", encoding="utf-8") as f:
+            f.write("not json")
+        self.assertEqual(self.model().get_data(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
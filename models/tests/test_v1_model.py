@@ -1,5 +1,8 @@
 from models.error.v1_Error import InvalidKeyValueError
 from models.v1_Model import V1Model
+import multiprocessing
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, mock_open
 
@@ -170,5 +173,42 @@ class TestV1Model(unittest.TestCase):
             model.update_key_value()
 
 
+def increment_counter(file_path, times):
+    for _ in range(times):
+        model = V1Model(file_path=file_path)
+        with model.lock():
+            model.update_key_value(counter=model.get_key_value("counter") + 1)
+
+
+class TestV1ModelLocking(unittest.TestCase):
+    def setUp(self):
+        fd, self.file_path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        V1Model(file_path=self.file_path).overwrite_data(counter=1)
+
+    def tearDown(self):
+        for path in (self.file_path, self.file_path + ".lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_concurrent_processes_do_not_lose_updates(self):
+        """Test that read-modify-write sequences under lock() from several processes are all kept"""
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=increment_counter, args=(self.file_path, 20)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+
+        self.assertEqual(V1Model(file_path=self.file_path).get_key_value("counter"), 81)
+
+    def test_lock_is_reentrant(self):
+        """Test that writing inside lock() does not deadlock on the nested file lock"""
+        model = V1Model(file_path=self.file_path)
+        with model.lock():
+            model.update_key_value(counter=5)
+        self.assertEqual(V1Model(file_path=self.file_path).get_key_value("counter"), 5)
+
+
 if __name__ == "__main__":
     unittest.main()
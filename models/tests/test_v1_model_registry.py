@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from models.storage.v1_Storage import V1JsonStorage
+from models.v1_Model import V1Model
+from models.v1_ModelRegistry import V1ModelRegistry
+
+
+def increment_shared_counter(file_path, times):
+    registry = V1ModelRegistry()
+    for _ in range(times):
+        model = registry.get(file_path)
+        with model.lock():
+            model.update_key_value(counter=model.get_key_value("counter") + 1)
+
+
+def add_own_keys(file_path, name, ready):
+    model = V1ModelRegistry().get(file_path)
+    ready.wait()  # Both processes hold the data as it was before either wrote
+    for index in range(10):
+        model.add_key_value(f"{name}{index}", index + 1)
+
+
+class TestV1ModelRegistry(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.file_path = os.path.join(directory, "tasks_model.json")
+        V1Model(file_path=self.file_path).overwrite_data(counter=1)
+        self.registry = V1ModelRegistry()
+
+    def test_one_shared_instance_per_file(self):
+        """Test that a file's model is built once, whatever the spelling of its path."""
+        model = self.registry.get(self.file_path)
+        with patch.object(V1Model, "read_data_from_file") as read:
+            relative = os.path.relpath(self.file_path)
+            self.assertIs(self.registry.get(relative), model)
+            self.assertIs(self.registry.get(self.file_path), model)
+            read.assert_not_called()
+        self.assertEqual(self.registry.stats(), {"hits": 2, "misses": 1, "refreshes": 0, "invalidations": 0,
+                                                 "models": 1})
+
+    def test_own_writes_do_not_trigger_a_reload(self):
+        """Test that the shared model's own writes, in or out of lock(), leave it fresh."""
+        model = self.registry.get(self.file_path)
+        model.update_key_value(counter=2)
+        with patch.object(V1JsonStorage, "load") as read:
+            with self.registry.get(self.file_path).lock():
+                model.update_key_value(counter=3)
+            self.registry.get(self.file_path)
+            read.assert_not_called()
+        self.assertEqual(self.registry.stats()["refreshes"], 0)
+
+    def test_changed_file_is_reloaded(self):
+        """Test that a write by another instance, as by another process, is picked up on the next get."""
+        model = self.registry.get(self.file_path)
+        V1Model(file_path=self.file_path).update_key_value(counter=42)
+        self.assertTrue(model.is_stale())
+        self.assertIs(self.registry.get(self.file_path), model)
+        self.assertEqual(model.get_key_value("counter"), 42)
+        self.assertEqual(self.registry.stats()["refreshes"], 1)
+
+        os.remove(self.file_path)
+        self.assertEqual(self.registry.get(self.file_path).get_data(), {})
+
+    def test_invalidate(self):
+        """Test that invalidating a file, or everything, builds a new model on the next get."""
+        model = self.registry.get(self.file_path)
+        self.registry.invalidate(self.file_path)
+        self.assertIsNot(self.registry.get(self.file_path), model)
+        self.registry.invalidate()
+        self.assertEqual(self.registry.stats()["models"], 0)
+        self.assertEqual(self.registry.stats()["invalidations"], 2)
+
+    def test_threads_share_the_model(self):
+        """Test that concurrent first gets build a single model."""
+        models = []
+        threads = [threading.Thread(target=lambda: models.append(self.registry.get(self.file_path)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(model) for model in models}), 1)
+        self.assertEqual(self.registry.stats()["misses"], 1)
+
+    def test_processes_sharing_a_file_do_not_lose_updates(self):
+        """Test that shared models of several processes see each other's writes under lock()."""
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=increment_shared_counter, args=(self.file_path, 20)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+        self.assertEqual(self.registry.get(self.file_path).get_key_value("counter"), 81)
+
+    def test_processes_writing_different_keys_lose_none(self):
+        """Test that a write outside lock() keeps the keys another process wrote since the last read."""
+        context = multiprocessing.get_context("fork")
+        ready = context.Barrier(2)
+        workers = [context.Process(target=add_own_keys, args=(self.file_path, name, ready)) for name in "ab"]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+        data = V1Model(file_path=self.file_path).get_data()
+        self.assertEqual(set(data), {"counter"} | {f"{name}{index}" for name in "ab" for index in range(10)})
+
+
+if __name__ == "__main__":
+    unittest.main()
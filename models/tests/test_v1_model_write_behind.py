@@ -0,0 +1,186 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from models.error.v1_Error import ReadOnlyModelError
+from models.storage.v1_MmapStorage import V1MmapStorage
+from models.storage.v1_SqliteStorage import V1SqliteStorage
+from models.storage.v1_Storage import V1JsonStorage
+from models.v1_Model import V1Model
+
+
+def increment_counter(file_path, times):
+    model = V1Model(file_path=file_path, flush_window_ms=50)
+    for _ in range(times):
+        with model.lock():
+            model.update_key_value(counter=model.get_key_value("counter") + 1)
+    model.flush()
+
+
+class TestV1ModelWriteBehind(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.file_path = os.path.join(directory, "tasks_model.json")
+        V1Model(file_path=self.file_path).overwrite_data(counter=1)
+
+    def read_file(self):
+        with open(self.file_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_changes_are_coalesced_into_one_write(self):
+        """Test that changes made within the window are written together, once."""
+        model = V1Model(file_path=self.file_path, flush_window_ms=10_000)
+        with patch.object(V1JsonStorage, "write", wraps=model._storage.write) as write:
+            for value in range(2, 12):
+                model.update_key_value(counter=value)
+            model.add_key_value("total", 10)
+            model.delete_key_value("total")
+            self.assertEqual(model.get_key_value("counter"), 11)
+            self.assertEqual(self.read_file(), {"counter": 1})
+            write.assert_not_called()
+
+            model.flush()
+            write.assert_called_once()
+        self.assertEqual(self.read_file(), {"counter": 11})
+
+    def test_window_expiry_writes(self):
+        """Test that pending changes are written once the window expires, without a flush."""
+        model = V1Model(file_path=self.file_path, flush_window_ms=20)
+        model.update_key_value(counter=2)
+        deadline = time.monotonic() + 5
+        while self.read_file() != {"counter": 2} and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.read_file(), {"counter": 2})
+
+    def test_max_mutations_writes(self):
+        """Test that reaching flush_max_mutations writes at once."""
+        model = V1Model(file_path=self.file_path, flush_window_ms=10_000, flush_max_mutations=3)
+        model.update_key_value(counter=2)
+        model.update_key_value(counter=3)
+        self.assertEqual(self.read_file(), {"counter": 1})
+        model.update_key_value(counter=4)
+        self.assertEqual(self.read_file(), {"counter": 4})
+
+    def test_batch_writes_once_on_exit(self):
+        """Test that batch() groups changes into one write even without write-behind mode."""
+        model = V1Model(file_path=self.file_path)
+        with patch.object(V1JsonStorage, "write", wraps=model._storage.write) as write:
+            with model.batch():
+                model.update_key_value(counter=2)
+                with model.batch():
+                    model.add_key_value("total", 5)
+                self.assertEqual(self.read_file(), {"counter": 1})
+            write.assert_called_once()
+        self.assertEqual(self.read_file(), {"counter": 2, "total": 5})
+
+        model.update_key_value(counter=3)  # Written through again after the batch
+        self.assertEqual(self.read_file()["counter"], 3)
+
+    def test_lock_writes_its_changes_once_before_releasing(self):
+        """Test that the changes of a lock() block are written together when it exits, in write-behind mode too."""
+        model = V1Model(file_path=self.file_path, flush_window_ms=10_000)
+        with patch.object(V1JsonStorage, "write", wraps=model._storage.write) as write:
+            with model.lock():
+                model.update_key_value(counter=2)
+                model.add_key_value("total", 5)
+                write.assert_not_called()
+            write.assert_called_once()
+        self.assertEqual(self.read_file(), {"counter": 2, "total": 5})
+
+    def test_flush_keeps_keys_written_meanwhile(self):
+        """Test that a flush writes over the stored data, keeping what another instance wrote since."""
+        model = V1Model(file_path=self.file_path, flush_window_ms=10_000)
+        model.update_key_value(counter=2)
+        V1Model(file_path=self.file_path).add_key_value("owner", "ada")
+        self.assertTrue(model.flush())
+        self.assertEqual(self.read_file(), {"counter": 2, "owner": "ada"})
+        self.assertEqual(model.get_data(), {"counter": 2, "owner": "ada"})
+
+    def test_failed_flush_keeps_changes_pending(self):
+        """Test that changes a flush could not write stay pending, and the next flush writes them."""
+        model = V1Model(file_path=self.file_path, flush_window_ms=10_000)
+        model.update_key_value(counter=2)
+        with patch.object(V1JsonStorage, "replace", side_effect=OSError("disk full")):
+            self.assertFalse(model.flush())
+        self.assertEqual(self.read_file(), {"counter": 1})
+        self.assertTrue(model.flush())
+        self.assertEqual(self.read_file(), {"counter": 2})
+
+    def test_instances_sharing_a_file_do_not_lose_updates(self):
+        """Test that a write-behind model and another instance of the same file exclude each other under lock()."""
+        models = [V1Model(file_path=self.file_path, flush_window_ms=1), V1Model(file_path=self.file_path)]
+
+        def increment(model):
+            for _ in range(50):
+                with model.lock():
+                    model.update_key_value(counter=model.get_key_value("counter") + 1)
+
+        threads = [threading.Thread(target=increment, args=(model,)) for model in models * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        models[0].flush()
+        self.assertEqual(self.read_file(), {"counter": 201})
+
+    def test_processes_sharing_a_file_do_not_lose_updates(self):
+        """Test that write-behind models of several processes see each other's writes under lock()."""
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=increment_counter, args=(self.file_path, 20)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+        self.assertEqual(V1Model(file_path=self.file_path).get_key_value("counter"), 81)
+
+    def test_threads_sharing_a_model_do_not_lose_updates(self):
+        """Test that threads incrementing under lock() in write-behind mode lose no update."""
+        model = V1Model(file_path=self.file_path, flush_window_ms=1)
+
+        def increment():
+            for _ in range(50):
+                with model.lock():
+                    model.update_key_value(counter=model.get_key_value("counter") + 1)
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        model.flush()
+        self.assertEqual(self.read_file(), {"counter": 201})
+
+    def test_not_persisted_update_is_not_written(self):
+        """Test that update_key_value with persists=False leaves the store alone."""
+        model = V1Model(file_path=self.file_path)
+        with patch.object(V1JsonStorage, "write") as write:
+            model.update_key_value(persists=False, counter=2)
+            write.assert_not_called()
+        self.assertEqual(self.read_file(), {"counter": 1})
+
+    def test_storage_without_data_in_memory_is_refused(self):
+        """Test that write-behind mode requires a storage holding the data in memory."""
+        with self.assertRaises(ValueError):
+            V1Model(file_path=self.file_path + ".db", storage=V1SqliteStorage, flush_window_ms=5)
+
+    def test_read_only_storage_is_refused(self):
+        """Test that write-behind and batch() are refused on a read-only storage, even one holding no data yet."""
+        missing = self.file_path + ".missing"
+        with self.assertRaises(ValueError):
+            V1Model(file_path=missing, storage=V1MmapStorage, flush_window_ms=5)
+        model = V1Model(file_path=missing, storage=V1MmapStorage)
+        with self.assertRaises(ReadOnlyModelError):
+            with model.batch():
+                pass
+        with self.assertRaises(ReadOnlyModelError):
+            model.add_key_value("owner", "ada")
+
+
+if __name__ == "__main__":
+    unittest.main()
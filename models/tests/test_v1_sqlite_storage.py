@@ -0,0 +1,146 @@
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from models.error.v1_Error import InvalidKeyValueError
+from models.storage.v1_SqliteStorage import V1SqliteStorage, main, migrate
+from models.storage.v1_WalStorage import V1WalStorage
+from models.v1_Model import V1Model
+
+
+def increment_sqlite_counter(file_path, times):
+    model = V1Model(file_path=file_path, storage=V1SqliteStorage)
+    for _ in range(times):
+        with model.lock():
+            model.update_key_value(counter=model.get_key_value("counter") + 1)
+
+
+class TestV1SqliteStorage(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.database_path = os.path.join(self.directory, "tasks_model.db")
+
+    def model(self) -> V1Model:
+        model = V1Model(file_path=self.database_path, storage=V1SqliteStorage)
+        self.addCleanup(model._storage.close)
+        return model
+
+    def stored_rows(self) -> dict:
+        with contextlib.closing(sqlite3.connect(self.database_path)) as connection:
+            return dict(connection.execute("SELECT key, value FROM data"))
+
+    def test_one_row_per_key(self):
+        model = self.model()
+        model.add_key_value("tasks", [{"id": 1, "title": "Write tests"}])
+        model.add_key_value("owner", "ada")
+        model.update_key_value(owner="grace")
+        model.delete_key_value("tasks")
+
+        self.assertEqual(self.stored_rows(), {"owner": '"grace"'})
+        self.assertEqual(model.get_key_value("owner"), "grace")
+        self.assertIsNone(model.get_key_value("tasks"))
+        self.assertEqual(model.get_data(), {"owner": "grace"})
+
+    def test_failed_write_changes_nothing(self):
+        model = self.model()
+        model.add_key_value("owner", "ada")
+        with self.assertRaises(InvalidKeyValueError):
+            model.delete_key_value("missing")
+        with self.assertRaises(ValueError):
+            model.add_key_value("owner", "grace")  # Keys must be unique, checked against the table
+        self.assertEqual(self.stored_rows(), {"owner": '"ada"'})
+
+    def test_overwrite_replaces_every_row(self):
+        model = self.model()
+        model.add_key_value("owner", "ada")
+        model.overwrite_data(counter=1, title="new")
+        self.assertEqual(self.model().get_data(), {"counter": 1, "title": "new"})
+
+    def test_instances_see_each_others_writes(self):
+        """Test that reads go to the database, so models sharing it are never stale."""
+        first, second = self.model(), self.model()
+        second.add_key_value("owner", "ada")
+        self.assertFalse(first.is_stale())
+        self.assertEqual(first.get_key_value("owner"), "ada")
+
+    def test_threads_share_a_model(self):
+        model = self.model()
+        errors = []
+
+        def add_keys(thread_number):
+            try:
+                for number in range(20):
+                    model.add_key_value(f"key_{thread_number}_{number}", number + 1)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                model._storage.close()
+
+        threads = [threading.Thread(target=add_keys, args=(number,)) for number in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(model.get_data()), 80)
+
+    def test_concurrent_processes_do_not_lose_updates(self):
+        self.model().add_key_value("counter", 1)
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=increment_sqlite_counter, args=(self.database_path, 20)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+        self.assertEqual(self.model().get_key_value("counter"), 81)
+
+
+class TestMigrate(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.json_path = os.path.join(self.directory, "tasks_model.json")
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump({"tasks": [{"id": 1}], "owner": "ada"}, f)
+
+    def test_migrate_json_file(self):
+        self.assertEqual(migrate(self.json_path), 2)
+        database_path = os.path.join(self.directory, "tasks_model.db")
+        model = V1Model(file_path=database_path, storage=V1SqliteStorage)
+        self.assertEqual(model.get_data(), {"tasks": [{"id": 1}], "owner": "ada"})
+
+        model.add_key_value("extra", "kept")
+        migrate(self.json_path, database_path)
+        self.assertEqual(model.get_key_value("extra"), "kept")
+        migrate(self.json_path, database_path, replace=True)
+        self.assertIsNone(model.get_key_value("extra"))
+        model._storage.close()
+
+    def test_migrate_replays_write_ahead_log(self):
+        model = V1Model(file_path=self.json_path, storage=V1WalStorage)
+        model.update_key_value(owner="grace")
+        model._storage.close()
+
+        database_path = os.path.join(self.directory, "migrated.db")
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            main([self.json_path, "--database", database_path])
+        self.assertIn("Imported 2 key(s)", output.getvalue())
+        storage = V1SqliteStorage(database_path)
+        self.assertEqual(storage.load()["owner"], "grace")
+        storage.close()
+
+    def test_missing_file_fails(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as raised:
+            main([os.path.join(self.directory, "missing.json")])
+        self.assertEqual(raised.exception.code, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
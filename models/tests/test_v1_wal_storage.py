@@ -0,0 +1,157 @@
+from functools import partial
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from models.error.v1_Error import InvalidKeyValueError
+from models.storage.v1_WalStorage import V1WalStorage
+from models.v1_Model import V1Model
+
+
+def increment_wal_counter(file_path, times):
+    for _ in range(times):
+        model = V1Model(file_path=file_path, storage=V1WalStorage)
+        with model.lock():
+            model.update_key_value(counter=model.get_key_value("counter") + 1)
+        model._storage.close()
+
+
+class TestV1WalStorage(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.file_path = os.path.join(directory, "tasks_model.json")
+        self.wal_path = self.file_path + ".wal"
+        with open(self.file_path, "w", encoding="utf-8") as f:
+            json.dump({"counter": 1, "tasks": []}, f)
+
+    def model(self, **options) -> V1Model:
+        model = V1Model(file_path=self.file_path, storage=partial(V1WalStorage, **options))
+        self.addCleanup(model._storage.close)
+        return model
+
+    def read_snapshot(self) -> dict:
+        with open(self.file_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_changes_are_appended_not_rewritten(self):
+        """Test that writes leave the snapshot alone and append one record each."""
+        model = self.model()
+        self.assertEqual(model.get_data(), {"counter": 1, "tasks": []})
+        model.update_key_value(counter=2)
+        model.add_key_value("owner", "ada")
+        model.delete_key_value("tasks")
+
+        self.assertEqual(self.read_snapshot(), {"counter": 1, "tasks": []})
+        with open(self.wal_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records, [{"set": {"counter": 2}}, {"set": {"owner": "ada"}}, {"del": ["tasks"]}])
+        self.assertEqual(self.model().get_data(), {"counter": 2, "owner": "ada"})
+
+    def test_deleting_a_missing_key_writes_nothing(self):
+        model = self.model()
+        with self.assertRaises(InvalidKeyValueError):
+            model.delete_key_value("missing")
+        self.assertEqual(os.path.getsize(self.wal_path), 0)
+
+    def test_log_is_compacted_into_the_snapshot(self):
+        """Test that the log is folded into the snapshot once it outgrows it, and on overwrite."""
+        model = self.model(compact_min_bytes=64)
+        for number in range(1, 11):
+            model.update_key_value(counter=number)
+        self.assertLess(os.path.getsize(self.wal_path), 64)
+        self.assertEqual(self.model().get_key_value("counter"), 10)
+
+        model.overwrite_data(total=100)
+        self.assertEqual(self.read_snapshot(), {"total": 100})
+        self.assertEqual(os.path.getsize(self.wal_path), 0)
+        self.assertEqual(V1Model(file_path=self.file_path).get_data(), {"total": 100})
+
+    def test_torn_last_record_is_cut_off(self):
+        """Test that a record left half-written by a crash is ignored, and overwritten by the next append."""
+        self.model().update_key_value(counter=2)
+        with open(self.wal_path, "ab") as f:
+            f.write(b'{"set": {"counter": 3')
+
+        model = self.model()
+        self.assertEqual(model.get_key_value("counter"), 2)
+        model.update_key_value(counter=4)
+        self.assertEqual(self.model().get_key_value("counter"), 4)
+
+    def test_replaying_records_already_in_the_snapshot(self):
+        """Test that a crash between writing the snapshot and emptying the log loses nothing."""
+        model = self.model()
+        model.update_key_value(counter=2)
+        model.add_key_value("owner", "ada")
+        model.delete_key_value("owner")
+        with open(self.file_path, "w", encoding="utf-8") as f:
+            json.dump(model.get_data(), f)
+
+        self.assertEqual(self.model().get_data(), {"counter": 2, "tasks": []})
+
+    def test_appends_of_other_instances_are_replayed(self):
+        """Test that records appended by another process are picked up, on refresh and before writing."""
+        first, second = self.model(), self.model()
+        second.update_key_value(counter=2)
+        self.assertTrue(first.is_stale())
+        self.assertTrue(first.refresh())
+        self.assertEqual(first.get_key_value("counter"), 2)
+        self.assertFalse(first.is_stale())
+
+        second.add_key_value("owner", "ada")
+        first.update_key_value(counter=3)
+        self.assertEqual(first.get_data(), {"counter": 3, "tasks": [], "owner": "ada"})
+
+        first.overwrite_data(total=4)  # Compacted: the other instance reloads everything
+        self.assertTrue(second.refresh())
+        self.assertEqual(second.get_data(), {"total": 4})
+
+    def test_data_emptied_by_another_instance_stays_empty(self):
+        """Test that a write after another instance replaced the data with nothing does not bring the old keys back."""
+        first, second = V1WalStorage(self.file_path), V1WalStorage(self.file_path)
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        data = first.load()
+        second.load()
+        second.replace({})
+        self.assertEqual(first.write(data, {"owner": "ada"}), {"owner": "ada"})
+        reader = V1WalStorage(self.file_path)
+        self.addCleanup(reader.close)
+        self.assertEqual(reader.load(), {"owner": "ada"})
+
+    def test_concurrent_processes_do_not_lose_updates(self):
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=increment_wal_counter, args=(self.file_path, 20)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+        self.assertEqual(self.model().get_key_value("counter"), 81)
+
+    def test_fsync_policies(self):
+        with patch("models.storage.v1_WalStorage.os.fsync") as fsync:
+            self.model(fsync="never").update_key_value(counter=2)
+            fsync.assert_not_called()
+            self.model(fsync="always").update_key_value(counter=3)
+            fsync.assert_called_once()
+
+        with patch("models.storage.v1_WalStorage.os.fsync") as fsync:
+            model = self.model(fsync="batch", fsync_interval_ms=20)
+            for number in range(1, 6):
+                model.update_key_value(counter=number)
+            fsync.assert_not_called()
+            deadline = time.monotonic() + 5
+            while not fsync.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+            fsync.assert_called_once()
+
+        with self.assertRaises(ValueError):
+            V1WalStorage(self.file_path, fsync="sometimes")
+
+
+if __name__ == "__main__":
+    unittest.main()
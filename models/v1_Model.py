@@ -1,14 +1,37 @@
-import json
-from json.decoder import JSONDecodeError
-import logging
-from models.error.v1_Error import InvalidKeyValueError
+import atexit
+from contextlib import contextmanager
+from locks.v1_FileLock import atomic_write, file_lock
+from loggings.v1_Logging import error_logger
+from models.error.v1_Error import InvalidKeyValueError, ReadOnlyModelError
+from models.storage.v1_Storage import StorageFactory, V1JsonStorage, V1Storage
 from models.validation.v1_Validation import CheckAllValidation, V1Validation
 import os
 import pickle
-from typing import Callable, Dict, Any
+import threading
+from typing import Callable, Dict, Any, Iterable, Iterator, Optional, Set
+import weakref
 
-# Set up basic logging configuration
-logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+# Models in write-behind mode, flushed when the interpreter exits
+_write_behind_models: "weakref.WeakSet[V1Model]" = weakref.WeakSet()
+
+
+def flush_write_behind_models() -> None:
+    """Writes the pending changes of every model in write-behind mode, e.g. before a process exits."""
+    for model in list(_write_behind_models):
+        model.flush()
+
+
+def _forget_pending_writes() -> None:
+    """Drops the pending changes inherited by a forked child: they belong to the parent, which writes them."""
+    for model in list(_write_behind_models):
+        model._mutex = threading.RLock()
+        model._batch_depth = model._mutations = 0
+        model._pending, model._pending_deleted, model._flush_timer = {}, set(), None
+
+
+atexit.register(flush_write_behind_models)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pending_writes)
 
 
 class V1Model:
@@ -18,13 +41,45 @@ class V1Model:
     """
     DEFAULT_FILE_PATH = "model_state.pkl"
 
-    def __init__(self, file_path="v1_model.json"):
+    def __init__(self, file_path="v1_model.json", storage: Optional[StorageFactory] = None,
+                 flush_window_ms: Optional[float] = None, flush_max_mutations: int = 100):
         """
         Initializes the model by reading existing data from the file and initializing validation rules.
+
+        Args:
+            file_path (str): The data file.
+            storage (Optional[StorageFactory]): Builds the storage engine of the data file from its path,
+                e.g. V1WalStorage, V1SqliteStorage or functools.partial(V1WalStorage, fsync="always").
+                Defaults to V1JsonStorage, which rewrites the whole JSON file on every change.
+            flush_window_ms (Optional[float]): Turns on write-behind: changes are applied in memory at once
+                and written together, in a single write, at most this long after the first of them.
+                By default every change is written before the call returns.
+            flush_max_mutations (int): In write-behind mode, write as soon as this many changes are pending.
+
+        Raises:
+            ValueError: If write-behind is asked of a read-only storage, or of one not holding the data
+                in memory, e.g. SQLite.
         """
         self.file_path = self.DEFAULT_FILE_PATH
         self.json_file_path = file_path
+        self._storage: V1Storage = (storage or V1JsonStorage)(file_path)
+        self.flush_window = flush_window_ms / 1000 if flush_window_ms is not None else None
+        self.flush_max_mutations = flush_max_mutations
+        self._mutex = threading.RLock()  # Keeps the threads sharing the model apart in lock(), batch() and flush()
+        self._batch_depth = 0
+        self._pending: Dict[str, Any] = {}  # Changes applied in memory but not written yet
+        self._pending_deleted: Set[str] = set()
+        self._mutations = 0
+        self._flush_timer: Optional[threading.Timer] = None
         self.read_data_from_file()
+        if self.flush_window is not None:
+            if self._storage.read_only:
+                raise ValueError(f"{type(self._storage).__name__} is read-only, so it cannot be used in "
+                                 f"write-behind mode.")
+            if not isinstance(self._data, dict):
+                raise ValueError(f"{type(self._storage).__name__} does not hold the data in memory, "
+                                 f"so it cannot be used in write-behind mode.")
+            _write_behind_models.add(self)
         self._validation_rules: Dict[str, Dict[str, Any]] = self._load_or_initialize_custom_validation_rules()
 
     def _atomic_save(self) -> None:
@@ -35,14 +90,10 @@ class V1Model:
         Raises:
             RuntimeError: If the save operation fails.
         """
-        temp_file = self.file_path + ".tmp"
         try:
-            with open(temp_file, "wb") as f:
-                pickle.dump(self._validation_rules, f)
-            os.replace(temp_file, self.file_path)
+            with file_lock(self.file_path):
+                atomic_write(self.file_path, pickle.dumps(self._validation_rules))
         except Exception as e:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
             raise RuntimeError(f"Failed to save Model state: {e}")
 
     def _load_or_initialize_custom_validation_rules(self) -> Dict[str, Any]:
@@ -58,7 +109,7 @@ class V1Model:
         """
         if os.path.exists(self.file_path):
             try:
-                with open(self.file_path, "rb") as f:
+                with file_lock(self.file_path, shared=True), open(self.file_path, "rb") as f:
                     return pickle.load(f)
             except Exception as e:
                 raise RuntimeError(f"Failed to load Model state from {self.file_path}: {e}")
@@ -171,29 +222,175 @@ class V1Model:
 
     def read_data_from_file(self) -> None:
         """
-        Reads data from a JSON file and stores it in memory.
+        Reads data from the storage, by default the JSON file, and stores it in memory.
         If the file does not exist or is invalid, an empty dictionary is used.
         """
-        try:
-            with open(self.json_file_path, mode='r', encoding="utf-8") as fp:
-                self._data = json.load(fp)
-        except FileNotFoundError:
-            self._data = {}
-        except JSONDecodeError:
-            self._data = {}
+        self._data = self._storage.load()
 
     def write_data_to_file(self) -> None:
         """
-        Writes the current in-memory data to a JSON file.
-        A temporary file is used to avoid data corruption during the writing process.
+        Writes the current in-memory data to the storage, replacing what it held.
+        The default JSON file is written to a temporary file first to avoid data corruption,
+        and the file lock keeps concurrent server processes from interleaving writes.
         """
-        try:
-            temp_file = "v1_model.tmp"
-            with open(temp_file, mode='w', encoding="utf-8") as fp:
-                json.dump(self._data, fp)
-            os.replace(temp_file, self.json_file_path)
-        except Exception as e:
-            logging.error("Failed to write data: %s", e)
+        with self._mutex:
+            try:
+                self._data = self._storage.replace(self._data)
+            except ReadOnlyModelError:
+                raise
+            except Exception as e:
+                error_logger.error("Failed to write data: %s", e)
+                return
+            self._pending, self._pending_deleted, self._mutations = {}, set(), 0  # Written along
+
+    def _write_changes(self, changes: Dict[str, Any], deleted: Iterable[str] = ()) -> None:
+        """
+        Applies changes to the in-memory data and persists them. The cost depends on the storage:
+        the default JSON file is rewritten whole, V1WalStorage appends just the change. In
+        write-behind mode or within batch() or lock(), the changes are only queued for the next flush.
+
+        Raises:
+            ReadOnlyModelError: If the storage is read-only.
+        """
+        with self._mutex:
+            if not self._defers_writes():
+                try:
+                    self._data = self._storage.write(self._data, changes, deleted)
+                except ReadOnlyModelError:
+                    raise
+                except Exception as e:
+                    error_logger.error("Failed to write data: %s", e)
+                return
+
+            self._apply(self._data, changes, deleted)
+            self._pending.update(changes)
+            self._pending_deleted.difference_update(changes)
+            for key in deleted:
+                self._pending.pop(key, None)
+                self._pending_deleted.add(key)
+            self._mutations += 1
+
+            if self._batch_depth:
+                return  # Written when the batch or lock() block ends
+            if self._mutations >= self.flush_max_mutations:
+                self.flush()
+            elif self._flush_timer is None or not self._flush_timer.is_alive():
+                self._flush_timer = threading.Timer(self.flush_window, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    @staticmethod
+    def _apply(data: Dict[str, Any], changes: Dict[str, Any], deleted: Iterable[str]) -> None:
+        data.update(changes)
+        for key in deleted:
+            data.pop(key, None)
+
+    def _defers_writes(self) -> bool:
+        """Whether changes are queued rather than written at once: in write-behind mode, batch() or lock()."""
+        return ((self.flush_window is not None or self._batch_depth > 0) and not self._storage.read_only
+                and isinstance(self._data, dict))
+
+    def flush(self) -> bool:
+        """
+        Writes the changes pending in write-behind mode or in a batch, if any, in a single write,
+        and returns once they are stored. Call it before answering a request that must not be lost
+        in a crash.
+
+        The write is made under the file lock, over the data as currently stored: keys changed
+        meanwhile by other processes or instances are kept, unless this model changed them too.
+
+        Returns:
+            bool: True if nothing is left pending. On a failure, which is logged, the changes
+                stay pending and the next flush retries them.
+        """
+        with self._mutex:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending and not self._pending_deleted:
+                return True
+
+            changes, deleted = self._pending, self._pending_deleted
+            try:
+                with file_lock(self.json_file_path):
+                    data = self._storage.refresh(self._data)
+                    if data is not None:  # Written by someone else meanwhile: redo the changes over it
+                        self._apply(data, changes, deleted)
+                        self._data = data
+                    self._data = self._storage.write(self._data, changes, deleted)
+            except Exception as e:
+                error_logger.error("Failed to write data: %s", e)
+                return False
+            self._pending, self._pending_deleted, self._mutations = {}, set(), 0
+            return True
+
+    def is_stale(self) -> bool:
+        """Whether the data file changed since this model last read or wrote it, e.g. by another process."""
+        return self._storage.is_stale()
+
+    def refresh(self) -> bool:
+        """
+        Re-reads the data file if it changed since this model last read or wrote it.
+        Changes pending in write-behind mode are written first.
+
+        Returns:
+            bool: True if the data was re-read.
+        """
+        with self._mutex:
+            self.flush()
+            data = self._storage.refresh(self._data)
+            if data is None:
+                return False
+            self._data = data
+            return True
+
+    @contextmanager
+    def lock(self) -> Iterator["V1Model"]:
+        """
+        Holds an exclusive lock on the data file for a read-modify-write sequence.
+        The data is re-read on entry if the file changed, so changes written by other
+        processes or other instances are not lost. The changes made in the block are
+        written in a single write before the lock is released, in write-behind mode too.
+
+        Example:
+            with model.lock():
+                tasks = model.get_key_value("tasks") or []
+                model.update_key_value(tasks=[*tasks, task])
+        """
+        with self._mutex, file_lock(self.json_file_path):
+            self.refresh()
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.flush()
+
+    @contextmanager
+    def batch(self) -> Iterator["V1Model"]:
+        """
+        Groups the changes made in the block into a single write, made when the block exits, together
+        with any changes pending in write-behind mode: once it exits, they are all stored.
+
+        Example:
+            with model.batch():
+                model.update_key_value(tasks=tasks)
+                model.add_key_value("last_import", now)
+
+        Raises:
+            ReadOnlyModelError: If the storage is read-only.
+        """
+        if self._storage.read_only:
+            raise ReadOnlyModelError(f"{self.json_file_path} is opened read-only.")
+        with self._mutex:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.flush()
 
     def get_data(self) -> Dict[str, Any]:
         """
@@ -268,11 +465,12 @@ class V1Model:
 
         try:
             if persists:
-                self._data[key_data] = value_data
-                self.write_data_to_file()
+                self._write_changes({key_data: value_data})
             return True
+        except ReadOnlyModelError:
+            raise
         except Exception as e:
-            logging.error("Failed to add key '%s' with value '%s': %s", key_data, value_data, e)
+            error_logger.error("Failed to add key '%s' with value '%s': %s", key_data, value_data, e)
             return False
 
     def update_key_value(self, allowNone: bool = False, persists: bool = True, **update_dict: Dict[str, Any]) -> None:
@@ -286,10 +484,12 @@ class V1Model:
         
         Raises:
             InvalidKeyValueError: If the update dictionary is empty.
+            ReadOnlyModelError: If the storage is read-only.
         """
         if not update_dict:
             raise InvalidKeyValueError("No key-value data to update.")
 
+        changes = {}
         for key_data, value_data in update_dict.items():
             CheckAllValidation.check_all_key_validation(key_data, self._data, update=True)
             CheckAllValidation.check_all_value_validation(value_data, allowNone)
@@ -305,9 +505,10 @@ class V1Model:
             self.validate(key_data, value_data)
 
             if persists:
-                self._data[key_data] = value_data
+                changes[key_data] = value_data
 
-        self.write_data_to_file()
+        if changes:
+            self._write_changes(changes)
 
     def get_key_value(self, key_data: str) -> Any:
             """
@@ -318,6 +519,8 @@ class V1Model:
             
             Returns:
                 Optional[Any]: The value associated with the key, or None if the key doesn't exist.
+                    It is the stored object itself, which a shared model hands to every request:
+                    build a new value and save it with update_key_value instead of changing it in place.
             
             Raises:
                 InvalidKeyValueError: If the key is invalid (empty, None, or not a valid identifier).
@@ -342,16 +545,15 @@ class V1Model:
         Raises:
             InvalidKeyValueError: If the key is invalid (empty, None, or not a valid identifier).
             InvalidKeyValueError: If the key doesn't exist in the data.
+            ReadOnlyModelError: If the storage is read-only.
         """
         if not key_data:
             raise InvalidKeyValueError("Key or value cannot be None or empty")
         if not isinstance(key_data, str) or not key_data.isidentifier():
             raise InvalidKeyValueError("Keys must be valid identifiers. Also, spaces should be replaced with underscores.")
-        try:
-            if persists:
-                del self._data[key_data]
-                self.write_data_to_file()
-            return True
-        except KeyError as e:
-            logging.error("Key '%s' not found for deletion: %s", key_data, e)
-            raise InvalidKeyValueError(f"Key '{key_data}' does not exist.") from e
\ No newline at end of file
+        if key_data not in self._data:
+            error_logger.error("Key '%s' not found for deletion", key_data)
+            raise InvalidKeyValueError(f"Key '{key_data}' does not exist.")
+        if persists:
+            self._write_changes({}, deleted=[key_data])
+        return True
\ No newline at end of file
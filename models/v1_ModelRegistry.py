@@ -0,0 +1,101 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Type
+from models.storage.v1_Storage import StorageFactory
+from models.v1_Model import V1Model
+
+
+class V1ModelRegistry:
+    """
+    Process-wide shared V1Model instances, one per data file.
+
+    Building a V1Model parses its whole data file and unpickles the validation rules, so a
+    controller building one per request pays for the size of the data on every request. The
+    registry builds each model once and, on every later get, only stats the file: the model
+    is re-read when the file's inode, mtime or size changed since the model last read or wrote
+    it, i.e. when another process or instance wrote it.
+
+    A shared model is used by every request at once. Change stored values by saving new ones
+    with update_key_value, never in place, and wrap read-modify-write sequences in model.lock().
+    """
+
+    def __init__(self, model_class: Type[V1Model] = V1Model):
+        """
+        Args:
+            model_class (Type[V1Model]): The class of the models built, called with file_path.
+        """
+        self.model_class = model_class
+        self._models: Dict[str, V1Model] = {}
+        self._lock = threading.Lock()  # Guards _models and refreshes; never held on the hit path
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+        self._invalidations = 0
+
+    def get(self, file_path: str, storage: Optional[StorageFactory] = None, **options: Any) -> V1Model:
+        """
+        Returns the shared model of a data file, building it on first use and re-reading it if the file changed.
+
+        Args:
+            file_path (str): The model's JSON data file. Relative paths are resolved against the working directory.
+            storage (Optional[StorageFactory]): The storage engine of the model, see V1Model. Only used
+                to build the model: pass the same one on every get of a file.
+            **options (Any): Other options of the model, e.g. flush_window_ms, likewise only used to build it.
+
+        Returns:
+            V1Model: The shared instance for the file.
+        """
+        key = os.path.abspath(file_path)
+        model = self._models.get(key)
+        if model is not None and not model.is_stale():
+            self._hits += 1
+            return model
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                if storage is not None:
+                    options["storage"] = storage
+                model = self._models[key] = self.model_class(file_path=file_path, **options)
+                self._misses += 1
+            elif model.refresh():
+                self._refreshes += 1
+            else:
+                self._hits += 1  # Refreshed by another thread meanwhile
+        return model
+
+    def invalidate(self, file_path: Optional[str] = None) -> None:
+        """
+        Drops the shared model of a file, or every model, so the next get builds it anew.
+
+        Needed after changing what the file signature does not cover, e.g. the validation rules
+        registered by another process.
+        """
+        with self._lock:
+            if file_path is None:
+                self._invalidations += len(self._models)
+                self._models.clear()
+            elif self._models.pop(os.path.abspath(file_path), None) is not None:
+                self._invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the registry's counters.
+
+        Returns:
+            Dict[str, int]: "hits" (shared model returned as it was), "misses" (model built),
+                "refreshes" (model re-read after its file changed), "invalidations" and "models" held.
+                Hits are counted without a lock, so heavy concurrency may undercount them slightly.
+        """
+        return {"hits": self._hits, "misses": self._misses, "refreshes": self._refreshes,
+                "invalidations": self._invalidations, "models": len(self._models)}
+
+
+# The registry of the process
+registry = V1ModelRegistry()
+
+
+def get_shared_model(file_path: str = "v1_model.json", storage: Optional[StorageFactory] = None,
+                     **options: Any) -> V1Model:
+    """Returns the process-wide shared model of a data file. See V1ModelRegistry."""
+    return registry.get(file_path, storage, **options)
@@ -17,22 +17,24 @@ class TaskController(V1AbstractController):
             return {"error": "title is required"}
 
         db = get_model()
-        tasks = db.get_key_value("tasks") or []
-
-        new_id = max((t["id"] for t in tasks), default=0) + 1
-        task = {
-            "id": new_id,
-            "title": title,
-            "description": kwargs.get("description", ""),
-            "status": kwargs.get("status", "pending"),
-            "priority": kwargs.get("priority", "low"),
-        }
-
-        tasks.append(task)
-        if new_id == 1:
-            db.add_key_value("tasks", tasks)
-        else:
-            db.update_key_value(tasks=tasks)
+        # Hold the data file lock so concurrent server processes do not lose each other's tasks
+        with db.lock():
+            tasks = db.get_key_value("tasks") or []
+
+            new_id = max((t["id"] for t in tasks), default=0) + 1
+            task = {
+                "id": new_id,
+                "title": title,
+                "description": kwargs.get("description", ""),
+                "status": kwargs.get("status", "pending"),
+                "priority": kwargs.get("priority", "low"),
+            }
+
+            tasks = [*tasks, task]  # The model is shared: save a new list rather than changing the stored one
+            if new_id == 1:
+                db.add_key_value("tasks", tasks)
+            else:
+                db.update_key_value(tasks=tasks)
 
         return {"message": f"Task '{title}' created", "task": task}
 
@@ -47,19 +49,20 @@ class TaskController(V1AbstractController):
             return {"error": f"PUT requires all fields: {missing}"}
 
         db = get_model()
-        tasks = db.get_key_value("tasks") or []
-
-        for i, task in enumerate(tasks):
-            if str(task["id"]) == str(task_id):
-                tasks[i] = {
-                    "id": task["id"],
-                    "title": kwargs["title"],
-                    "description": kwargs["description"],
-                    "status": kwargs["status"],
-                    "priority": kwargs["priority"],
-                }
-                db.update_key_value(tasks=tasks)
-                return {"message": "Task fully updated", "task": tasks[i]}
+        with db.lock():
+            tasks = db.get_key_value("tasks") or []
+
+            for i, task in enumerate(tasks):
+                if str(task["id"]) == str(task_id):
+                    updated = {
+                        "id": task["id"],
+                        "title": kwargs["title"],
+                        "description": kwargs["description"],
+                        "status": kwargs["status"],
+                        "priority": kwargs["priority"],
+                    }
+                    db.update_key_value(tasks=[*tasks[:i], updated, *tasks[i + 1:]])
+                    return {"message": "Task fully updated", "task": updated}
 
         return {"error": f"Task with id {task_id} not found"}
 
@@ -69,16 +72,15 @@ class TaskController(V1AbstractController):
             return {"error": "id is required"}
 
         db = get_model()
-        tasks = db.get_key_value("tasks") or []
+        with db.lock():
+            tasks = db.get_key_value("tasks") or []
 
-        for i, task in enumerate(tasks):
-            if str(task["id"]) == str(task_id):
-                allowed = ["title", "description", "status", "priority"]
-                for field in allowed:
-                    if field in kwargs:
-                        tasks[i][field] = kwargs[field]
-                db.update_key_value(tasks=tasks)
-                return {"message": "Task partially updated", "task": tasks[i]}
+            for i, task in enumerate(tasks):
+                if str(task["id"]) == str(task_id):
+                    allowed = ["title", "description", "status", "priority"]
+                    updated = {**task, **{field: kwargs[field] for field in allowed if field in kwargs}}
+                    db.update_key_value(tasks=[*tasks[:i], updated, *tasks[i + 1:]])
+                    return {"message": "Task partially updated", "task": updated}
 
         return {"error": f"Task with id {task_id} not found"}
 
@@ -88,13 +90,14 @@ class TaskController(V1AbstractController):
             return {"error": "id is required"}
 
         db = get_model()
-        tasks = db.get_key_value("tasks") or []
+        with db.lock():
+            tasks = db.get_key_value("tasks") or []
 
-        original_count = len(tasks)
-        tasks = [t for t in tasks if str(t["id"]) != str(task_id)]
+            original_count = len(tasks)
+            tasks = [t for t in tasks if str(t["id"]) != str(task_id)]
 
-        if len(tasks) == original_count:
-            return {"error": f"Task with id {task_id} not found"}
+            if len(tasks) == original_count:
+                return {"error": f"Task with id {task_id} not found"}
 
-        db.update_key_value(tasks=tasks)
+            db.update_key_value(tasks=tasks)
         return {"message": f"Task {task_id} deleted"}
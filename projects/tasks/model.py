@@ -1,4 +1,6 @@
 from models.v1_Model import V1Model
+from models.v1_ModelRegistry import get_shared_model
 
-def get_model():
-    return V1Model(file_path="tasks_model.json")
+def get_model() -> V1Model:
+    # One instance shared by every request, re-read only when the file changes
+    return get_shared_model("tasks_model.json")
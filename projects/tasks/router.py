@@ -3,8 +3,15 @@ from projects.tasks.view import TaskJsonView
 from routers.v1_Router import V1Router
 
 route = V1Router()
-route.add_route("/tasks",        TaskController, "list_tasks",   TaskJsonView, "GET")
-route.add_route("/tasks/create", TaskController, "create_task",  TaskJsonView, "POST")
-route.add_route("/tasks/update", TaskController, "update_task",  TaskJsonView, "PUT")
-route.add_route("/tasks/patch",  TaskController, "patch_task",   TaskJsonView, "PATCH")
-route.add_route("/tasks/delete", TaskController, "delete_task",  TaskJsonView, "DELETE")
+# Register every route first and write the route manifest once
+with route.batch():
+    route.add_route("/tasks",        TaskController, "list_tasks",   TaskJsonView, "GET")
+    route.add_route("/tasks/create", TaskController, "create_task",  TaskJsonView, "POST")
+    route.add_route("/tasks/update", TaskController, "update_task",  TaskJsonView, "PUT")
+    route.add_route("/tasks/patch",  TaskController, "patch_task",   TaskJsonView, "PATCH")
+    route.add_route("/tasks/delete", TaskController, "delete_task",  TaskJsonView, "DELETE")
+
+    # RESTful routes, with the task id in the path
+    route.add_route("/tasks/{id:int}", TaskController, "update_task", TaskJsonView, "PUT")
+    route.add_route("/tasks/{id:int}", TaskController, "patch_task",  TaskJsonView, "PATCH")
+    route.add_route("/tasks/{id:int}", TaskController, "delete_task", TaskJsonView, "DELETE")
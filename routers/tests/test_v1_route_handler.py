@@ -0,0 +1,72 @@
+import threading
+import unittest
+from controllers.v1_Controller import V1AbstractController
+from routers.v1_RouteHandler import V1RouteHandler
+from views.v1_View import V1BaseView
+
+
+class CountingController(V1AbstractController):
+    instances = 0
+
+    def __init__(self):
+        CountingController.instances += 1
+        self.calls = 0
+
+    def count(self, **kwargs):
+        self.calls += 1
+        return {"calls": self.calls, **kwargs}
+
+
+class CountingView(V1BaseView):
+    instances = 0
+
+    def __init__(self):
+        CountingView.instances += 1
+        self.content_type = "application/json"
+
+    def render(self, **kwargs):
+        return self.render_json(kwargs["controller_response"])
+
+
+class TestV1RouteHandler(unittest.TestCase):
+    def setUp(self):
+        CountingController.instances = CountingView.instances = 0
+
+    def test_request_lifecycle_builds_new_instances(self):
+        """Test that the default lifecycle builds a controller and a view for every call."""
+        handler = V1RouteHandler(CountingController, "count", CountingView)
+        self.assertEqual(handler(id=3), ('{"calls": 1, "id": 3}', "application/json"))
+        self.assertEqual(handler()[0], '{"calls": 1}')
+        self.assertEqual((CountingController.instances, CountingView.instances), (2, 2))
+
+    def test_singleton_lifecycle_shares_instances(self):
+        """Test that a singleton builds its instances once, even when first used concurrently."""
+        handler = V1RouteHandler(CountingController, "count", CountingView, "singleton")
+        threads = [threading.Thread(target=handler) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(handler()[0], '{"calls": 9}')
+        self.assertEqual((CountingController.instances, CountingView.instances), (1, 1))
+
+    def test_thread_lifecycle_builds_instances_per_thread(self):
+        """Test that each thread gets its own instances, reused for its later calls."""
+        handler = V1RouteHandler(CountingController, "count", CountingView, "thread")
+        results = []
+        threads = [threading.Thread(target=lambda: results.append([handler()[0], handler()[0]])) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [['{"calls": 1}', '{"calls": 2}']] * 3)
+        self.assertEqual(CountingController.instances, 3)
+
+    def test_unknown_lifecycle_is_rejected(self):
+        """Test that an unsupported lifecycle raises ValueError."""
+        with self.assertRaises(ValueError):
+            V1RouteHandler(CountingController, "count", CountingView, "session")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import uuid
+from routers.v1_RouteTable import V1RouteTable, parse_route_pattern
+
+
+class TestParseRoutePattern(unittest.TestCase):
+    def test_segments_and_parameters(self):
+        """Test that literal segments and typed parameters are told apart."""
+        self.assertEqual(parse_route_pattern("/tasks/{id:int}/notes/{slug}"),
+                         [("tasks", None), ("id", "int"), ("notes", None), ("slug", "str")])
+
+    def test_malformed_patterns_are_rejected(self):
+        """Test that bad names, unknown converters and misplaced parameters raise ValueError."""
+        for route in ("tasks", "/tasks/{id:number}", "/tasks/{1id}", "/tasks/id-{id}",
+                      "/files/{rest:path}/edit", "/a/{id}/b/{id:int}"):
+            with self.assertRaises(ValueError, msg=route):
+                parse_route_pattern(route)
+
+
+class TestV1RouteTable(unittest.TestCase):
+    def setUp(self):
+        self.table = V1RouteTable({
+            "/tasks": {"GET": "list", "POST": "create"},
+            "/tasks/new": {"GET": "form"},
+            "/tasks/{id:int}": {"PUT": "update", "DELETE": "delete"},
+            "/tasks/{slug}": {"GET": "by_slug"},
+            "/tasks/{id:int}/notes/{note_id:uuid}": {"GET": "note"},
+            "/prices/{amount:float}": {"GET": "price"},
+            "/files/{file_path:path}": {"GET": "file"},
+        })
+
+    def test_static_routes_are_matched_exactly(self):
+        """Test that a route without parameters is found by plain lookup, with every method."""
+        self.assertEqual(self.table.match("/tasks"), ({"GET": "list", "POST": "create"}, {}))
+        self.assertIsNone(self.table.match("/tasks/"))
+        self.assertIsNone(self.table.match("/unknown"))
+
+    def test_parameters_are_converted(self):
+        """Test that typed parameters are converted and passed back by name."""
+        note_id = uuid.uuid4()
+        self.assertEqual(self.table.match("/tasks/42"), ({"PUT": "update", "DELETE": "delete"}, {"id": 42}))
+        self.assertEqual(self.table.match(f"/tasks/7/notes/{note_id}")[1], {"id": 7, "note_id": note_id})
+        self.assertEqual(self.table.match("/prices/9.99")[1], {"amount": 9.99})
+        self.assertEqual(self.table.match("/files/css/docs.css")[1], {"file_path": "css/docs.css"})
+
+    def test_literal_segments_win_and_failed_conversions_fall_through(self):
+        """Test that literals beat parameters and a value an int cannot take is tried as a str."""
+        self.assertEqual(self.table.match("/tasks/new")[0], {"GET": "form"})
+        self.assertEqual(self.table.match("/tasks/-1")[1], {"slug": "-1"})
+        self.assertEqual(self.table.match("/tasks/write-docs"), ({"GET": "by_slug"}, {"slug": "write-docs"}))
+        self.assertIsNone(self.table.match("/tasks/7/notes/not-a-uuid"))
+        self.assertIsNone(self.table.match("/files/"))
+
+    def test_thousands_of_routes(self):
+        """Test that a large table still matches the right route."""
+        table = V1RouteTable({f"/projects{i}/items/{{id:int}}": {"GET": i} for i in range(5000)})
+        self.assertEqual(table.match("/projects4321/items/5"), ({"GET": 4321}, {"id": 5}))
+
+
+if __name__ == "__main__":
+    unittest.main()
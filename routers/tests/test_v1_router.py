@@ -1,7 +1,12 @@
+import json
 import os
 import pickle
+import tempfile
 import unittest
-from routers.v1_Router import V1Router
+from unittest.mock import patch
+from loggings import v1_Metrics
+from loggings.v1_Metrics import configure_metrics
+from routers.v1_Router import MethodNotAllowedError, V1Router
 from controllers.v1_Controller import V1AbstractController
 from views.v1_View import V1BaseView
 
@@ -110,5 +115,152 @@ class TestV1Router(unittest.TestCase):
         self.assertIn("/search_student", new_router.routes)
 
 
+class IsolatedRouterTestCase(unittest.TestCase):
+    state_file_name = "router_state.pkl"
+
+    def setUp(self):
+        """Start from an empty route map, saved to a temporary file, and restore the shared one afterwards."""
+        saved_routes, saved_table = V1Router._shared_routes, V1Router._route_table
+        self.addCleanup(setattr, V1Router, "_route_table", saved_table)
+        self.addCleanup(setattr, V1Router, "_shared_routes", saved_routes)
+        V1Router._shared_routes, V1Router._route_table = {}, None
+
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        self.router = V1Router(file_path=os.path.join(state_dir.name, self.state_file_name))
+
+    def reload(self) -> V1Router:
+        """Returns a router loading the saved state, as a freshly started server would."""
+        V1Router._shared_routes, V1Router._route_table = {}, None
+        return V1Router(file_path=self.router.file_path)
+
+
+class TestV1RouterDispatch(IsolatedRouterTestCase):
+
+    def test_several_methods_on_one_route(self):
+        """Test that GET and POST on the same URL no longer overwrite each other."""
+        self.router.add_route("/students", StudentController, "search_student", StudentView, "GET")
+        self.router.add_route("/students", StudentController, "add_student", StudentView, "POST")
+        self.assertIn("Searched student", self.router.route("/students", method="GET")[0])
+        self.assertIn("Added student", self.router.route("/students", method="POST")[0])
+
+    def test_path_parameters_are_passed_to_the_action(self):
+        """Test that converted path parameters reach the action and override body fields."""
+        self.router.add_route("/students/{id:int}", StudentController, "add_student", StudentView, "PUT")
+        body, _ = self.router.route("/students/12?verbose=1", method="PUT", id="body", name="Ada")
+        self.assertIn("'id': 12", body)
+        self.assertIn("'name': 'Ada'", body)
+        with self.assertRaises(ValueError):
+            self.router.route("/students/twelve", method="PUT")
+
+    def test_unsupported_method_raises_method_not_allowed(self):
+        """Test that a known route with another method raises MethodNotAllowedError listing the allowed ones."""
+        self.router.add_route("/students/{id:int}", StudentController, "add_student", StudentView, "PUT")
+        self.router.add_route("/students/{id:int}", StudentController, "search_student", StudentView, "GET")
+        with self.assertRaises(MethodNotAllowedError) as raised:
+            self.router.route("/students/3", method="DELETE")
+        self.assertEqual(raised.exception.allowed_methods, ["GET", "PUT"])
+
+    def test_singleton_lifecycle_reuses_the_controller(self):
+        """Test that a singleton route builds its controller once and an unknown lifecycle is refused."""
+        self.router.add_route("/students", StudentController, "search_student", StudentView, "GET", lifecycle="singleton")
+        first = self.router.route("/students")[0]
+        self.assertEqual(self.router.route("/students")[0], first)
+        handler = self.router.get_route_table().match("/students")[0]["GET"]
+        self.assertEqual(handler.lifecycle, "singleton")
+        self.assertIs(handler._get_instances(), handler._get_instances())
+        with self.assertRaises(ValueError):
+            self.router.add_route("/students", StudentController, "add_student", StudentView, "POST", lifecycle="session")
+
+    def test_metrics_label_requests_with_the_route_pattern(self):
+        """Test that dispatching records its phases and labels the request with the pattern, not the path."""
+        self.addCleanup(setattr, v1_Metrics, "metrics", v1_Metrics.metrics)
+        configure_metrics()
+        self.router.add_route("/students/{id:int}", StudentController, "add_student", StudentView, "PUT")
+        self.router.route("/students/7", method="PUT")
+        self.assertEqual(v1_Metrics.metrics.take_route(), "/students/{id:int}")
+        with self.assertRaises(MethodNotAllowedError):
+            self.router.route("/students/7", method="GET")
+        self.assertEqual(v1_Metrics.metrics.take_route(), "/students/{id:int}")
+        phases = v1_Metrics.metrics.collect().phases
+        self.assertEqual(phases["routing"].count, 2)
+        self.assertEqual(phases["controller"].count, 1)
+        self.assertEqual(phases["render"].count, 1)
+
+    def test_invalid_pattern_is_rejected(self):
+        """Test that a malformed route pattern is refused when the route is added."""
+        with self.assertRaises(ValueError):
+            self.router.add_route("/students/{id:integer}", StudentController, "add_student", StudentView)
+
+    def test_state_saved_with_one_method_per_route_is_migrated(self):
+        """Test that a state file mapping a route to a single entry still loads."""
+        entry = (StudentController, "search_student", StudentView, "GET")
+        with open(self.router.file_path, "wb") as f:
+            pickle.dump({"/search": entry}, f)
+        router = self.reload()
+        self.assertEqual(router.routes, {"/search": {"GET": (*entry, "request")}})
+        self.assertIn("Searched student", router.route("/search")[0])
+
+
+class TestV1RouterManifest(IsolatedRouterTestCase):
+    state_file_name = "router_manifest.json"
+
+    def test_routes_are_saved_as_import_paths(self):
+        """Test that the manifest refers to controllers and views by dotted path."""
+        self.router.add_route("/students/{id:int}", StudentController, "search_student", StudentView, "GET", "thread")
+        with open(self.router.file_path) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest, {"version": 1, "routes": {"/students/{id:int}": {"GET": {
+            "controller": f"{__name__}:StudentController", "action": "search_student",
+            "view": f"{__name__}:StudentView", "lifecycle": "thread"}}}})
+
+    def test_classes_are_imported_on_first_request(self):
+        """Test that loading a manifest keeps import paths until the route is requested."""
+        self.router.add_route("/students/{id:int}", StudentController, "search_student", StudentView, "GET")
+        router = self.reload()
+        self.assertEqual(router.routes["/students/{id:int}"]["GET"][0], f"{__name__}:StudentController")
+
+        self.assertIn("'id': 4", router.route("/students/4")[0])
+        handler = router.get_route_table().match("/students/4")[0]["GET"]
+        self.assertIs(handler.controller_class, StudentController)
+        self.assertIs(handler.view_class, StudentView)
+
+    def test_resolve_routes_imports_every_class(self):
+        """Test that resolve_routes imports the classes of every route, and reports a missing action."""
+        self.router.add_route("/students/{id:int}", StudentController, "search_student", StudentView, "GET")
+        router = self.reload()
+        handler = router.resolve_routes().match("/students/4")[0]["GET"]
+        self.assertIs(handler.controller_class, StudentController)
+        self.assertIs(handler.view_class, StudentView)
+
+        router.routes["/students/{id:int}"]["GET"] = (f"{__name__}:StudentController", "missing_action",
+                                                      f"{__name__}:StudentView", "GET", "request")
+        V1Router._route_table = None
+        with self.assertRaises(AttributeError):
+            router.resolve_routes()
+
+    def test_batch_saves_once(self):
+        """Test that routes added in a batch are saved once at the end, and not if the block fails."""
+        with patch.object(V1Router, "_atomic_save", autospec=True) as save:
+            with self.router.batch():
+                self.router.add_route("/search", StudentController, "search_student", StudentView)
+                self.router.add_route("/add", StudentController, "add_student", StudentView, "POST")
+                save.assert_not_called()
+            save.assert_called_once_with(self.router)
+
+            with self.assertRaises(RuntimeError), self.router.batch():
+                self.router.add_route("/edit", StudentController, "add_student", StudentView, "PUT")
+                raise RuntimeError("registration failed")
+            save.assert_called_once()
+
+    def test_class_without_import_path_is_rejected(self):
+        """Test that a class the manifest could not import back is refused when the route is added."""
+        class LocalView(StudentView):
+            pass
+
+        with self.assertRaises(ValueError):
+            self.router.add_route("/local", StudentController, "search_student", LocalView)
+
+
 if __name__ == "__main__":
     unittest.main()
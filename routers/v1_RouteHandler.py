@@ -0,0 +1,148 @@
+from controllers.v1_Controller import V1AbstractController
+import importlib
+from loggings import v1_Metrics
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional, Tuple, Type, Union
+from views.v1_View import V1BaseView
+
+# How long the controller and view instances of a route live:
+# "request"   - new instances for every request (the default)
+# "thread"    - one pair per worker thread, reused by every request that thread handles
+# "singleton" - one pair per process, shared by every request; both must then be thread-safe
+LIFECYCLES = ("request", "thread", "singleton")
+
+
+def get_dotted_path(cls: type) -> str:
+    """
+    Returns the import path of a class, as "package.module:QualifiedName".
+
+    Raises:
+        ValueError: If the class cannot be imported by that path, e.g. it is defined in a function or in __main__.
+    """
+    if "<locals>" in cls.__qualname__ or cls.__module__ == "__main__":
+        raise ValueError(f"Class '{cls.__qualname__}' cannot be imported from a route manifest; "
+                         f"define it at the top level of an importable module.")
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def import_dotted_path(dotted_path: str) -> type:
+    """
+    Imports a class from a "package.module:QualifiedName" path.
+
+    Raises:
+        ImportError: If the module or the class cannot be found.
+    """
+    module_name, _, qualname = dotted_path.partition(":")
+    obj = importlib.import_module(module_name)
+    try:
+        for name in qualname.split("."):
+            obj = getattr(obj, name)
+    except AttributeError:
+        raise ImportError(f"'{qualname}' not found in module '{module_name}'.") from None
+    return obj
+
+
+class V1RouteHandler:
+    """
+    Runs the controller action and view of one route and HTTP method.
+
+    The action is looked up once, and with the "thread" and "singleton" lifecycles the
+    controller and view are built once and reused, so controllers holding expensive
+    resources (e.g. a loaded V1Model) keep them warm between requests. Instances are
+    built on first use, so a preforked worker builds its own.
+
+    The controller and view may be given as "package.module:ClassName" paths, as loaded from
+    a route manifest, in which case their modules are imported on the first request, or by resolve.
+    """
+    __slots__ = ("controller_class", "action_name", "view_class", "lifecycle", "route", "_local", "_lock",
+                 "_instances")
+
+    def __init__(self, controller_class: Union[Type[V1AbstractController], str], action_name: str,
+                 view_class: Union[Type[V1BaseView], str], lifecycle: str = "request", route: str = ""):
+        """
+        Args:
+            controller_class (Union[Type[V1AbstractController], str]): The controller class or its dotted path.
+            action_name (str): The name of the action method.
+            view_class (Union[Type[V1BaseView], str]): The view class rendering the action's result, or its dotted path.
+            lifecycle (str): One of LIFECYCLES. Defaults to "request".
+            route (str): The route pattern the handler is registered for, used to label its metrics.
+
+        Raises:
+            ValueError: If the lifecycle is unknown.
+        """
+        if lifecycle not in LIFECYCLES:
+            raise ValueError(f"Lifecycle '{lifecycle}' is not supported. Supported lifecycles are: {', '.join(LIFECYCLES)}")
+        self.controller_class = controller_class
+        self.action_name = action_name
+        self.view_class = view_class
+        self.lifecycle = lifecycle
+        self.route = route
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._instances: Optional[Tuple[Callable[..., Any], V1BaseView]] = None
+
+    def resolve(self) -> None:
+        """
+        Imports the controller and view given as dotted paths, and checks that the action exists.
+
+        Raises:
+            ImportError: If a class cannot be imported.
+            AttributeError: If the controller has no such action.
+        """
+        if isinstance(self.controller_class, str):
+            self.controller_class = import_dotted_path(self.controller_class)
+        if isinstance(self.view_class, str):
+            self.view_class = import_dotted_path(self.view_class)
+        if not callable(getattr(self.controller_class, self.action_name, None)):
+            raise AttributeError(f"Controller '{self.controller_class.__qualname__}' has no action "
+                                 f"'{self.action_name}' (route '{self.route}').")
+
+    def _create_instances(self) -> Tuple[Callable[..., Any], V1BaseView]:
+        """Builds a controller and a view, returning the bound action and the view."""
+        if isinstance(self.controller_class, str) or isinstance(self.view_class, str):
+            self.resolve()
+        return getattr(self.controller_class(), self.action_name), self.view_class()
+
+    def _get_instances(self) -> Tuple[Callable[..., Any], V1BaseView]:
+        """Returns the bound action and view for this request, according to the lifecycle."""
+        if self.lifecycle == "singleton":
+            instances = self._instances
+            if instances is None:
+                with self._lock:
+                    if self._instances is None:
+                        self._instances = self._create_instances()
+                    instances = self._instances
+            return instances
+
+        if self.lifecycle == "thread":
+            instances = getattr(self._local, "instances", None)
+            if instances is None:
+                instances = self._local.instances = self._create_instances()
+            return instances
+
+        return self._create_instances()
+
+    def __call__(self, **kwargs: Any) -> Tuple[Union[str, Iterable[str]], str]:
+        """
+        Runs the action with kwargs and renders its result.
+
+        Args:
+            **kwargs (Any): Data to pass to the action as **kwargs.
+
+        Returns:
+            Tuple[Union[str, Iterable[str]], str]: The rendered result and the view's content type.
+        """
+        action_method, view_instance = self._get_instances()
+        metrics = v1_Metrics.metrics
+        if metrics is None:
+            controller_response = action_method(**kwargs)
+            return view_instance.render(controller_response=controller_response), view_instance.content_type
+
+        started = time.perf_counter()
+        controller_response = action_method(**kwargs)
+        rendered = time.perf_counter()
+        metrics.observe_phase("controller", rendered - started)
+        body = view_instance.render(controller_response=controller_response)
+        metrics.observe_phase("render", time.perf_counter() - rendered)
+        return body, view_instance.content_type
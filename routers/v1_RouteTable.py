@@ -0,0 +1,165 @@
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+import uuid
+
+
+def _convert_str(segment: str) -> str:
+    if not segment:
+        raise ValueError("Empty path segment")
+    return segment
+
+
+def _convert_int(segment: str) -> int:
+    if not segment.isdigit():  # Rejects signs, spaces and "1_000", which int() would accept
+        raise ValueError(f"'{segment}' is not an integer")
+    return int(segment)
+
+
+# Path parameter converters: {name:converter} in a route. "path" matches the rest of the URL.
+CONVERTERS: Dict[str, Callable[[str], Any]] = {
+    "str": _convert_str,
+    "int": _convert_int,
+    "float": float,
+    "uuid": uuid.UUID,
+    "path": _convert_str,
+}
+
+
+def parse_route_pattern(route: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Splits a route into its segments.
+
+    Args:
+        route (str): The route, e.g. "/tasks/{id:int}".
+
+    Returns:
+        List[Tuple[str, Optional[str]]]: For each segment, its text and None, or for a
+            {name:converter} segment the parameter name and its converter.
+
+    Raises:
+        ValueError: If the route does not start with "/", a parameter is malformed, repeated
+            or uses an unknown converter, or a {name:path} parameter is not the last segment.
+    """
+    if not route.startswith("/"):
+        raise ValueError(f"Route '{route}' must start with '/'.")
+
+    segments: List[Tuple[str, Optional[str]]] = []
+    parts = route[1:].split("/")
+    for index, part in enumerate(parts):
+        if not (part.startswith("{") and part.endswith("}")):
+            if "{" in part or "}" in part:
+                raise ValueError(f"Route '{route}': a parameter must be a whole path segment, got '{part}'.")
+            segments.append((part, None))
+            continue
+
+        name, _, converter = part[1:-1].partition(":")
+        converter = converter or "str"
+        if not name.isidentifier():
+            raise ValueError(f"Route '{route}': '{name}' is not a valid parameter name.")
+        if converter not in CONVERTERS:
+            raise ValueError(f"Route '{route}': unknown converter '{converter}'. "
+                             f"Available converters are: {', '.join(CONVERTERS)}")
+        if converter == "path" and index != len(parts) - 1:
+            raise ValueError(f"Route '{route}': a path parameter must be the last segment.")
+        if any(converter_name is not None and segment == name for segment, converter_name in segments):
+            raise ValueError(f"Route '{route}': parameter '{name}' is repeated.")
+        segments.append((name, converter))
+    return segments
+
+
+def is_static_route(route: str) -> bool:
+    """Whether a route has no path parameters and can be matched by a plain lookup."""
+    return "{" not in route
+
+
+class _RouteNode:
+    """A node of the parameter trie: one path segment."""
+    __slots__ = ("static", "params", "handlers")
+
+    def __init__(self):
+        self.static: Dict[str, "_RouteNode"] = {}
+        self.params: List[Tuple[str, str, "_RouteNode"]] = []  # (name, converter, child) in registration order
+        self.handlers: Optional[Mapping[str, Any]] = None
+
+
+class V1RouteTable:
+    """
+    A compiled, read-only dispatcher for a route map.
+
+    Routes without parameters are matched with one dict lookup. Routes with parameters are
+    stored in a trie of path segments, in which literal segments are tried before parameters,
+    so a lookup costs O(number of segments) rather than O(number of routes).
+    """
+
+    def __init__(self, routes: Mapping[str, Mapping[str, Any]]):
+        """
+        Args:
+            routes (Mapping[str, Mapping[str, Any]]): Route pattern -> HTTP method -> handler.
+        """
+        self.routes = routes  # The route map the table was compiled from
+        self._static: Dict[str, Mapping[str, Any]] = {}
+        self._root = _RouteNode()
+        for route, handlers in routes.items():
+            if is_static_route(route):
+                self._static[route] = handlers
+                continue
+
+            node = self._root
+            for text, converter in parse_route_pattern(route):
+                if converter is None:
+                    node = node.static.setdefault(text, _RouteNode())
+                    continue
+                for name, existing_converter, child in node.params:
+                    if (name, existing_converter) == (text, converter):
+                        node = child
+                        break
+                else:
+                    child = _RouteNode()
+                    node.params.append((text, converter, child))
+                    node = child
+            node.handlers = handlers
+
+    def match(self, path: str) -> Optional[Tuple[Mapping[str, Any], Dict[str, Any]]]:
+        """
+        Finds the route matching a request path.
+
+        Args:
+            path (str): The request path, without query string.
+
+        Returns:
+            Optional[Tuple[Mapping[str, Any], Dict[str, Any]]]: The handlers of the route by HTTP
+                method and the converted path parameters, or None if no route matches.
+        """
+        handlers = self._static.get(path)
+        if handlers is not None:
+            return handlers, {}
+        if not path.startswith("/") or not (self._root.static or self._root.params):
+            return None
+        return self._match(self._root, path[1:].split("/"), 0)
+
+    def _match(self, node: _RouteNode, segments: List[str],
+               index: int) -> Optional[Tuple[Mapping[str, Any], Dict[str, Any]]]:
+        if index == len(segments):
+            return (node.handlers, {}) if node.handlers is not None else None
+
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._match(child, segments, index + 1)
+            if found is not None:
+                return found
+
+        for name, converter, child in node.params:
+            if converter == "path":
+                remainder = "/".join(segments[index:])
+                if remainder and child.handlers is not None:
+                    return child.handlers, {name: remainder}
+                continue
+            try:
+                value = CONVERTERS[converter](segment)
+            except ValueError:
+                continue
+            found = self._match(child, segments, index + 1)
+            if found is not None:
+                found[1][name] = value
+                return found
+        return None
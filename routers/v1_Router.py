@@ -1,46 +1,164 @@
 from controllers.v1_Controller import V1AbstractController
+from contextlib import contextmanager
 import inspect
+import json
+from loggings import v1_Metrics
+from loggings.v1_Logging import get_logger
+from locks.v1_FileLock import atomic_write, file_lock
 import os
 import pickle
-from typing import Any, Dict, Optional, Tuple, Type
+from routers.v1_RouteHandler import LIFECYCLES, V1RouteHandler, get_dotted_path
+from routers.v1_RouteTable import V1RouteTable, parse_route_pattern
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
 from views.v1_View import V1BaseView
 
+logger = get_logger("router")
+
+# (controller class, action name, view class, HTTP method, lifecycle). Routes loaded from a
+# manifest hold "package.module:ClassName" paths instead of classes until they are resolved.
+RouteEntry = Tuple[Union[Type[V1AbstractController], str], str, Union[Type[V1BaseView], str], str, str]
+
+MANIFEST_VERSION = 1
+
+
+class MethodNotAllowedError(ValueError):
+    """
+    Exception raised when a route exists but does not support the requested HTTP method.
+
+    The methods it does support are in allowed_methods, for the Allow header of a 405 response.
+    Inherits from ValueError, which an unknown route raises.
+    """
+    def __init__(self, message: str, allowed_methods: List[str]):
+        super().__init__(message)
+        self.allowed_methods = allowed_methods
+
 
 class V1Router:
-    DEFAULT_FILE_PATH = "router_state.pkl"
-    _shared_routes: Dict[str, Tuple[Type[V1AbstractController], str, Type[V1BaseView], str]] = {}
+    """
+    Maps URLs and HTTP methods to controller actions and views.
+
+    Routes are saved to a JSON manifest of dotted class paths, so loading them imports no
+    controller or view module; each is imported when its route is first requested. A file
+    path ending in ".pkl" keeps the pickled state format of earlier versions instead.
+    """
+    DEFAULT_FILE_PATH = "router_manifest.json"
+    # Route pattern -> HTTP method -> route entry
+    _shared_routes: Dict[str, Dict[str, RouteEntry]] = {}
+    # Compiled from _shared_routes, with a V1RouteHandler per entry, on first dispatch and
+    # dropped whenever routes change
+    _route_table: Optional[V1RouteTable] = None
+    # Nesting depth of batch() blocks, during which add_route does not save
+    _batch_depth = 0
 
     def __init__(self, file_path: Optional[str] = None):
         self.file_path = file_path or self.DEFAULT_FILE_PATH
         # Load routes into the shared state if not already loaded
         if not V1Router._shared_routes:
             V1Router._shared_routes = self._load_or_initialize_routes()
+            V1Router._route_table = None
 
     @property
-    def routes(self) -> Dict[str, Tuple[Type[V1AbstractController], str, Type[V1BaseView], str]]:
+    def routes(self) -> Dict[str, Dict[str, RouteEntry]]:
         """Provides access to the shared routes."""
         return V1Router._shared_routes
 
+    @staticmethod
+    def get_route_table() -> V1RouteTable:
+        """
+        Returns the compiled dispatcher for the current routes, compiling it if needed.
+
+        Call it at startup to compile the dispatch table before the first request. Compiling imports
+        nothing: each route's controller and view are imported on its first request, or by resolve_routes.
+        """
+        route_table = V1Router._route_table
+        if route_table is None:
+            route_table = V1Router._route_table = V1RouteTable({
+                route: {method: V1RouteHandler(controller_class, action_name, view_class, lifecycle, route)
+                        for method, (controller_class, action_name, view_class, _, lifecycle) in entries.items()}
+                for route, entries in V1Router._shared_routes.items()
+            })
+        return route_table
+
+    @staticmethod
+    def resolve_routes() -> V1RouteTable:
+        """
+        Compiles the dispatch table and imports every route's controller and view, so that a missing
+        module, class or action fails at startup rather than on the route's first request.
+
+        Raises:
+            ImportError: If a controller or view cannot be imported.
+            AttributeError: If a controller has no such action.
+        """
+        route_table = V1Router.get_route_table()
+        for handlers in route_table.routes.values():
+            for handler in handlers.values():
+                handler.resolve()
+        return route_table
+
+    def _is_pickle(self) -> bool:
+        """Whether the state file uses the legacy pickle format rather than a JSON manifest."""
+        return self.file_path.endswith(".pkl")
+
     def _atomic_save(self):
         """Saves the Router object state atomically to the file."""
-        temp_file = self.file_path + ".tmp"
         try:
-            with open(temp_file, "wb") as f:
-                pickle.dump(V1Router._shared_routes, f)
-            os.replace(temp_file, self.file_path)
+            if self._is_pickle():
+                data = pickle.dumps(V1Router._shared_routes)
+            else:
+                data = json.dumps(self._to_manifest(V1Router._shared_routes), indent=2).encode("utf-8")
+            with file_lock(self.file_path):
+                atomic_write(self.file_path, data)
         except Exception as e:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
             raise RuntimeError(f"Failed to save Router state: {e}")
 
-    def _load_or_initialize_routes(self) -> Dict[str, Tuple[Type[V1AbstractController], str, Type[V1BaseView], str]]:
+    @staticmethod
+    def _to_manifest(routes: Dict[str, Dict[str, RouteEntry]]) -> Dict[str, Any]:
+        """Converts routes to the JSON manifest structure, with classes as dotted paths."""
+        return {
+            "version": MANIFEST_VERSION,
+            "routes": {
+                route: {
+                    method: {
+                        "controller": controller if isinstance(controller, str) else get_dotted_path(controller),
+                        "action": action_name,
+                        "view": view if isinstance(view, str) else get_dotted_path(view),
+                        "lifecycle": lifecycle,
+                    }
+                    for method, (controller, action_name, view, _, lifecycle) in entries.items()
+                }
+                for route, entries in routes.items()
+            },
+        }
+
+    @staticmethod
+    def _from_manifest(manifest: Dict[str, Any]) -> Dict[str, Dict[str, RouteEntry]]:
+        """Reads routes from the JSON manifest structure, leaving classes as dotted paths."""
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported route manifest version: {manifest.get('version')}")
+        return {
+            route: {
+                method: (entry["controller"], entry["action"], entry["view"], method, entry.get("lifecycle", "request"))
+                for method, entry in entries.items()
+            }
+            for route, entries in manifest["routes"].items()
+        }
+
+    def _load_or_initialize_routes(self) -> Dict[str, Dict[str, RouteEntry]]:
         """Loads the Router state from file or initializes a new one if the file does not exist."""
         if os.path.exists(self.file_path):
             try:
-                with open(self.file_path, "rb") as f:
-                    return pickle.load(f)
+                with file_lock(self.file_path, shared=True), open(self.file_path, "rb") as f:
+                    if not self._is_pickle():
+                        return self._from_manifest(json.load(f))
+                    routes = pickle.load(f)
             except Exception as e:
                 raise RuntimeError(f"Failed to load Router state from {self.file_path}: {e}")
+            # State saved before several methods per route were supported maps a route to one entry
+            routes = {route: {entry[3]: entry} if isinstance(entry, tuple) else entry for route, entry in routes.items()}
+            # and state saved before lifecycles has no lifecycle, which was then always "request"
+            return {route: {method: entry if len(entry) == 5 else (*entry, "request") for method, entry in entries.items()}
+                    for route, entries in routes.items()}
         return {}
 
     def validate_controller_action(self, controller_class: Type[V1AbstractController], action_name: str):
@@ -81,73 +199,124 @@ class V1Router:
                     f"Invalid parameter: '{name}'."
                 )
 
-    def add_route(self, route: str, controller_class: Type[V1AbstractController], action_name: str, view_class: Type[V1BaseView], http_method: str = "GET"):
+    def add_route(self, route: str, controller_class: Type[V1AbstractController], action_name: str, view_class: Type[V1BaseView], http_method: str = "GET",
+                  lifecycle: str = "request"):
         """
         Adds a route to the router.
 
+        A route may contain path parameters, written {name} or {name:converter} with one of the
+        converters str (default), int, float, uuid or path (the rest of the URL, last segment only),
+        e.g. "/tasks/{id:int}". Their converted values are passed to the action as keyword
+        arguments. Each HTTP method of a route can have its own action and view.
+
+        The lifecycle decides how long the controller and view instances live: "request" builds
+        them for every request, "thread" once per worker thread and "singleton" once per process,
+        in which case they are shared between concurrent requests and must be thread-safe.
+
         Args:
             route (str): The route URL.
             controller_class (Any): The controller class.
             action_name (str): The name of the action method.
             view_class (Type[V1BaseView]): The view class to render the result.
             http_method (str): The HTTP method (e.g., "GET", "POST"). Defaults to "GET".
+            lifecycle (str): "request", "thread" or "singleton". Defaults to "request".
 
         Raises:
-            ValueError: If the http_method is not allowed.
+            ValueError: If the http_method or lifecycle is not allowed, the route pattern is malformed or
+                a class cannot be referred to by its import path in the route manifest.
         """
         ALLOWED_METHODS = {"GET", "POST", "PUT", "DELETE", "PATCH"}
         if http_method.upper() not in ALLOWED_METHODS:
             raise ValueError(f"HTTP method '{http_method}' is not allowed. Allowed methods are: {', '.join(ALLOWED_METHODS)}")
 
+        if lifecycle not in LIFECYCLES:
+            raise ValueError(f"Lifecycle '{lifecycle}' is not allowed. Allowed lifecycles are: {', '.join(LIFECYCLES)}")
+
+        parse_route_pattern(route)
+
         self.validate_controller_action(controller_class, action_name)
 
         # Ensure the view is a subclass of V1BaseView
         if not issubclass(view_class, V1BaseView):
             raise TypeError(f"View class '{view_class.__name__}' must inherit from 'V1BaseView'.")
 
-        # Store the route, controller, action, view, and method
-        V1Router._shared_routes[route] = (controller_class, action_name, view_class, http_method.upper())
-        self._atomic_save()
-        print(f"[V1_ROUTER] Added route: {http_method.upper()} {route}", flush=True) # Debug print
+        # A manifest refers to classes by import path, so they must be importable by it
+        if not self._is_pickle():
+            get_dotted_path(controller_class)
+            get_dotted_path(view_class)
+
+        # Store the route, controller, action, view, method and lifecycle
+        V1Router._shared_routes.setdefault(route, {})[http_method.upper()] = (
+            controller_class, action_name, view_class, http_method.upper(), lifecycle)
+        V1Router._route_table = None
+        if not V1Router._batch_depth:
+            self._atomic_save()
+        logger.debug("Added route: %s %s", http_method.upper(), route)
 
-    def route(self, url: str, method: str = "GET", **kwargs: Any) -> Tuple[str, str]:
+    @contextmanager
+    def batch(self) -> Iterator["V1Router"]:
+        """
+        Registers several routes with a single save.
+
+        add_route calls inside the block only update the routes in memory; the state file is
+        written once when the block exits, and not at all if it raises.
+
+        Yields:
+            V1Router: This router.
+        """
+        V1Router._batch_depth += 1
+        try:
+            yield self
+        finally:
+            V1Router._batch_depth -= 1
+        if not V1Router._batch_depth:
+            self._atomic_save()
+
+    def route(self, url: str, method: str = "GET", **kwargs: Any) -> Tuple[Union[str, Iterable[str]], str]:
         """
         Routes a request to the appropriate controller action and renders the result with the associated view.
 
         Args:
-            url (str): The URL of the route.
+            url (str): The URL of the route. A query string is ignored.
             method (str): The HTTP method (default: "GET").
-            **kwargs (Any): Data to pass to the action as **kwargs.
+            **kwargs (Any): Data to pass to the action as **kwargs. Path parameters take precedence.
 
         Returns:
-            Tuple[str, str]: The final result rendered by the view and the content type from the view instance.
+            Tuple[Union[str, Iterable[str]], str]: The final result rendered by the view (an iterator if the
+                view streams its output) and the content type from the view instance.
 
         Raises:
-            ValueError: If the route is not found or the method is not supported.
+            MethodNotAllowedError: If the route exists but not for this method.
+            ValueError: If the route is not found.
         """
-        print(f"[V1_ROUTER] Attempting to route URL: {url}, Method: {method}", flush=True) # Debug print
-        print(f"[V1_ROUTER] Registered routes: {self.routes.keys()}", flush=True) # Debug print
-        if url in V1Router._shared_routes:
-            controller_class, action_name, view_class, stored_method = V1Router._shared_routes[url]
-
-            if stored_method != method.upper():
-                print(f"[V1_ROUTER] Method mismatch for {url}: Expected {stored_method}, Got {method.upper()}", flush=True) # Debug print
-                raise ValueError(f"Route '{url}' does not support HTTP method '{method.upper()}'. Expected '{stored_method}'.")
-
-            controller_instance = controller_class()
-            action_method = getattr(controller_instance, action_name)
+        logger.debug("Attempting to route URL: %s, Method: %s", url, method)
+        metrics = v1_Metrics.metrics
+        started = time.perf_counter()
+        match = self.get_route_table().match(url.split("?", 1)[0])
+        if metrics is not None:
+            metrics.observe_phase("routing", time.perf_counter() - started)
+        if match is not None:
+            handlers, path_params = match
+            handler = handlers.get(method.upper())
+            if metrics is not None:
+                # Labels the request with its route pattern, never the raw path with its parameters
+                metrics.set_route((handler or next(iter(handlers.values()))).route)
 
-            # The method check is now done when adding the route and when routing
-            controller_response = action_method(**kwargs)
+            if handler is None:
+                allowed_methods = sorted(handlers)
+                logger.debug("Method mismatch for %s: Expected %s, Got %s", url, allowed_methods, method.upper())
+                raise MethodNotAllowedError(
+                    f"Route '{url}' does not support HTTP method '{method.upper()}'. "
+                    f"Expected one of '{', '.join(allowed_methods)}'.", allowed_methods)
 
-            # Render the controller response using the associated view
-            view_instance = view_class()
-            return view_instance.render(controller_response=controller_response), view_instance.content_type
+            # Run the action and render its response with the associated view
+            return handler(**{**kwargs, **path_params})
         else:
-            print(f"[V1_ROUTER] Route '{url}' not found in registered routes.", flush=True) # Debug print
+            logger.debug("Route '%s' not found in registered routes.", url)
             raise ValueError(f"Route '{url}' not found.")
 
     def clear_routes(self) -> None:
         """Clears all routes and saves the empty state."""
         V1Router._shared_routes.clear()
+        V1Router._route_table = None
         self._atomic_save()
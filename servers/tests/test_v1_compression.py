@@ -0,0 +1,77 @@
+import gzip
+import json
+import unittest
+from unittest.mock import patch
+from servers import v1_Compression
+from servers.v1_Compression import choose_encoding, compress_response
+from servers.v1_HttpServer import handle_request
+from servers.v1_RequestParser import HttpRequest, RequestHeaders
+
+
+class TaskListRouter:
+    def route(self, url, method="GET", **kwargs):
+        return json.dumps([{"id": i, "title": f"Task {i}", "status": "pending"} for i in range(200)]), "application/json"
+
+
+class TestCompressResponse(unittest.TestCase):
+    def setUp(self):
+        self.body = json.dumps([{"id": i, "title": f"Task {i}"} for i in range(100)]).encode("utf-8")
+
+    def test_large_text_is_compressed_for_clients_accepting_it(self):
+        """Test that an allowed type over the threshold is gzipped when the client accepts gzip."""
+        with patch.dict(v1_Compression.ENCODERS, {"gzip": v1_Compression.gzip_compress}, clear=True):
+            body, headers = compress_response(self.body, "application/json", "gzip, deflate")
+        self.assertEqual(headers, {"Vary": "Accept-Encoding", "Content-Encoding": "gzip"})
+        self.assertEqual(gzip.decompress(body), self.body)
+        self.assertLess(len(body), len(self.body))
+
+    def test_uncompressed_cases_still_vary(self):
+        """Test that small bodies and clients without gzip get the body as is, with Vary."""
+        for body, accept_encoding in ((b"{}", "gzip"), (self.body, None), (self.body, "gzip;q=0")):
+            self.assertEqual(compress_response(body, "application/json", accept_encoding),
+                             (body, {"Vary": "Accept-Encoding"}))
+
+    def test_types_outside_the_allowlist_are_left_alone(self):
+        """Test that images and other binary types are never compressed nor marked as varying."""
+        self.assertEqual(compress_response(self.body, "image/png", "gzip"), (self.body, {}))
+
+    def test_configuration(self):
+        """Test that the threshold, allowlist and on/off switch are honoured."""
+        self.addCleanup(v1_Compression.configure_compression, True, v1_Compression.COMPRESSION_MIN_SIZE,
+                        v1_Compression.COMPRESSION_LEVEL, v1_Compression.COMPRESSIBLE_TYPES)
+
+        v1_Compression.configure_compression(min_size=len(self.body) + 1)
+        self.assertNotIn("Content-Encoding", compress_response(self.body, "application/json", "gzip")[1])
+
+        v1_Compression.configure_compression(min_size=0, content_types=[" image/png "])
+        self.assertIn("Content-Encoding", compress_response(self.body, "image/png", "gzip")[1])
+        self.assertEqual(compress_response(self.body, "application/json", "gzip"), (self.body, {}))
+
+        v1_Compression.configure_compression(enabled=False)
+        self.assertEqual(compress_response(self.body, "image/png", "gzip"), (self.body, {}))
+
+    def test_choose_encoding(self):
+        """Test that q-values are honoured and ties go by preference among the available codings."""
+        self.assertEqual(choose_encoding("gzip, br", {"gzip", "br"}), "br")
+        self.assertEqual(choose_encoding("gzip, br, zstd", {"gzip", "br", "zstd"}), "zstd")
+        self.assertEqual(choose_encoding("gzip, br", {"gzip"}), "gzip")
+        self.assertEqual(choose_encoding("br;q=0.5, gzip", {"gzip", "br"}), "gzip")
+        self.assertEqual(choose_encoding("gzip;q=0", {"gzip"}), "identity")
+        self.assertEqual(choose_encoding("*", {"gzip"}), "gzip")
+        self.assertEqual(choose_encoding(None, {"gzip"}), "identity")
+
+    def test_route_responses_are_compressed(self):
+        """Test that handle_request compresses what the router returns."""
+        request = HttpRequest("GET", "/tasks", "HTTP/1.1", RequestHeaders({"Accept-Encoding": "gzip"}), b"")
+        with patch.dict(v1_Compression.ENCODERS, {"gzip": v1_Compression.gzip_compress}, clear=True):
+            response = handle_request(TaskListRouter(), request)
+        head, _, body = response.partition(b"\r\n\r\n")
+        self.assertIn(b"Content-Encoding: gzip", head)
+        self.assertIn(b"Vary: Accept-Encoding", head)
+        self.assertIn(f"Content-Length: {len(body)}".encode(), head)
+        expected = TaskListRouter().route("/tasks")[0].encode("utf-8")
+        self.assertEqual(gzip.decompress(body), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,453 @@
+import gzip
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from loggings import v1_Metrics
+from loggings.v1_Metrics import configure_metrics
+from servers import v1_HttpServer
+from routers.v1_Router import MethodNotAllowedError
+from servers.v1_HttpServer import handle_request, run_async_server, run_server, stop_http_server
+from servers.v1_RequestParser import HttpRequest, RequestHeaders
+
+
+class SlowRouter:
+    """Router stand-in whose only route blocks until released."""
+    def __init__(self):
+        self.release = threading.Event()
+
+    def route(self, url, method="GET", **kwargs):
+        self.release.wait(5)
+        return f"{method} {url}", "text/plain"
+
+
+class ReadOnlyRouter:
+    """Router stand-in whose routes only allow GET and HEAD."""
+    def route(self, url, method="GET", **kwargs):
+        if method not in ("GET", "HEAD"):
+            raise MethodNotAllowedError(f"{method} not allowed on {url}", ["GET", "HEAD"])
+        return "ok", "text/plain"
+
+
+def get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def send_request(port: int, path: str = "/slow") -> bytes:
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+        client.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode("utf-8"))
+        response = b""
+        while True:
+            chunk = client.recv(4096)
+            if not chunk:
+                break
+            response += chunk
+        return response
+
+
+class EchoRouter:
+    def route(self, url, method="GET", **kwargs):
+        return f"{method} {url} {sorted(kwargs.items())}", "text/plain"
+
+
+class StreamRouter:
+    """Router stand-in whose views stream their output."""
+    rows = 5000
+
+    def route(self, url, method="GET", **kwargs):
+        if url == "/export.csv":
+            return (f"{i},task {i}\r\n" for i in range(self.rows)), "text/csv"
+        if url == "/export.async":
+            async def generate():
+                for i in range(self.rows):
+                    yield f"{i},task {i}\r\n"
+            return generate(), "text/csv"
+        return f"{method} {url}", "text/plain"
+
+
+def read_until_closed(client: socket.socket) -> bytes:
+    response = b""
+    while True:
+        chunk = client.recv(65536)
+        if not chunk:
+            return response
+        response += chunk
+
+
+def decode_chunked(data: bytes):
+    """Decodes a chunked body, returning it and the bytes after the last chunk."""
+    body = b""
+    while True:
+        size_line, _, data = data.partition(b"\r\n")
+        size = int(size_line, 16)
+        if size == 0:
+            assert data.startswith(b"\r\n")
+            return body, data[2:]
+        body += data[:size]
+        assert data[size:size + 2] == b"\r\n"
+        data = data[size + 2:]
+
+
+EXPORT = "".join(f"{i},task {i}\r\n" for i in range(StreamRouter.rows)).encode("utf-8")
+
+
+class TestHandleRequest(unittest.TestCase):
+    def test_method_not_allowed_gets_405_with_allow(self):
+        """Test that a route matched with another method is answered 405 with the allowed methods."""
+        request = HttpRequest("DELETE", "/tasks/1", "HTTP/1.1", RequestHeaders({}), b"")
+        response = handle_request(ReadOnlyRouter(), request)
+        head = response.partition(b"\r\n\r\n")[0]
+        self.assertTrue(head.startswith(b"HTTP/1.1 405 Method Not Allowed"))
+        self.assertIn(b"Allow: GET, HEAD", head)
+
+
+class LabellingRouter:
+    """Router stand-in labelling its requests with a route pattern, as V1Router does."""
+    def route(self, url, method="GET", **kwargs):
+        v1_Metrics.metrics.set_route("/tasks/{id:int}")
+        return "task", "text/plain"
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, v1_Metrics, "metrics", v1_Metrics.metrics)
+        configure_metrics()
+
+    def test_requests_are_reported_by_route_pattern(self):
+        """Test that handled requests appear on /metrics under their route, and unmatched ones under one label."""
+        request = HttpRequest("GET", "/tasks/7", "HTTP/1.1", RequestHeaders({}), b"")
+        self.assertTrue(handle_request(LabellingRouter(), request).startswith(b"HTTP/1.1 200"))
+        request = HttpRequest("GET", "/nowhere/8", "HTTP/1.1", RequestHeaders({}), b"")
+        self.assertTrue(handle_request(ReadOnlyRouter(), request).startswith(b"HTTP/1.1 200"))
+
+        request = HttpRequest("GET", "/metrics", "HTTP/1.1", RequestHeaders({}), b"")
+        head, _, body = handle_request(EchoRouter(), request).partition(b"\r\n\r\n")
+        self.assertIn(b"Content-Type: text/plain; version=0.0.4", head)
+        self.assertIn(b'v1_requests_total{route="/tasks/{id:int}",method="GET",status="200"} 1', body)
+        self.assertIn(b'v1_requests_total{route="<unmatched>",method="GET",status="200"} 1', body)
+        self.assertNotIn(b"/tasks/7", body)
+        self.assertIn(b'v1_request_phase_seconds_count{phase="parse"} 2', body)
+
+    def test_metrics_endpoint_is_not_served_while_disabled(self):
+        """Test that /metrics is an ordinary route while metrics are off."""
+        configure_metrics(False)
+        request = HttpRequest("GET", "/metrics", "HTTP/1.1", RequestHeaders({}), b"")
+        self.assertIn(b"GET /metrics", handle_request(EchoRouter(), request))
+
+
+class ServerTestCase(unittest.TestCase):
+    engine = staticmethod(run_server)
+
+    def start_server(self, router, **options):
+        port = get_free_port()
+        thread = threading.Thread(target=self.engine, args=(router, "127.0.0.1", port), kwargs=options, daemon=True)
+        thread.start()
+        for _ in range(50):
+            if v1_HttpServer.server_running:
+                break
+            time.sleep(0.05)
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(stop_http_server)
+        return port
+
+
+class KeepAliveTests:
+    """Persistent connection tests shared by both engines."""
+
+    def test_pipelined_requests_are_answered_in_order(self):
+        """Test that two pipelined requests on one connection get two ordered responses."""
+        port = self.start_server(EchoRouter(), workers=2, keep_alive_timeout=1)
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"GET /first HTTP/1.1\r\nHost: localhost\r\n\r\n"
+                           b"GET /second HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            response = b""
+            while True:
+                chunk = client.recv(4096)
+                if not chunk:
+                    break
+                response += chunk
+
+        first, second = response.split(b"HTTP/1.1 200 OK")[1:]
+        self.assertIn(b"Connection: keep-alive", first)
+        self.assertTrue(first.endswith(b"GET /first []"))
+        self.assertIn(b"Connection: close", second)
+        self.assertTrue(second.endswith(b"GET /second []"))
+
+    def test_idle_connection_is_closed_after_timeout(self):
+        """Test that the server closes a persistent connection once it has been idle too long."""
+        port = self.start_server(EchoRouter(), workers=2, keep_alive_timeout=0.3)
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"GET /first HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            self.assertIn(b"Connection: keep-alive", client.recv(4096))
+            started = time.time()
+            self.assertEqual(client.recv(4096), b"")
+            self.assertLess(time.time() - started, 3)
+
+    def test_upload_over_the_limit_gets_413(self):
+        """Test that a body larger than max_upload_size is answered with 413 without being read."""
+        port = self.start_server(EchoRouter(), workers=2, max_upload_size=10)
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"POST /upload HTTP/1.1\r\nContent-Length: 1000000\r\n\r\n")
+            response = client.recv(4096)
+        self.assertTrue(response.startswith(b"HTTP/1.1 413 Payload Too Large"))
+
+    def test_slow_upload_that_keeps_sending_is_read(self):
+        """Test that request_timeout bounds each wait for data, not the whole body."""
+        port = self.start_server(EchoRouter(), workers=2, request_timeout=0.5)
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"POST /upload HTTP/1.1\r\nConnection: close\r\nContent-Length: 100\r\n\r\n")
+            for _ in range(10):
+                time.sleep(0.1)
+                client.sendall(b"x" * 10)
+            response = read_until_closed(client)
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 OK"))
+
+    def test_slow_request_on_a_kept_alive_connection_is_read(self):
+        """Test that keep_alive_timeout only bounds the wait for the next request to start."""
+        port = self.start_server(EchoRouter(), workers=2, keep_alive_timeout=0.3, request_timeout=5)
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"GET /first HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            self.assertIn(b"Connection: keep-alive", client.recv(4096))
+            client.sendall(b"POST /second HTTP/1.1\r\nConnection: close\r\nContent-Length: 20\r\n\r\n")
+            for _ in range(2):
+                time.sleep(0.5)
+                client.sendall(b"x" * 10)
+            response = read_until_closed(client)
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 OK"))
+
+    def test_request_cut_off_by_the_timeout_gets_408(self):
+        """Test that a client stopping in the middle of a request gets 408 Request Timeout."""
+        port = self.start_server(EchoRouter(), workers=2, request_timeout=0.3)
+        for request in (b"GET /partial HTTP/1.1\r\n", b"POST /upload HTTP/1.1\r\nContent-Length: 10\r\n\r\nabc"):
+            with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+                client.sendall(request)
+                self.assertTrue(read_until_closed(client).startswith(b"HTTP/1.1 408 Request Timeout"))
+
+    def test_large_static_file_is_sent_with_sendfile(self):
+        """Test that a static file over the sendfile threshold arrives intact on a reused connection."""
+        static_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_dir)
+        video = os.urandom(1_000_000)
+        with open(os.path.join(static_dir, "intro.mp4"), "wb") as f:
+            f.write(video)
+        patcher = patch("servers.v1_StaticFiles.STATIC_DIR", static_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        port = self.start_server(EchoRouter(), workers=2, keep_alive_timeout=1)
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"GET /static/intro.mp4 HTTP/1.1\r\n\r\n"
+                           b"GET /after HTTP/1.1\r\nConnection: close\r\n\r\n")
+            response = b""
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                response += chunk
+
+        head, _, rest = response.partition(b"\r\n\r\n")
+        self.assertIn(b"Content-Length: 1000000", head)
+        self.assertEqual(rest[:len(video)], video)
+        self.assertTrue(rest[len(video):].endswith(b"GET /after []"))
+
+        # Seeking sends only the requested window
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"GET /static/intro.mp4 HTTP/1.1\r\nRange: bytes=200000-899999\r\nConnection: close\r\n\r\n")
+            response = b""
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                response += chunk
+        head, _, body = response.partition(b"\r\n\r\n")
+        self.assertTrue(head.startswith(b"HTTP/1.1 206 Partial Content"))
+        self.assertIn(b"Content-Range: bytes 200000-899999/1000000", head)
+        self.assertEqual(body, video[200000:900000])
+
+    def test_generator_view_is_streamed_chunked(self):
+        """Test that a generator body is sent chunked and the connection stays usable afterwards."""
+        port = self.start_server(StreamRouter(), workers=2, keep_alive_timeout=1)
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"GET /export.csv HTTP/1.1\r\n\r\nGET /after HTTP/1.1\r\nConnection: close\r\n\r\n")
+            response = read_until_closed(client)
+
+        head, _, rest = response.partition(b"\r\n\r\n")
+        self.assertIn(b"Transfer-Encoding: chunked", head)
+        self.assertIn(b"Connection: keep-alive", head)
+        self.assertNotIn(b"Content-Length", head)
+        body, rest = decode_chunked(rest)
+        self.assertEqual(body, EXPORT)
+        self.assertTrue(rest.startswith(b"HTTP/1.1 200 OK"))
+        self.assertTrue(rest.endswith(b"GET /after"))
+
+    def test_async_generator_view_is_streamed(self):
+        """Test that an async generator body is streamed, gzip-compressed on the fly when accepted."""
+        port = self.start_server(StreamRouter(), workers=2)
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"GET /export.async HTTP/1.1\r\nAccept-Encoding: gzip\r\nConnection: close\r\n\r\n")
+            response = read_until_closed(client)
+
+        head, _, rest = response.partition(b"\r\n\r\n")
+        self.assertIn(b"Content-Encoding: gzip", head)
+        body, rest = decode_chunked(rest)
+        self.assertEqual(gzip.decompress(body), EXPORT)
+        self.assertEqual(rest, b"")
+
+    def test_http10_stream_ends_with_the_connection(self):
+        """Test that HTTP/1.0 clients get the raw body, delimited by closing the connection."""
+        port = self.start_server(StreamRouter(), workers=2)
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"GET /export.csv HTTP/1.0\r\nConnection: keep-alive\r\n\r\n")
+            response = read_until_closed(client)
+
+        head, _, body = response.partition(b"\r\n\r\n")
+        self.assertNotIn(b"Transfer-Encoding", head)
+        self.assertIn(b"Connection: close", head)
+        self.assertEqual(body, EXPORT)
+
+    def test_max_requests_per_connection(self):
+        """Test that the last allowed request on a connection is answered with Connection: close."""
+        port = self.start_server(EchoRouter(), workers=2, max_keep_alive_requests=2)
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"GET /a HTTP/1.1\r\n\r\nGET /b HTTP/1.1\r\n\r\nGET /c HTTP/1.1\r\n\r\n")
+            response = b""
+            while True:
+                chunk = client.recv(4096)
+                if not chunk:
+                    break
+                response += chunk
+        self.assertEqual(response.count(b"HTTP/1.1 200 OK"), 2)
+        self.assertIn(b"Connection: close", response)
+
+    def test_sent_bytes_and_in_flight_are_measured(self):
+        """Test that the connection loop counts the bytes it sends and leaves no request in flight."""
+        self.addCleanup(setattr, v1_Metrics, "metrics", v1_Metrics.metrics)
+        configure_metrics()
+        port = self.start_server(EchoRouter(), workers=2)
+        response = send_request(port, "/hello")
+        for _ in range(50):  # The count is recorded once send returns, just after the client has read it
+            total = v1_Metrics.metrics.collect()
+            if total.response_bytes:
+                break
+            time.sleep(0.02)
+        self.assertEqual(total.response_bytes, len(response))
+        self.assertEqual(total.in_flight, 0)
+        self.assertEqual(total.phases["send"].count, 1)
+
+
+class TestWorkerPoolServer(KeepAliveTests, ServerTestCase):
+    def test_slow_request_does_not_block_other_workers(self):
+        """Test that a second request is answered while the first one is still in its controller."""
+        router = SlowRouter()
+        port = self.start_server(router, workers=2)
+        self.addCleanup(router.release.set)
+        results = []
+        first = threading.Thread(target=lambda: results.append(send_request(port)))
+        first.start()
+        time.sleep(0.2)
+
+        second = threading.Thread(target=lambda: results.append(send_request(port)))
+        second.start()
+        time.sleep(0.2)
+        router.release.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual(len(results), 2)
+        for response in results:
+            self.assertTrue(response.startswith(b"HTTP/1.1 200 OK"))
+
+    def test_single_threaded_loop_closes_connections(self):
+        """Test that the default single-threaded loop never keeps connections open."""
+        port = self.start_server(EchoRouter())
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"GET /first HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            response = b""
+            while True:
+                chunk = client.recv(4096)
+                if not chunk:
+                    break
+                response += chunk
+        self.assertIn(b"Connection: close", response)
+
+    def test_saturated_pool_answers_503(self):
+        """Test that connections beyond max_connections are rejected with 503."""
+        router = SlowRouter()
+        port = self.start_server(router, workers=1, max_connections=1)
+        self.addCleanup(router.release.set)
+        results = []
+        first = threading.Thread(target=lambda: results.append(send_request(port)))
+        first.start()
+        time.sleep(0.2)
+
+        rejected = send_request(port)
+        router.release.set()
+        first.join(5)
+
+        self.assertTrue(rejected.startswith(b"HTTP/1.1 503 Service Unavailable"))
+        self.assertTrue(results[0].startswith(b"HTTP/1.1 200 OK"))
+
+    def test_silent_connection_is_closed_and_frees_its_worker(self):
+        """Test that a connection sending no complete request is closed after request_timeout."""
+        port = self.start_server(EchoRouter(), workers=1, max_connections=1, request_timeout=0.3)
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            started = time.time()
+            self.assertEqual(client.recv(4096), b"")
+            self.assertLess(time.time() - started, 3)
+        time.sleep(0.1)  # Let the worker release its slot
+        self.assertTrue(send_request(port, "/next").startswith(b"HTTP/1.1 200 OK"))
+
+
+class TestAsyncServer(KeepAliveTests, ServerTestCase):
+    engine = staticmethod(run_async_server)
+
+    def test_get_request(self):
+        """Test that the async engine routes a request and closes the connection."""
+        port = self.start_server(EchoRouter())
+        response = send_request(port, "/echo?name=ada")
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 OK"))
+        self.assertTrue(response.endswith(b"GET /echo?name=ada []"))
+
+    def test_post_body_is_read_completely(self):
+        """Test that the body is read up to Content-Length before dispatching."""
+        port = self.start_server(EchoRouter())
+        body = b"title=" + b"x" * 100000
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            client.sendall(b"POST /create HTTP/1.1\r\nConnection: close\r\nContent-Type: application/x-www-form-urlencoded\r\n"
+                           b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n")
+            client.sendall(body)
+            response = b""
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                response += chunk
+        self.assertTrue(response.startswith(b"HTTP/1.1 200 OK"))
+        self.assertIn(b"'x" + b"x" * 99999 + b"'", response)
+
+    def test_slow_controller_does_not_block_event_loop(self):
+        """Test that a blocked controller leaves the event loop free to serve other connections."""
+        router = SlowRouter()
+        port = self.start_server(router, workers=2)
+        self.addCleanup(router.release.set)
+        results = []
+        first = threading.Thread(target=lambda: results.append(send_request(port)))
+        first.start()
+        time.sleep(0.2)
+        second = threading.Thread(target=lambda: results.append(send_request(port)))
+        second.start()
+        time.sleep(0.2)
+        router.release.set()
+        first.join(5)
+        second.join(5)
+        self.assertEqual(len(results), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
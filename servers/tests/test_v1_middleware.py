@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+from servers import v1_HttpServer
+from servers.v1_HttpServer import configure_middleware, dispatch_request, handle_request
+from servers.v1_Middleware import V1Middleware, compose_middleware
+from servers.v1_RequestParser import HttpRequest, RequestHeaders
+from servers.v1_ResponseBuilder import construct_http_response
+
+
+class Recorder(V1Middleware):
+    """Middleware recording the order its hooks run in."""
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    def before_routing(self, request, keep_alive):
+        self.calls.append(f"{self.name}.before")
+
+    def after_routing(self, request, response):
+        self.calls.append(f"{self.name}.after")
+        return response + f" {self.name}".encode()
+
+
+class TokenAuth(V1Middleware):
+    def before_routing(self, request, keep_alive):
+        if request.headers.get("Authorization") != "Bearer secret":
+            return construct_http_response(401, b"unauthorized", "text/plain", keep_alive)
+
+
+class ErrorPage(V1Middleware):
+    def on_error(self, request, error, keep_alive):
+        if isinstance(error, KeyError):
+            return construct_http_response(503, b"try again", "text/plain", keep_alive)
+
+
+class Headers:
+    """Duck-typed middleware, not a V1Middleware subclass."""
+    def after_routing(self, request, response):
+        return response.replace(b"\r\n\r\n", b"\r\nX-Frame-Options: DENY\r\n\r\n", 1)
+
+
+class EchoRouter:
+    def route(self, url, method="GET", **kwargs):
+        if url == "/broken":
+            raise KeyError("cache")
+        if url == "/crash":
+            raise RuntimeError("bug")
+        return f"{method} {url}", "text/plain"
+
+
+def get(path, **headers):
+    return HttpRequest("GET", path, "HTTP/1.1", RequestHeaders(headers), b"")
+
+
+class TestComposeMiddleware(unittest.TestCase):
+    def test_hooks_run_like_an_onion(self):
+        """Test that before hooks run outermost first and after hooks innermost first."""
+        calls = []
+        handler = compose_middleware([Recorder("a", calls), Recorder("b", calls)],
+                                     lambda router, request, keep_alive: b"route")
+        self.assertEqual(handler(None, get("/"), False), b"route b a")
+        self.assertEqual(calls, ["a.before", "b.before", "b.after", "a.after"])
+
+    def test_chain_is_composed_once_without_no_op_hooks(self):
+        """Test that no middleware leaves the endpoint itself and inherited no-op hooks add no layer."""
+        def endpoint(router, request, keep_alive):
+            return b"route"
+
+        self.assertIs(compose_middleware([], endpoint), endpoint)
+        self.assertIs(compose_middleware([V1Middleware()], endpoint), endpoint)
+        with self.assertRaises(TypeError):
+            compose_middleware([object()], endpoint)
+
+    def test_skipped_requests_do_not_reach_after_hooks(self):
+        """Test that a request the endpoint skips gets no after_routing call."""
+        calls = []
+        handler = compose_middleware([Recorder("a", calls)], lambda router, request, keep_alive: None)
+        self.assertIsNone(handler(None, get("/"), False))
+        self.assertEqual(calls, ["a.before"])
+
+
+class TestServerMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, v1_HttpServer, "request_handler", v1_HttpServer.request_handler)
+
+    def test_before_routing_can_answer_the_request(self):
+        """Test that a before_routing hook short-circuits the router."""
+        configure_middleware([TokenAuth(), Headers()])
+        self.assertTrue(handle_request(EchoRouter(), get("/tasks")).startswith(b"HTTP/1.1 401"))
+        response = handle_request(EchoRouter(), get("/tasks", Authorization="Bearer secret"))
+        self.assertTrue(response.startswith(b"HTTP/1.1 200"))
+        self.assertIn(b"X-Frame-Options: DENY", response)
+        self.assertTrue(response.endswith(b"GET /tasks"))
+
+    def test_uploads_of_a_short_circuited_request_are_deleted(self):
+        """Test that files streamed in for a request a middleware answered do not stay on disk."""
+        configure_middleware([TokenAuth()])
+        fd, temp_path = tempfile.mkstemp(suffix=".part")
+        os.close(fd)
+        self.addCleanup(lambda: os.path.exists(temp_path) and os.remove(temp_path))
+        form = {"file": {"filename": "a.txt", "content_type": "text/plain", "temp_path": temp_path, "size": 0}}
+        request = HttpRequest("POST", "/upload", "HTTP/1.1", RequestHeaders({}), b"", form)
+        self.assertTrue(handle_request(EchoRouter(), request).startswith(b"HTTP/1.1 401"))
+        self.assertFalse(os.path.exists(temp_path))
+
+    def test_on_error_handles_or_passes_errors(self):
+        """Test that on_error can answer an error, and errors it passes on still get a 500."""
+        configure_middleware([ErrorPage()])
+        self.assertTrue(handle_request(EchoRouter(), get("/broken")).startswith(b"HTTP/1.1 503"))
+        with self.assertLogs("v1.http_server", "ERROR"):
+            self.assertTrue(handle_request(EchoRouter(), get("/crash")).startswith(b"HTTP/1.1 500"))
+        self.assertTrue(handle_request(EchoRouter(), get("/missing")).startswith(b"HTTP/1.1 200"))
+
+    def test_configure_without_middleware_restores_the_router_only(self):
+        """Test that configuring no middleware sends requests straight to dispatch_request."""
+        configure_middleware([TokenAuth()])
+        configure_middleware([])
+        self.assertIs(v1_HttpServer.request_handler, dispatch_request)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from controllers.v1_Controller import V1AbstractController
+from loggings import v1_Profiling
+from loggings.v1_Profiling import configure_profiling, load_profiles
+from servers import v1_HttpServer
+from routers.v1_Router import V1Router
+from servers.v1_HttpServer import configure_middleware, handle_request
+from servers.v1_ProfilingMiddleware import V1ProfilingMiddleware, get_route_pattern
+from servers.v1_RequestParser import HttpRequest, RequestHeaders
+from views.v1_View import V1BaseView
+
+
+class StudentController(V1AbstractController):
+    def __init__(self):
+        super().__init__()
+
+    def add_student(self, **kwargs):
+        return {"message": "Added student", "kwargs": kwargs}
+
+
+class StudentView(V1BaseView):
+    def __init__(self, **kwargs):
+        self.data = kwargs
+
+    def render(self, **kwargs):
+        return f"Rendered: {kwargs}"
+
+
+class SlowRouter:
+    """Router stand-in whose routes wait for each other, so that their requests overlap."""
+    def __init__(self, parties):
+        self.barrier = threading.Barrier(parties)
+
+    def route(self, url, method="GET", **kwargs):
+        self.barrier.wait(5)
+        return f"{method} {url}", "text/plain"
+
+
+class EchoRouter:
+    def route(self, url, method="GET", **kwargs):
+        if url == "/crash":
+            raise RuntimeError("bug")
+        return f"{method} {url}", "text/plain"
+
+
+def get(path, **headers):
+    return HttpRequest("GET", path, "HTTP/1.1", RequestHeaders(headers), b"")
+
+
+class TestV1ProfilingMiddleware(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.addCleanup(setattr, v1_Profiling, "profiler", v1_Profiling.profiler)
+        self.addCleanup(setattr, v1_HttpServer, "request_handler", v1_HttpServer.request_handler)
+        configure_middleware([V1ProfilingMiddleware()])
+        route_pattern = patch("servers.v1_ProfilingMiddleware.get_route_pattern",
+                              side_effect=lambda request: "/tasks" if request.path != "/nowhere" else None)
+        route_pattern.start()
+        self.addCleanup(route_pattern.stop)
+
+    def count_profiles(self):
+        return sum(len(entries) for entries in load_profiles(self.directory).values())
+
+    def test_header_with_the_token_forces_a_profile(self):
+        """Test that the X-V1-Profile header forces a profile only when it carries the token."""
+        configure_profiling(self.directory, sample_rate=0.0, token="secret")
+        for value, expected in (("secret", 1), ("wrong", 1), (None, 1)):
+            headers = {"X-V1-Profile": value} if value else {}
+            self.assertTrue(handle_request(EchoRouter(), get("/tasks", **headers)).startswith(b"HTTP/1.1 200"))
+            self.assertEqual(self.count_profiles(), expected, value)
+        self.assertTrue(os.path.isdir(os.path.join(self.directory, "tasks")))
+
+    def test_failing_and_unrouted_requests(self):
+        """Test that a failing request is profiled and still gets its 500, and an unrouted one is not profiled."""
+        configure_profiling(self.directory, sample_rate=1.0)
+        with self.assertLogs("v1.http_server", "ERROR"):
+            self.assertTrue(handle_request(EchoRouter(), get("/crash")).startswith(b"HTTP/1.1 500"))
+        self.assertEqual(self.count_profiles(), 1)
+        handle_request(EchoRouter(), get("/nowhere"))
+        self.assertEqual(self.count_profiles(), 1)
+
+    def test_concurrent_sampled_requests_all_succeed(self):
+        """Test that requests sampled at the same time are all answered, one of them profiled."""
+        configure_profiling(self.directory, sample_rate=1.0)
+        router = SlowRouter(4)
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(handle_request(router, get("/tasks"))))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(len(responses), 4)
+        for response in responses:
+            self.assertTrue(response.startswith(b"HTTP/1.1 200"))
+        self.assertEqual(self.count_profiles(), 1)
+
+    def test_disabled_profiling_records_nothing(self):
+        """Test that the middleware does nothing while profiling is turned off."""
+        configure_profiling(None)
+        handle_request(EchoRouter(), get("/tasks"))
+        self.assertFalse(os.listdir(self.directory))
+
+
+class TestRoutePattern(unittest.TestCase):
+    def setUp(self):
+        saved_routes, saved_table = V1Router._shared_routes, V1Router._route_table
+        self.addCleanup(setattr, V1Router, "_route_table", saved_table)
+        self.addCleanup(setattr, V1Router, "_shared_routes", saved_routes)
+        V1Router._shared_routes, V1Router._route_table = {}, None
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        self.router = V1Router(file_path=os.path.join(state_dir.name, "router_state.pkl"))
+        self.router.add_route("/students/{id:int}", StudentController, "add_student", StudentView, "PUT")
+
+    def test_profiles_are_grouped_by_route_pattern(self):
+        """Test that a V1Router request is profiled under its route pattern, not its path."""
+        self.assertEqual(get_route_pattern(HttpRequest("PUT", "/students/7?x=1", "HTTP/1.1", RequestHeaders({}), b"")),
+                         "/students/{id:int}")
+        self.assertIsNone(get_route_pattern(get("/students/7")))  # No GET on that route
+        self.assertIsNone(get_route_pattern(get("/teachers")))
+
+        self.addCleanup(setattr, v1_Profiling, "profiler", v1_Profiling.profiler)
+        self.addCleanup(setattr, v1_HttpServer, "request_handler", v1_HttpServer.request_handler)
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        configure_profiling(profile_dir.name, sample_rate=1.0)
+        configure_middleware([V1ProfilingMiddleware()])
+        response = handle_request(self.router, HttpRequest("PUT", "/students/7", "HTTP/1.1", RequestHeaders({}), b""))
+        self.assertIn(b"'id': 7", response)
+        (entry,) = load_profiles(profile_dir.name)[("/students/{id:int}", "PUT")]
+        self.assertIsNotNone(entry["prof"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from servers.v1_HttpServer import read_full_request
+from servers.v1_RequestParser import (MultipartStreamParser, PayloadTooLargeError, RequestHeaders, parse_http_body,
+                                      parse_http_request, parse_request_head, should_keep_alive)
+from servers.v1_UploadToServer import handle_file_uploads
+
+
+def build_multipart(boundary: bytes, file_data: bytes) -> bytes:
+    return (
+        b"--" + boundary + b"\r\n"
+        b'Content-Disposition: form-data; name="name"\r\n\r\n'
+        b"Moving cart\r\n"
+        b"--" + boundary + b"\r\n"
+        b'Content-Disposition: form-data; name="image"; filename="cart.png"\r\n'
+        b"content-type: image/png\r\n\r\n" + file_data + b"\r\n"
+        b"--" + boundary + b"--\r\n"
+    )
+
+
+class TestV1RequestParser(unittest.TestCase):
+    def test_headers_are_case_insensitive(self):
+        """Test that headers can be looked up whatever case the client used."""
+        method, path, version, headers = parse_request_head(b"POST /tasks HTTP/1.1\r\ncOnTeNt-LeNgTh: 12\r\nHost: x")
+        self.assertEqual((method, path, version), ("POST", "/tasks", "HTTP/1.1"))
+        self.assertEqual(headers["Content-Length"], "12")
+        self.assertIn("HOST", headers)
+
+    def test_multipart_file_is_bit_exact(self):
+        """Test that binary file parts survive parsing untouched, including bytes that are not valid UTF-8."""
+        file_data = bytes(range(256)) * 64 + b"\r\n  trailing whitespace  \r\n"
+        body = parse_http_body(RequestHeaders({"Content-Type": "multipart/form-data; boundary=XyZ"}),
+                               bytearray(build_multipart(b"XyZ", file_data)))
+        self.assertEqual(body["name"], "Moving cart")
+        self.assertEqual(body["image"]["filename"], "cart.png")
+        self.assertEqual(body["image"]["content_type"], "image/png")
+        self.assertEqual(bytes(body["image"]["data"]), file_data)
+
+    def test_json_and_urlencoded_bodies(self):
+        """Test that JSON and form bodies are decoded to text fields."""
+        json_body = parse_http_body(RequestHeaders({"content-type": "application/json"}), b'{"title": "caf\xc3\xa9"}')
+        self.assertEqual(json_body, {"title": "café"})
+        form_body = parse_http_body(RequestHeaders(), bytearray(b"title=Write+tests&id=2"))
+        self.assertEqual(form_body, {"title": "Write tests", "id": "2"})
+
+    def test_parse_http_request_accepts_str_and_bytes(self):
+        """Test that the full-request parser still accepts str as well as bytes."""
+        raw = "POST /tasks/create HTTP/1.1\r\nContent-Type: application/x-www-form-urlencoded\r\n\r\ntitle=a"
+        self.assertEqual(parse_http_request(raw), ("POST", "/tasks/create", {"title": "a"}))
+        self.assertEqual(parse_http_request(raw.encode()), ("POST", "/tasks/create", {"title": "a"}))
+        self.assertEqual(parse_http_request("GET /favicon.ico HTTP/1.1\r\n\r\n"), ("", "", {}))
+
+    def test_should_keep_alive(self):
+        """Test keep-alive defaults for HTTP/1.1 and HTTP/1.0."""
+        self.assertTrue(should_keep_alive("HTTP/1.1", RequestHeaders()))
+        self.assertFalse(should_keep_alive("HTTP/1.1", RequestHeaders({"Connection": "Close"})))
+        self.assertFalse(should_keep_alive("HTTP/1.0", RequestHeaders()))
+        self.assertTrue(should_keep_alive("HTTP/1.0", RequestHeaders({"connection": "keep-alive"})))
+
+
+class TestMultipartStreamParser(unittest.TestCase):
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir)
+
+    def open_file(self, filename):
+        fd, path = tempfile.mkstemp(dir=self.upload_dir)
+        return os.fdopen(fd, "wb"), path
+
+    def test_any_chunking_gives_the_same_result(self):
+        """Test that fields and files are identical whatever chunk sizes the body arrives in."""
+        file_data = os.urandom(5000) + b"\r\n--XyQ" + os.urandom(100)  # Almost, but not quite, a delimiter
+        body = build_multipart(b"XyZ", file_data)
+        for chunk_size in (1, 7, 64, len(body)):
+            parser = MultipartStreamParser("XyZ", open_file=self.open_file)
+            for start in range(0, len(body), chunk_size):
+                parser.feed(body[start:start + chunk_size])
+            fields = parser.close()
+
+            self.assertEqual(fields["name"], "Moving cart")
+            self.assertEqual(fields["image"]["filename"], "cart.png")
+            self.assertEqual(fields["image"]["size"], len(file_data))
+            with open(fields["image"]["temp_path"], "rb") as f:
+                self.assertEqual(f.read(), file_data)
+
+    def test_abort_deletes_temporary_files(self):
+        """Test that aborting a parse removes the files written so far."""
+        parser = MultipartStreamParser("XyZ", open_file=self.open_file)
+        parser.feed(build_multipart(b"XyZ", b"partial data")[:-20])
+        parser.abort()
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+
+class TestReadFullRequest(unittest.TestCase):
+    def setUp(self):
+        self.server_side, self.client_side = socket.socketpair()
+        self.addCleanup(self.server_side.close)
+        self.addCleanup(self.client_side.close)
+        self.upload_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.upload_dir)
+
+    def test_body_is_read_by_content_length_and_leftover_is_kept(self):
+        """Test that the body is read up to a lowercase content-length and pipelined bytes stay buffered."""
+        body = b'{"title": "Write tests"}'
+        head = b"POST /tasks/create HTTP/1.1\r\ncontent-type: application/json\r\n"
+        self.client_side.sendall(head + b"content-length: " + str(len(body)).encode() + b"\r\n\r\n")
+        self.client_side.sendall(body + b"GET /next HTTP/1.1\r\n\r\n")
+        self.client_side.shutdown(socket.SHUT_WR)
+
+        buffer = bytearray()
+        request = read_full_request(self.server_side, buffer)
+        self.assertEqual(request.path, "/tasks/create")
+        self.assertEqual(bytes(request.body), body)
+
+        self.assertEqual(read_full_request(self.server_side, buffer).path, "/next")
+        self.assertIsNone(read_full_request(self.server_side, buffer))
+
+    def test_multipart_upload_streams_to_disk(self):
+        """Test that a multipart upload is written to static/uploads/<ext>/ bit-exact, with its path handed over."""
+        file_data = os.urandom(300000)
+        body = build_multipart(b"b0undary", file_data)
+        head = b"POST /upload HTTP/1.1\r\nContent-Type: multipart/form-data; boundary=b0undary\r\n"
+        request_data = head + b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+        sender = threading.Thread(target=self.client_side.sendall, args=(request_data,))
+        sender.start()
+        self.addCleanup(sender.join)
+
+        with patch("servers.v1_UploadToServer.UPLOAD_BASE_DIR", self.upload_dir):
+            request = read_full_request(self.server_side, bytearray())
+            self.assertEqual(request.body, b"")
+            handle_file_uploads(request.form)
+
+        image = request.form["image"]
+        self.assertEqual(image["path"], os.path.join(self.upload_dir, "png", "cart.png"))
+        with open(image["path"], "rb") as f:
+            self.assertEqual(f.read(), file_data)
+        self.assertEqual(os.listdir(os.path.join(self.upload_dir, "png")), ["cart.png"])
+
+    def test_body_over_the_limit_is_rejected_before_reading(self):
+        """Test that a Content-Length over max_body_size raises before any of the body is read."""
+        self.client_side.sendall(b"POST /upload HTTP/1.1\r\nContent-Length: 1000\r\n\r\n")
+        with self.assertRaises(PayloadTooLargeError):
+            read_full_request(self.server_side, bytearray(), max_body_size=999)
+
+
+if __name__ == "__main__":
+    unittest.main()
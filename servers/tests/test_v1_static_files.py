@@ -0,0 +1,238 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from email.utils import formatdate
+from unittest.mock import patch
+from servers.v1_RequestParser import RequestHeaders
+from servers.v1_ResponseBuilder import FileResponse
+from servers.v1_StaticCache import V1StaticCache
+from servers.v1_StaticFiles import SENDFILE_MIN_SIZE, parse_range_header, resolve_static_path, serve_static_file
+
+
+def split_response(response: bytes):
+    head, _, body = response.partition(b"\r\n\r\n")
+    lines = head.decode("iso-8859-1").split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return lines[0], headers, body
+
+
+class StaticDirTestCase(unittest.TestCase):
+    """Serves a temporary static directory holding a small stylesheet and a video over the sendfile threshold."""
+
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_dir)
+        patcher = patch("servers.v1_StaticFiles.STATIC_DIR", self.static_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.css = b"body { color: #333; }"
+        with open(os.path.join(self.static_dir, "docs.css"), "wb") as f:
+            f.write(self.css)
+        self.video = os.urandom(2 * SENDFILE_MIN_SIZE)
+        with open(os.path.join(self.static_dir, "intro.mp4"), "wb") as f:
+            f.write(self.video)
+
+
+class TestServeStaticFile(StaticDirTestCase):
+    def test_small_file_is_returned_with_validators(self):
+        """Test that a small file is returned in memory with ETag, Last-Modified and Cache-Control."""
+        status, headers, body = split_response(serve_static_file("/static/docs.css?v=2"))
+        self.assertEqual(status, "HTTP/1.1 200 OK")
+        self.assertEqual(body, self.css)
+        self.assertEqual(headers["Content-Type"], "text/css; charset=utf-8")
+        self.assertEqual(headers["Content-Length"], str(len(self.css)))
+        self.assertEqual(headers["Cache-Control"], "public, max-age=3600")
+        self.assertTrue(headers["ETag"].startswith('"'))
+        self.assertIn("GMT", headers["Last-Modified"])
+
+    def test_large_file_is_left_to_sendfile(self):
+        """Test that a file over SENDFILE_MIN_SIZE is not read but returned as a FileResponse."""
+        response = serve_static_file("/static/intro.mp4")
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual((response.offset, response.count), (0, len(self.video)))
+        status, headers, body = split_response(response.head)
+        self.assertEqual(headers["Content-Type"], "video/mp4")
+        self.assertEqual(headers["Content-Length"], str(len(self.video)))
+        self.assertEqual(body, b"")
+
+    def test_conditional_requests_get_304(self):
+        """Test that a matching If-None-Match or a recent If-Modified-Since gets 304 without a body."""
+        _, headers, _ = split_response(serve_static_file("/static/docs.css"))
+
+        for conditional in ({"If-None-Match": headers["ETag"]},
+                            {"If-None-Match": f'"other", W/{headers["ETag"]}'},
+                            {"If-Modified-Since": headers["Last-Modified"]}):
+            status, not_modified_headers, body = split_response(
+                serve_static_file("/static/docs.css", RequestHeaders(conditional)))
+            self.assertEqual(status, "HTTP/1.1 304 Not Modified")
+            self.assertEqual(not_modified_headers["ETag"], headers["ETag"])
+            self.assertNotIn("Content-Length", not_modified_headers)
+            self.assertEqual(body, b"")
+
+    def test_stale_validators_get_the_file(self):
+        """Test that a changed ETag or an older If-Modified-Since date gets a full 200."""
+        for conditional in ({"If-None-Match": '"stale"'},
+                            {"If-Modified-Since": formatdate(0, usegmt=True)},
+                            {"If-Modified-Since": "not a date"}):
+            status, _, body = split_response(serve_static_file("/static/docs.css", RequestHeaders(conditional)))
+            self.assertEqual(status, "HTTP/1.1 200 OK")
+            self.assertEqual(body, self.css)
+
+    def test_head_request_has_no_body(self):
+        """Test that HEAD gets the same headers as GET and no body."""
+        response = serve_static_file("/static/intro.mp4", method="HEAD")
+        status, headers, body = split_response(response)
+        self.assertEqual(headers["Content-Length"], str(len(self.video)))
+        self.assertEqual(body, b"")
+
+    def test_missing_file_and_traversal_get_404(self):
+        """Test that unknown files and paths escaping the static directory are not served."""
+        self.assertIsNone(resolve_static_path("/static/../requests.jsonl"))
+        self.assertIsNone(resolve_static_path("/static/%2e%2e/requests.jsonl"))
+        for path in ("/static/missing.css", "/static/../requests.jsonl", "/static/"):
+            status, _, _ = split_response(serve_static_file(path))
+            self.assertEqual(status, "HTTP/1.1 404 Not Found")
+
+
+class TestRangeRequests(StaticDirTestCase):
+    def test_parse_range_header(self):
+        """Test single, open-ended, suffix, overlapping, unsatisfiable and malformed ranges."""
+        self.assertEqual(parse_range_header("bytes=0-499", 1000), [(0, 499)])
+        self.assertEqual(parse_range_header("bytes=500-", 1000), [(500, 999)])
+        self.assertEqual(parse_range_header("bytes=-100", 1000), [(900, 999)])
+        self.assertEqual(parse_range_header("bytes=900-5000", 1000), [(900, 999)])
+        self.assertEqual(parse_range_header("bytes=0-10, 5-20, 40-50", 1000), [(0, 20), (40, 50)])
+        self.assertEqual(parse_range_header("bytes=1000-", 1000), [])
+        for malformed in ("bytes=5-1", "bytes=-", "bytes=a-b", "items=0-1", "bytes="):
+            self.assertIsNone(parse_range_header(malformed, 1000), malformed)
+
+    def test_large_range_is_left_to_sendfile(self):
+        """Test that a large single range becomes a 206 FileResponse over just that window."""
+        start, end = 10, len(self.video) - 1
+        response = serve_static_file("/static/intro.mp4", RequestHeaders({"Range": f"bytes={start}-"}))
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual((response.offset, response.count), (start, len(self.video) - start))
+        status, headers, _ = split_response(response.head)
+        self.assertEqual(status, "HTTP/1.1 206 Partial Content")
+        self.assertEqual(headers["Content-Range"], f"bytes {start}-{end}/{len(self.video)}")
+        self.assertEqual(headers["Content-Length"], str(len(self.video) - start))
+
+    def test_small_range_is_returned_in_memory(self):
+        """Test that a small range is read from its offset and returned with the response."""
+        status, headers, body = split_response(
+            serve_static_file("/static/intro.mp4", RequestHeaders({"Range": "bytes=-100"})))
+        self.assertEqual(status, "HTTP/1.1 206 Partial Content")
+        self.assertEqual(body, self.video[-100:])
+
+    def test_multiple_ranges_are_sent_as_byteranges(self):
+        """Test that several ranges come back as multipart/byteranges parts."""
+        status, headers, body = split_response(
+            serve_static_file("/static/docs.css", RequestHeaders({"Range": "bytes=0-3,-5"})))
+        self.assertEqual(status, "HTTP/1.1 206 Partial Content")
+        boundary = headers["Content-Type"].split("boundary=")[1]
+        parts = body.split(f"--{boundary}".encode())[1:-1]
+        self.assertEqual(len(parts), 2)
+        self.assertTrue(parts[0].endswith(b"\r\n\r\n" + self.css[:4] + b"\r\n"))
+        self.assertIn(f"Content-Range: bytes {len(self.css) - 5}-{len(self.css) - 1}/{len(self.css)}".encode(), parts[1])
+        self.assertTrue(parts[1].endswith(self.css[-5:] + b"\r\n"))
+        self.assertEqual(headers["Content-Length"], str(len(body)))
+
+    def test_unsatisfiable_range_gets_416(self):
+        """Test that a range past the end of the file gets 416 with the file size."""
+        status, headers, _ = split_response(
+            serve_static_file("/static/docs.css", RequestHeaders({"Range": "bytes=5000-"})))
+        self.assertEqual(status, "HTTP/1.1 416 Range Not Satisfiable")
+        self.assertEqual(headers["Content-Range"], f"bytes */{len(self.css)}")
+
+    def test_if_range_mismatch_sends_the_whole_file(self):
+        """Test that Range is honoured only while If-Range still names the current file."""
+        _, headers, _ = split_response(serve_static_file("/static/docs.css"))
+        current = RequestHeaders({"Range": "bytes=0-3", "If-Range": headers["ETag"]})
+        self.assertEqual(split_response(serve_static_file("/static/docs.css", current))[2], self.css[:4])
+        by_date = RequestHeaders({"Range": "bytes=0-3", "If-Range": headers["Last-Modified"]})
+        self.assertEqual(split_response(serve_static_file("/static/docs.css", by_date))[2], self.css[:4])
+
+        for stale in ('"stale"', f"W/{headers['ETag']}", formatdate(0, usegmt=True)):
+            status, _, body = split_response(
+                serve_static_file("/static/docs.css", RequestHeaders({"Range": "bytes=0-3", "If-Range": stale})))
+            self.assertEqual(status, "HTTP/1.1 200 OK")
+            self.assertEqual(body, self.css)
+
+
+class TestStaticCache(StaticDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = V1StaticCache(max_bytes=4096, max_file_size=1024)
+        patcher = patch("servers.v1_StaticFiles.static_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.css = b"body { color: #333; }\n" * 40
+        self.css_path = os.path.join(self.static_dir, "docs.css")
+        with open(self.css_path, "wb") as f:
+            f.write(self.css)
+
+    def test_hits_are_served_from_memory(self):
+        """Test that the second request is a cache hit and the file is not opened again."""
+        first = serve_static_file("/static/docs.css")
+        with patch("builtins.open", side_effect=AssertionError("file was read")):
+            self.assertEqual(serve_static_file("/static/docs.css"), first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(split_response(first)[2], self.css)
+
+    def test_precompressed_variant_follows_accept_encoding(self):
+        """Test that gzip is sent to clients accepting it, with its own ETag and Vary."""
+        status, headers, body = split_response(
+            serve_static_file("/static/docs.css", RequestHeaders({"Accept-Encoding": "gzip, deflate"})))
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(body), self.css)
+        self.assertEqual(headers["Content-Length"], str(len(body)))
+
+        _, identity_headers, identity_body = split_response(serve_static_file("/static/docs.css"))
+        self.assertNotIn("Content-Encoding", identity_headers)
+        self.assertEqual(identity_headers["Vary"], "Accept-Encoding")
+        self.assertEqual(identity_body, self.css)
+        self.assertNotEqual(identity_headers["ETag"], headers["ETag"])
+
+        status, _, _ = split_response(serve_static_file(
+            "/static/docs.css", RequestHeaders({"Accept-Encoding": "gzip", "If-None-Match": headers["ETag"]})))
+        self.assertEqual(status, "HTTP/1.1 304 Not Modified")
+
+    def test_changed_file_is_read_again(self):
+        """Test that an entry is replaced once the file's mtime changes."""
+        serve_static_file("/static/docs.css")
+        with open(self.css_path, "wb") as f:
+            f.write(b"p { margin: 0; }")
+        os.utime(self.css_path, ns=(0, 10**18))
+        self.assertEqual(split_response(serve_static_file("/static/docs.css"))[2], b"p { margin: 0; }")
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_least_recently_used_files_are_evicted(self):
+        """Test that the cache stays within max_bytes by evicting the oldest entries, and skips large files."""
+        for name in ("a", "b", "c"):
+            with open(os.path.join(self.static_dir, f"{name}.png"), "wb") as f:
+                f.write(os.urandom(1000))
+        for name in ("a", "b", "c", "a"):
+            serve_static_file(f"/static/{name}.png")
+        serve_static_file("/static/intro.mp4")  # Larger than max_file_size
+
+        self.assertLessEqual(self.cache.current_bytes, self.cache.max_bytes)
+        self.assertEqual(len(self.cache), 3)
+        self.cache.invalidate(os.path.join(self.static_dir, "a.png"))
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.current_bytes, 2000)
+
+        with open(os.path.join(self.static_dir, "d.png"), "wb") as f:
+            f.write(os.urandom(1000))
+        serve_static_file("/static/d.png")
+        serve_static_file("/static/a.png")
+        serve_static_file("/static/docs.css")  # Evicts b.png, the least recently used
+        self.assertEqual(self.cache.current_bytes, sum(entry.nbytes for entry in self.cache._entries.values()))
+        self.assertNotIn(os.path.abspath(os.path.join(self.static_dir, "b.png")), self.cache._entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
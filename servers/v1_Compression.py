@@ -0,0 +1,194 @@
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional dependency, brotli is not offered without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, zstd is not offered without it
+    zstandard = None
+
+# Content types worth compressing; anything else (images, video, archives) is already compressed
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+
+# Responses smaller than this are sent as they are, as compressing would not pay for itself
+COMPRESSION_MIN_SIZE = 1024
+
+# One level for every coding, clamped to each coding's range. Higher is smaller but slower.
+COMPRESSION_LEVEL = 6
+
+compression_enabled = True
+
+
+def gzip_compress(data: bytes, level: int) -> bytes:
+    """Compresses data in the gzip format with zlib, without a file name or timestamp."""
+    compressor = zlib.compressobj(max(1, min(level, 9)), zlib.DEFLATED, 31)  # wbits 16+15 selects gzip
+    return compressor.compress(data) + compressor.flush()
+
+
+ENCODERS: Dict[str, Callable[[bytes, int], bytes]] = {"gzip": gzip_compress}
+if brotli is not None:
+    ENCODERS["br"] = lambda data, level: brotli.compress(data, quality=max(0, min(level, 11)))
+if zstandard is not None:
+    ENCODERS["zstd"] = lambda data, level: zstandard.ZstdCompressor(level=max(1, min(level, 22))).compress(data)
+
+# Preferred coding when a client accepts several with the same q-value
+ENCODING_PREFERENCE = ("zstd", "br", "gzip")
+
+
+def configure_compression(enabled: bool = True, min_size: Optional[int] = None, level: Optional[int] = None,
+                          content_types: Optional[Iterable[str]] = None) -> None:
+    """
+    Configures the compression of dynamic responses.
+
+    Args:
+        enabled (bool): Whether route responses are compressed at all.
+        min_size (Optional[int]): Smallest body, in bytes, that gets compressed.
+        level (Optional[int]): Compression level, clamped to the range of each coding.
+        content_types (Optional[Iterable[str]]): Content type prefixes that get compressed.
+    """
+    global compression_enabled, COMPRESSION_MIN_SIZE, COMPRESSION_LEVEL, COMPRESSIBLE_TYPES
+    compression_enabled = enabled
+    if min_size is not None:
+        COMPRESSION_MIN_SIZE = min_size
+    if level is not None:
+        COMPRESSION_LEVEL = level
+    if content_types is not None:
+        COMPRESSIBLE_TYPES = tuple(prefix.strip().lower() for prefix in content_types if prefix.strip())
+
+
+def is_compressible(content_type: str) -> bool:
+    """Whether a content type is in the compression allowlist."""
+    return content_type.split(";", 1)[0].strip().lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def choose_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> str:
+    """
+    Picks the content coding to send from an Accept-Encoding header.
+
+    Args:
+        accept_encoding (Optional[str]): The Accept-Encoding header, e.g. "gzip, br;q=0.9".
+        available: The codings the body can be sent in.
+
+    Returns:
+        str: The acceptable coding with the highest q-value, ties going by ENCODING_PREFERENCE,
+            or "identity" if the client accepts none of them.
+    """
+    if not accept_encoding:
+        return "identity"
+
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        name, _, value = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    best, best_quality = "identity", 0.0
+    for coding in ENCODING_PREFERENCE:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if coding in available and quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress_response(body: bytes, content_type: str,
+                      accept_encoding: Optional[str]) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Compresses a response body in the best coding the client accepts.
+
+    Bodies of types outside COMPRESSIBLE_TYPES, or smaller than COMPRESSION_MIN_SIZE, are left
+    as they are. Every compressible type gets "Vary: Accept-Encoding", so shared caches keep
+    the compressed and identity responses apart.
+
+    Args:
+        body (bytes): The response body.
+        content_type (str): The response's Content-Type.
+        accept_encoding (Optional[str]): The request's Accept-Encoding header.
+
+    Returns:
+        Tuple[bytes, Dict[str, str]]: The body to send and the headers to add to the response.
+    """
+    if not compression_enabled or not is_compressible(content_type):
+        return body, {}
+
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return body, headers
+
+    encoding = choose_encoding(accept_encoding, ENCODERS)
+    if encoding == "identity":
+        return body, headers
+
+    compressed = ENCODERS[encoding](body, COMPRESSION_LEVEL)
+    if len(compressed) >= len(body):
+        return body, headers
+    headers["Content-Encoding"] = encoding
+    return compressed, headers
+
+
+def gzip_stream(chunks: Iterable[Union[str, bytes]], level: int) -> Iterator[bytes]:
+    """Gzip-compresses a body as it is generated, yielding compressed output as it becomes available."""
+    compressor = zlib.compressobj(max(1, min(level, 9)), zlib.DEFLATED, 31)
+    try:
+        for chunk in chunks:
+            output = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            if output:
+                yield output
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    yield compressor.flush()
+
+
+async def gzip_stream_async(chunks: AsyncIterable[Union[str, bytes]], level: int) -> AsyncIterator[bytes]:
+    """The same as gzip_stream, for an async generator."""
+    compressor = zlib.compressobj(max(1, min(level, 9)), zlib.DEFLATED, 31)
+    try:
+        async for chunk in chunks:
+            output = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            if output:
+                yield output
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    yield compressor.flush()
+
+
+def compress_stream(chunks: Union[Iterable, AsyncIterable], content_type: str,
+                    accept_encoding: Optional[str]) -> Tuple[Union[Iterable, AsyncIterable], Dict[str, str]]:
+    """
+    Wraps a streamed body so it is gzip-compressed while it is sent, when the client accepts gzip.
+
+    The size of a stream is not known up front, so COMPRESSION_MIN_SIZE does not apply, and
+    only gzip is used, as it is the coding zlib can produce incrementally.
+
+    Args:
+        chunks (Union[Iterable, AsyncIterable]): The body, as str or bytes pieces.
+        content_type (str): The response's Content-Type.
+        accept_encoding (Optional[str]): The request's Accept-Encoding header.
+
+    Returns:
+        Tuple[Union[Iterable, AsyncIterable], Dict[str, str]]: The chunks to send and the headers to add.
+    """
+    if not compression_enabled or not is_compressible(content_type):
+        return chunks, {}
+
+    headers = {"Vary": "Accept-Encoding"}
+    if choose_encoding(accept_encoding, ("gzip",)) != "gzip":
+        return chunks, headers
+
+    headers["Content-Encoding"] = "gzip"
+    if hasattr(chunks, "__aiter__"):
+        return gzip_stream_async(chunks, COMPRESSION_LEVEL), headers
+    return gzip_stream(chunks, COMPRESSION_LEVEL), headers
@@ -1,188 +1,866 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from loggings import v1_Metrics
+from loggings.v1_Logging import get_logger
 import os
-from pathlib import Path
-import re
-from routers.v1_Router import V1Router
-from servers.v1_RequestParser import parse_http_request
-from servers.v1_ResponseBuilder import construct_http_response, http_404_response, http_500_response
-from servers.v1_UploadToServer import handle_file_uploads
+from routers.v1_Router import MethodNotAllowedError, V1Router
+from servers.v1_Compression import compress_response, compress_stream
+from servers.v1_Middleware import RequestHandler, compose_middleware
+from servers.v1_RequestParser import (HttpRequest, MultipartStreamParser, PayloadTooLargeError, RequestTimeoutError,
+                                      get_content_length, get_multipart_boundary, parse_request, parse_request_head,
+                                      should_keep_alive)
+from servers.v1_ResponseBuilder import (HttpResponse, StreamingResponse, construct_http_response,
+                                        construct_streaming_response, http_404_response, http_405_response,
+                                        http_408_response, http_413_response, http_500_response, http_503_response,
+                                        response_status, write_chunks, write_chunks_async)
+from servers.v1_StaticFiles import get_content_type, serve_static_file
+from servers.v1_UploadToServer import discard_file_uploads, handle_file_uploads
 import socket
 import signal
-from typing import Type, Optional, Tuple
+import threading
+import time
+from typing import Any, Iterable, Type, Optional
+
+logger = get_logger("http_server")
 
 server_socket: Optional[socket.socket] = None
 server_running: bool = False
 
+# State of the asyncio engine, set while run_async_server is running
+async_loop: Optional[asyncio.AbstractEventLoop] = None
+async_stop_event: Optional[asyncio.Event] = None
+
+# Size of a single recv() while reading request headers, and the largest accepted header block
+RECV_CHUNK_SIZE = 65536
+MAX_HEADER_SIZE = 65536
+
 def stop_http_server():
     """Stop the HTTP server gracefully."""
     global server_running, server_socket
-    print("[HTTP_SERVER] Stopping server...", flush=True)
+    logger.info("Stopping server...")
     server_running = False
+    if async_loop is not None and async_stop_event is not None:
+        try:
+            async_loop.call_soon_threadsafe(async_stop_event.set)
+        except RuntimeError:
+            pass  # The event loop is already closed
     if server_socket:
         try:
             server_socket.close()
-            print("[HTTP_SERVER] Server socket closed.", flush=True)
+            logger.debug("Server socket closed.")
         except Exception as e:
-            print(f"[HTTP_SERVER] Error closing server socket: {e}", flush=True)
+            logger.warning("Error closing server socket: %s", e)
         finally:
             server_socket = None
 
 def signal_handler(signum, frame):
     """Handle termination signals."""
-    print("\n[HTTP_SERVER] Received termination signal. Shutting down server...", flush=True)
+    logger.info("Received termination signal. Shutting down server...")
     stop_http_server()
 
 # Register signal handlers
 signal.signal(signal.SIGINT, signal_handler)  # Ctrl+C
 signal.signal(signal.SIGTERM, signal_handler)  # Termination signal
 
-def get_content_type(file_path: str) -> str:
-    """Returns the appropriate Content-Type based on the file extension."""
-    ext = Path(file_path).suffix
-    return {
-        ".html": "text/html",
-        ".css": "text/css",
-        ".js": "application/javascript",
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".png": "image/png",
-        ".gif": "image/gif",
-        ".svg": "image/svg+xml",
-        ".ico": "image/x-icon",
-        ".mp4": "video/mp4",
-        ".webm": "video/webm",
-    }.get(ext, "application/octet-stream")  # Default binary data type
-
-def serve_static_file(file_path: str) -> Tuple[bytes, str, int]:
-    """Reads and returns static file contents in binary mode."""
-    file_path = os.path.join(file_path.lstrip("/"))
-
-    if os.path.exists(file_path) and os.path.isfile(file_path):
-        try:
-            with open(file_path, "rb") as file:  # Read in binary mode
-                file_data = file.read()
-            content_type = get_content_type(file_path)
-            return file_data, content_type, 200
-        except Exception as e:
-            print(f"Error reading static file {file_path}: {e}", flush=True)
-            return b"Internal Server Error", "text/plain", 500
-    else:
-        return b"File Not Found", "text/plain", 404
+def read_full_request(client_socket: socket.socket, buffer: Optional[bytearray] = None,
+                      max_body_size: Optional[int] = None,
+                      request_timeout: Optional[float] = None) -> Optional[HttpRequest]:
+    """
+    Reads the next full HTTP request from the client socket.
+
+    The head is accumulated in a bytearray and parsed once. A multipart/form-data body
+    is then fed to a MultipartStreamParser chunk by chunk, so uploads go straight to
+    disk; any other body is received with recv_into into a buffer preallocated from
+    Content-Length, and is left undecoded.
+
+    Args:
+        client_socket (socket.socket): The client socket.
+        buffer (Optional[bytearray]): Bytes already received on this connection. Anything
+            read past the end of the request is left in it for the next (pipelined) request.
+        max_body_size (Optional[int]): Largest accepted Content-Length, None for no limit.
+        request_timeout (Optional[float]): Socket timeout set once the first bytes of the request
+            are received, replacing the idle timeout of a persistent connection. None keeps it.
+
+    Returns:
+        Optional[HttpRequest]: The request, or None if the client closed the connection.
 
+    Raises:
+        PayloadTooLargeError: If Content-Length exceeds max_body_size. The body is not read.
+        RequestTimeoutError: If the socket times out after part of the request was received.
+        ValueError: If the request head is malformed or larger than MAX_HEADER_SIZE.
+        OSError: If the socket times out before any byte of the request was received.
+    """
+    if buffer is None:
+        buffer = bytearray()
+    if buffer and request_timeout is not None:
+        client_socket.settimeout(request_timeout)  # A pipelined request has already started
 
-def read_full_request(client_socket: socket.socket) -> str:
-    """Reads the full HTTP request from the client socket."""
-    request_data = b""
-    
-    # Read headers first
+    # Read headers first, only searching the newly received bytes for their end
+    search_start = 0
     while True:
-        chunk = client_socket.recv(1024)
-        if not chunk:
-            break
-        request_data += chunk
-        
-        # Check for end of headers
-        if b"\r\n\r\n" in request_data:
+        header_end = buffer.find(b"\r\n\r\n", search_start)
+        if header_end != -1:
             break
+        if len(buffer) > MAX_HEADER_SIZE:
+            raise ValueError("Request headers too large")
+        search_start = max(0, len(buffer) - 3)
+        try:
+            chunk = client_socket.recv(RECV_CHUNK_SIZE)
+        except socket.timeout:
+            if buffer:
+                raise RequestTimeoutError("Request headers not received in time") from None
+            raise  # Idle connection
+        if not chunk:
+            buffer.clear()  # Connection closed before the end of headers
+            return None
+        if not buffer and request_timeout is not None:
+            client_socket.settimeout(request_timeout)
+        buffer += chunk
+
+    method, path, version, headers = parse_request_head(bytes(buffer[:header_end]))
+    content_length = get_content_length(headers)
+    if max_body_size is not None and content_length > max_body_size:
+        raise PayloadTooLargeError(f"Request body of {content_length} bytes exceeds the {max_body_size} bytes limit")
+
+    body_start = header_end + 4
+    received = min(len(buffer) - body_start, content_length)
+    boundary = get_multipart_boundary(headers)
+
+    if boundary is not None:
+        # Stream the multipart body to disk through a fixed-size receive buffer
+        parser = MultipartStreamParser(boundary)
+        try:
+            parser.feed(buffer[body_start:body_start + received])
+            del buffer[:body_start + received]
+            chunk_buffer = bytearray(RECV_CHUNK_SIZE)
+            with memoryview(chunk_buffer) as chunk_view:
+                while received < content_length:
+                    try:
+                        count = client_socket.recv_into(chunk_view, min(RECV_CHUNK_SIZE, content_length - received))
+                    except socket.timeout:
+                        raise RequestTimeoutError("Request body not received in time") from None
+                    if not count:
+                        break
+                    parser.feed(chunk_view[:count])
+                    received += count
+            form = parser.close()
+        except BaseException:
+            parser.abort()
+            raise
+        return HttpRequest(method, path, version, headers, b"", form)
+
+    # Move the already received part of the body into a buffer sized for the whole body
+    body = bytearray(content_length)
+    body[:received] = buffer[body_start:body_start + received]
+    del buffer[:body_start + received]
 
-    # Decode headers and extract Content-Length
-    headers, _, body = request_data.partition(b"\r\n\r\n")
-    headers_str = headers.decode("utf-8", errors="ignore")
-    
-    # Extract Content-Length
-    content_length_match = re.search(r"Content-Length: (\d+)", headers_str)
-    content_length = int(content_length_match.group(1)) if content_length_match else 0
-    
     # Read remaining body based on Content-Length
+    with memoryview(body) as body_view:
+        while received < content_length:
+            try:
+                count = client_socket.recv_into(body_view[received:], content_length - received)
+            except socket.timeout:
+                raise RequestTimeoutError("Request body not received in time") from None
+            if not count:
+                break
+            received += count
+    del body[received:]  # Client closed early: keep what arrived
+
+    return HttpRequest(method, path, version, headers, body)
+
+
+async def read_full_request_async(reader: asyncio.StreamReader, max_body_size: Optional[int] = None,
+                                  idle_timeout: Optional[float] = None,
+                                  read_timeout: Optional[float] = None) -> Optional[HttpRequest]:
+    """
+    Reads the full HTTP request from an asyncio stream without blocking the event loop.
+
+    Like the socket timeout of the synchronous engine, read_timeout bounds each wait for
+    more data rather than the whole request, so a slow upload that keeps sending is not
+    cut off. The head, at most MAX_HEADER_SIZE bytes, is read under a single read_timeout.
+
+    Args:
+        reader (asyncio.StreamReader): The client stream reader.
+        max_body_size (Optional[int]): Largest accepted Content-Length, None for no limit.
+        idle_timeout (Optional[float]): Seconds to wait for the first byte of the request, None for no limit.
+        read_timeout (Optional[float]): Seconds to wait for the rest of the head, then for each
+            read of the body, None for no limit.
+
+    Returns:
+        Optional[HttpRequest]: The request, or None if the client closed the connection.
+
+    Raises:
+        asyncio.TimeoutError: If no byte of the request arrives within idle_timeout.
+        RequestTimeoutError: If the client stops sending in the middle of the request.
+        PayloadTooLargeError: If Content-Length exceeds max_body_size. The body is not read.
+        ValueError: If the request head is malformed.
+    """
+    first = await asyncio.wait_for(reader.read(1), idle_timeout)
+    if not first:
+        return None  # Client closed the connection
+    try:
+        head = first + await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), read_timeout)
+    except asyncio.IncompleteReadError:
+        return None  # Client closed before the end of headers
+    except asyncio.TimeoutError:
+        raise RequestTimeoutError("Request headers not received in time") from None
+
+    method, path, version, headers = parse_request_head(head[:-4])
+    content_length = get_content_length(headers)
+    if max_body_size is not None and content_length > max_body_size:
+        raise PayloadTooLargeError(f"Request body of {content_length} bytes exceeds the {max_body_size} bytes limit")
+
+    boundary = get_multipart_boundary(headers)
+    if boundary is not None:
+        # Stream the multipart body to disk as it arrives
+        parser = MultipartStreamParser(boundary)
+        try:
+            received = 0
+            while received < content_length:
+                chunk = await read_body_chunk(reader, min(RECV_CHUNK_SIZE, content_length - received), read_timeout)
+                if not chunk:
+                    break
+                parser.feed(chunk)
+                received += len(chunk)
+            form = parser.close()
+        except BaseException:
+            parser.abort()
+            raise
+        return HttpRequest(method, path, version, headers, b"", form)
+
+    body = bytearray()
     while len(body) < content_length:
-        chunk = client_socket.recv(content_length - len(body))
+        chunk = await read_body_chunk(reader, content_length - len(body), read_timeout)
         if not chunk:
-            break
+            break  # Client closed early: keep what arrived
         body += chunk
 
-    return (headers + b"\r\n\r\n" + body).decode("utf-8", errors="ignore")
+    return HttpRequest(method, path, version, headers, body)
+
+
+async def read_body_chunk(reader: asyncio.StreamReader, size: int, timeout: Optional[float]) -> bytes:
+    """Reads up to size bytes of a request body, raising RequestTimeoutError if none arrive within timeout."""
+    try:
+        return await asyncio.wait_for(reader.read(size), timeout)
+    except asyncio.TimeoutError:
+        raise RequestTimeoutError("Request body not received in time") from None
+
+
+def handle_request(router: Type[V1Router], request: Optional[HttpRequest],
+                   keep_alive: bool = False) -> Optional[HttpResponse]:
+    """
+    Runs a request through the middleware chain and the router, and builds the response.
+
+    Args:
+        router (Type[V1Router]): The router used to dispatch non-static requests.
+        request (Optional[HttpRequest]): The request read from the client.
+        keep_alive (bool): Whether the response announces a persistent connection.
+
+    Returns:
+        Optional[HttpResponse]: The HTTP response, or None if the request should be skipped. Large
+            static files are returned as a FileResponse, and views returning an iterator or
+            (async) generator as a StreamingResponse, to be sent with send_response.
+    """
+    if request is None:  # Skip empty requests
+        return None
+
+    try:
+        return observe_request(router, request, keep_alive)
+    finally:
+        # Uploads streamed to disk are moved in place when dispatched; delete those of requests
+        # answered otherwise, e.g. by /metrics or a middleware
+        if request.form:
+            discard_file_uploads(request.form)
+
+
+def observe_request(router: Type[V1Router], request: HttpRequest, keep_alive: bool) -> Optional[HttpResponse]:
+    """Answers /metrics, and runs any other request through run_request_handler, recording it in the metrics."""
+    metrics = v1_Metrics.metrics
+    if metrics is None:
+        return run_request_handler(router, request, keep_alive)
+
+    if request.method == "GET" and request.path.split("?", 1)[0] == v1_Metrics.METRICS_PATH:
+        return construct_http_response(200, metrics.render().encode("utf-8"), v1_Metrics.CONTENT_TYPE, keep_alive)
+
+    started = time.perf_counter()
+    metrics.set_route(None)
+    response = run_request_handler(router, request, keep_alive)
+    if response is not None:
+        if request.path.startswith("/static/"):
+            route = v1_Metrics.STATIC_ROUTE
+        else:
+            route = metrics.take_route() or v1_Metrics.UNMATCHED_ROUTE  # Set by the router on this thread
+        metrics.observe_request(route, request.method, response_status(response), time.perf_counter() - started,
+                                get_content_length(request.headers))
+    return response
+
+
+def run_request_handler(router: Type[V1Router], request: HttpRequest, keep_alive: bool) -> Optional[HttpResponse]:
+    """Runs the request through the middleware chain, answering errors nothing handled with a 500."""
+    try:
+        return request_handler(router, request, keep_alive)
+    except Exception as e:
+        logger.exception("Internal server error during routing: %s", e)
+        count_error("handler")
+        return http_500_response(keep_alive)
+
+
+def dispatch_request(router: Type[V1Router], request: HttpRequest,
+                     keep_alive: bool = False) -> Optional[HttpResponse]:
+    """
+    The endpoint of the middleware chain: parses the body of a request, dispatches it and builds the response.
+
+    Raises:
+        Exception: Whatever the controller or view raised, for the middleware's on_error hooks.
+    """
+    metrics = v1_Metrics.metrics
+    started = time.perf_counter()
+    method, path, body = parse_request(request)
+    if metrics is not None:
+        metrics.observe_phase("parse", time.perf_counter() - started)
+
+    # Skip requests with empty method or path
+    if not method or not path:
+        return None
+
+    logger.debug("Received request: Method=%s, Path=%s, Body=%s", method, path, body.keys())
+
+    # Handle file uploads and delete the raw byte
+    started = time.perf_counter()
+    handle_file_uploads(body)
+    if metrics is not None and request.form:
+        metrics.observe_phase("upload", time.perf_counter() - started)
+
+    # Handle static file requests
+    if path.startswith("/static/"):
+        return serve_static_file(path, request.headers, method, keep_alive)
+
+    try:
+        # Pass the method to the router.route method
+        response_body_str, response_content_type = router.route(path, method=method, **body)
+        logger.debug("Route successful for Path=%s, Method=%s, Content-Type=%s", path, method, response_content_type)
+
+        # Views may return an iterator to stream a body too large to build in memory
+        if not isinstance(response_body_str, (str, bytes, bytearray)) and (
+                hasattr(response_body_str, "__iter__") or hasattr(response_body_str, "__aiter__")):
+            chunks, response_headers = compress_stream(response_body_str, response_content_type,
+                                                       request.headers.get("Accept-Encoding"))
+            chunked = request.version != "HTTP/1.0"  # HTTP/1.0 clients read until the connection closes
+            return construct_streaming_response(200, chunks, response_content_type, keep_alive, response_headers,
+                                                chunked)
+
+        # Ensure response body is bytes
+        if isinstance(response_body_str, str):
+            response_body = response_body_str.encode("utf-8")
+        else:
+            response_body = response_body_str # Already bytes if from a file for example
+
+        response_body, response_headers = compress_response(response_body, response_content_type,
+                                                            request.headers.get("Accept-Encoding"))
+        return construct_http_response(200, response_body, response_content_type, keep_alive, response_headers)
+    except MethodNotAllowedError as e:
+        logger.debug("Route error (method not allowed): %s", e)
+        return http_405_response(e.allowed_methods, keep_alive)
+    except ValueError as ve:
+        logger.debug("Route error (ValueError): %s", ve)
+        return http_404_response(keep_alive)
+
+
+# The request handler: dispatch_request wrapped in the configured middleware
+request_handler: RequestHandler = dispatch_request
+
+
+def configure_middleware(middlewares: Iterable[Any]) -> None:
+    """
+    Composes the middleware chain every request runs through, replacing the previous one.
 
+    Call it once at startup, before serving; with pre-forked workers, before forking.
 
-def run_server(router: Type[V1Router], host: str = "127.0.0.1", port: int = 8080) -> None:
-    """Runs the HTTP server, handling requests and responding accordingly."""
+    Args:
+        middlewares (Iterable[Any]): V1Middleware instances, outermost first. Empty removes all middleware.
+    """
+    global request_handler
+    request_handler = compose_middleware(middlewares, dispatch_request)
+
+
+def count_error(kind: str) -> None:
+    """Counts an error in the metrics, if they are enabled."""
+    metrics = v1_Metrics.metrics
+    if metrics is not None:
+        metrics.count_error(kind)
+
+
+def iterate_async(chunks):
+    """Iterates an async generator from synchronous code, on a private event loop."""
+    loop = asyncio.new_event_loop()
+    iterator = chunks.__aiter__()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        if hasattr(iterator, "aclose"):
+            loop.run_until_complete(iterator.aclose())
+        loop.close()
+
+
+def send_response(client_socket: socket.socket, response: HttpResponse) -> int:
+    """
+    Sends a response, handing the body of a FileResponse to the kernel with sendfile and
+    writing the body of a StreamingResponse as it is generated.
+
+    Returns:
+        int: The number of bytes sent, head included.
+
+    Raises:
+        OSError: If sending fails, or the file is shorter than announced; the connection
+            cannot be reused then.
+    """
+    if isinstance(response, bytes):
+        client_socket.sendall(response)  # Send as raw bytes
+        return len(response)
+
+    if isinstance(response, StreamingResponse):
+        client_socket.sendall(response.head)
+        sent = len(response.head)
+        chunks = iterate_async(response.chunks) if hasattr(response.chunks, "__aiter__") else response.chunks
+        for data in write_chunks(chunks, response.chunked):
+            client_socket.sendall(data)
+            sent += len(data)
+        return sent
+
+    client_socket.sendall(response.head)
+    with open(response.file_path, "rb") as file:
+        sent = client_socket.sendfile(file, response.offset, response.count)
+    if sent < response.count:
+        raise OSError(f"{response.file_path} was truncated while being sent")
+    return len(response.head) + sent
+
+
+async def send_response_async(writer: asyncio.StreamWriter, response: HttpResponse,
+                              executor: Optional[ThreadPoolExecutor] = None) -> int:
+    """
+    Sends a response on an asyncio stream, using loop.sendfile for the body of a FileResponse.
+    The body of a StreamingResponse from a plain generator is generated on the executor, so
+    the event loop never runs view code; async generators are iterated on the loop.
+
+    Returns:
+        int: The number of bytes sent, head included.
+    """
+    if isinstance(response, bytes):
+        writer.write(response)
+        await writer.drain()
+        return len(response)
+
+    if isinstance(response, StreamingResponse):
+        writer.write(response.head)
+        sent = len(response.head)
+        if hasattr(response.chunks, "__aiter__"):
+            async for data in write_chunks_async(response.chunks, response.chunked):
+                writer.write(data)
+                sent += len(data)
+                await writer.drain()
+        else:
+            loop = asyncio.get_running_loop()
+            body = write_chunks(response.chunks, response.chunked)
+            try:
+                while (data := await loop.run_in_executor(executor, next, body, None)) is not None:
+                    writer.write(data)
+                    sent += len(data)
+                    await writer.drain()
+            finally:
+                body.close()
+        await writer.drain()
+        return sent
+
+    writer.write(response.head)
+    await writer.drain()
+    with open(response.file_path, "rb") as file:
+        sent = await asyncio.get_running_loop().sendfile(writer.transport, file, response.offset, response.count)
+    if sent < response.count:
+        raise OSError(f"{response.file_path} was truncated while being sent")
+    return len(response.head) + sent
+
+
+def handle_client_connection(client_socket: socket.socket, router: Type[V1Router], keep_alive_timeout: float = 0,
+                             max_keep_alive_requests: int = 100, max_upload_size: Optional[int] = None,
+                             request_timeout: float = 10.0) -> None:
+    """
+    Serves the requests of an accepted client socket, then closes it.
+
+    Pipelined requests are answered in the order they were received. The connection is
+    closed when the client asks for it, after max_keep_alive_requests requests, when
+    no new request starts within keep_alive_timeout seconds, or when the client stops
+    sending for request_timeout seconds before a started request is complete. A request cut
+    off by a timeout after part of it arrived is answered with 408 Request Timeout.
+
+    Args:
+        client_socket (socket.socket): The accepted client socket.
+        router (Type[V1Router]): The router used to dispatch the requests.
+        keep_alive_timeout (float): Idle seconds before a persistent connection is closed.
+            0 answers a single request with "Connection: close".
+        max_keep_alive_requests (int): Maximum requests served on one connection.
+        max_upload_size (Optional[int]): Largest accepted request body; larger ones get a 413.
+        request_timeout (float): Seconds the first request, and any request once it has started, may go
+            without receiving data, so that a client connecting without sending does not hold the
+            connection's thread forever.
+    """
+    with client_socket:
+        client_socket.settimeout(request_timeout)
+        buffer = bytearray()
+        requests_served = 0
+        while True:
+            try:
+                # Read full request data
+                request = read_full_request(client_socket, buffer, max_upload_size, request_timeout)
+            except RequestTimeoutError as e:
+                logger.warning("Timed out reading request: %s", e)
+                count_error("bad_request")
+                try:
+                    client_socket.sendall(http_408_response())
+                except OSError:
+                    pass
+                break
+            except OSError:
+                break  # Idle timeout or connection reset
+            except PayloadTooLargeError as e:
+                # The body was not read, so the connection cannot be reused
+                logger.warning("Rejected request: %s", e)
+                count_error("bad_request")
+                try:
+                    client_socket.sendall(http_413_response())
+                except OSError:
+                    pass
+                break
+            except ValueError as e:
+                logger.warning("Malformed request: %s", e)
+                count_error("bad_request")
+                break
+
+            if request is None:
+                break
+
+            requests_served += 1
+            keep_alive = (keep_alive_timeout > 0 and server_running and requests_served < max_keep_alive_requests
+                          and should_keep_alive(request.version, request.headers))
+            metrics = v1_Metrics.metrics
+            if metrics is not None:
+                metrics.add_in_flight(1)
+            try:
+                try:
+                    response = handle_request(router, request, keep_alive)
+                except Exception as e:
+                    logger.exception("Failed to process request: %s", e)
+                    count_error("handler")
+                    keep_alive = False
+                    response = http_500_response()
+
+                if response is None:
+                    break
+
+                try:
+                    started = time.perf_counter()
+                    sent = send_response(client_socket, response)
+                    if metrics is not None:
+                        metrics.observe_phase("send", time.perf_counter() - started)
+                        metrics.add_response_bytes(sent)
+                except Exception as e:  # Also a view failing half-way through a streamed body
+                    logger.warning("Failed to send response: %s", e)
+                    count_error("send")
+                    break
+            finally:
+                if metrics is not None:
+                    metrics.add_in_flight(-1)
+
+            if not keep_alive or (isinstance(response, StreamingResponse) and not response.chunked):
+                break
+            client_socket.settimeout(keep_alive_timeout)
+
+
+def reject_client_connection(client_socket: socket.socket) -> None:
+    """Answers a connection with 503 Service Unavailable when every worker is busy."""
+    with client_socket:
+        try:
+            client_socket.settimeout(1)
+            client_socket.sendall(http_503_response())
+            # Discard what the client has already sent: closing with unread data resets the
+            # connection, and the client may then never see the 503. Not waiting for more keeps
+            # the accept loop from stalling on a slow client.
+            client_socket.setblocking(False)
+            while client_socket.recv(65536):
+                pass
+        except OSError:
+            pass
+
+
+def create_listen_socket(host: str, port: int, backlog: int = 5, reuse_port: bool = False) -> socket.socket:
+    """
+    Creates a TCP socket bound to host:port and listening.
+
+    Args:
+        host (str): The interface to bind to.
+        port (int): The port to bind to.
+        backlog (int): The listen() backlog.
+        reuse_port (bool): Set SO_REUSEPORT so that several processes can bind the same port.
+
+    Returns:
+        socket.socket: The listening socket.
+    """
+    listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # Allow reuse of the address
+    if reuse_port:
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("SO_REUSEPORT is not supported on this platform.")
+        listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    listen_socket.bind((host, port))
+    listen_socket.listen(backlog)
+    return listen_socket
+
+
+def run_server(router: Type[V1Router], host: str = "127.0.0.1", port: int = 8080, workers: int = 0,
+               backlog: int = 5, max_connections: Optional[int] = None, keep_alive_timeout: float = 5.0,
+               max_keep_alive_requests: int = 100, listen_socket: Optional[socket.socket] = None,
+               reuse_port: bool = False, max_upload_size: Optional[int] = None, request_timeout: float = 10.0) -> None:
+    """
+    Runs the HTTP server, handling requests and responding accordingly.
+
+    Args:
+        router (Type[V1Router]): The router used to dispatch requests.
+        host (str): The interface to bind to.
+        port (int): The port to bind to.
+        workers (int): Size of the worker thread pool. 0 keeps the single-threaded accept loop.
+        backlog (int): The listen() backlog of the server socket.
+        max_connections (Optional[int]): Maximum connections being handled or queued for a worker
+            at once in worker-pool mode; further connections get a 503. Defaults to twice the workers.
+        keep_alive_timeout (float): Idle seconds before a persistent connection is closed, 0 disables
+            keep-alive. Only used in worker-pool mode, as an idle client would otherwise stall the
+            single-threaded loop.
+        max_keep_alive_requests (int): Maximum requests served on one persistent connection.
+        listen_socket (Optional[socket.socket]): An already listening socket to accept from, e.g. one
+            shared by pre-forked worker processes. host, port and backlog are then ignored.
+        reuse_port (bool): Bind with SO_REUSEPORT so several processes can listen on the same port.
+        max_upload_size (Optional[int]): Largest accepted request body in bytes; larger requests are
+            answered with 413 before their body is read. None for no limit.
+        request_timeout (float): Seconds a new connection may go without receiving data before its
+            first request is complete, and a started request between two reads; the connection is
+            then closed, freeing its worker.
+    """
     global server_socket, server_running
+    executor: Optional[ThreadPoolExecutor] = None
+    in_flight: Optional[threading.BoundedSemaphore] = None
     try:
-        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # Allow reuse of the address
-        server_socket.bind((host, port))
-        server_socket.listen(5)
+        if listen_socket is None:
+            server_socket = create_listen_socket(host, port, backlog, reuse_port)
+        else:
+            server_socket = listen_socket
         server_socket.settimeout(1)  # Set a 1-second timeout for accept()
         server_running = True
 
-        print(f"[HTTP_SERVER] Server started at http://{host}:{port} (Press CTRL+C to stop)", flush=True)
+        if workers > 0:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http-worker")
+            in_flight = threading.BoundedSemaphore(max_connections or workers * 2)
+            logger.info("Worker pool enabled: %d workers, %d max connections", workers, max_connections or workers * 2)
+
+        logger.info("Server started at http://%s:%s (Press CTRL+C to stop)", host, port)
 
         while server_running:
             try:
                 client_socket, client_address = server_socket.accept()
-                print(f"[HTTP_SERVER] Connection from {client_address}", flush=True)
+                logger.debug("Connection from %s", client_address)
 
-                with client_socket:
-                    try:
-                        # Read full request data
-                        request_data = read_full_request(client_socket)
-                        if not request_data:  # Skip empty requests
-                            continue
-                            
-                        method, path, body = parse_http_request(request_data)
-                        
-                        # Skip requests with empty method or path
-                        if not method or not path:
-                            continue
-
-                        print(f"[HTTP_SERVER] Received request: Method={method}, Path={path}, Body={body.keys()}", flush=True) # Debug print
-
-                        # Handle file uploads and delete the raw byte
-                        handle_file_uploads(body)
-                        
-                        # Handle static file requests
-                        if path.startswith("/static/"):
-                            file_data, content_type, status_code = serve_static_file(path)
-                            response = construct_http_response(status_code, file_data, content_type)
-                        else:
-                            try:
-                                # Pass the method to the router.route method
-                                response_body_str, response_content_type = router.route(path, method=method, **body)
-                                print(f"[HTTP_SERVER] Route successful for Path={path}, Method={method}, Content-Type={response_content_type}", flush=True) # Debug print
-
-                                # Ensure response body is bytes
-                                if isinstance(response_body_str, str):
-                                    response_body = response_body_str.encode("utf-8")
-                                else:
-                                    response_body = response_body_str # Already bytes if from a file for example
-
-                                response = construct_http_response(200, response_body, response_content_type)
-                            except ValueError as ve:
-                                print(f"[HTTP_SERVER] Route error (ValueError): {ve}", flush=True) # Debug print
-                                response = http_404_response()
-                            except Exception as e:
-                                print(f"[HTTP_SERVER] Internal server error during routing: {e}", flush=True) # Debug print
-                                response = http_500_response()
-
-                    except Exception as e:
-                        print(f"[HTTP_SERVER] Failed to process request: {e}", flush=True) # Debug print
-                        response = http_500_response()
-
-                    client_socket.sendall(response)  # Send as raw bytes
+                if executor is None:
+                    handle_client_connection(client_socket, router, max_upload_size=max_upload_size,
+                                             request_timeout=request_timeout)
+                    continue
+
+                # Back-pressure: refuse instead of queueing without bound
+                if not in_flight.acquire(blocking=False):
+                    logger.warning("Worker pool saturated, rejecting %s", client_address)
+                    count_error("rejected")
+                    reject_client_connection(client_socket)
+                    continue
+
+                future = executor.submit(handle_client_connection, client_socket, router, keep_alive_timeout,
+                                         max_keep_alive_requests, max_upload_size, request_timeout)
+                future.add_done_callback(lambda _: in_flight.release())
             except socket.timeout:
                 # This is expected due to the non-blocking socket
                 continue
             except Exception as e:
                 if server_running:  # Only print error if we're still supposed to be running
-                    print(f"[HTTP_SERVER] Error accepting connection: {e}", flush=True)
+                    logger.error("Error accepting connection: %s", e)
                 continue
 
     except KeyboardInterrupt:
-        print("\n[HTTP_SERVER] Shutting down server...")
+        logger.info("Shutting down server...")
         stop_http_server()
     except Exception as e:
-        print(f"[HTTP_SERVER] Server error: {e}", flush=True)
+        logger.exception("Server error: %s", e)
         stop_http_server()
+    finally:
+        if executor is not None:
+            # Let the connections already handed to a worker finish
+            executor.shutdown(wait=True)
+
+
+async def handle_async_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                  router: Type[V1Router], executor: ThreadPoolExecutor,
+                                  keep_alive_timeout: float = 5.0, max_keep_alive_requests: int = 100,
+                                  max_upload_size: Optional[int] = None, request_timeout: float = 10.0) -> None:
+    """
+    Serves the requests of an asyncio stream in order, offloading the synchronous
+    parsing, routing and controller work to the executor.
+
+    Args:
+        reader (asyncio.StreamReader): The client stream reader.
+        writer (asyncio.StreamWriter): The client stream writer.
+        router (Type[V1Router]): The router used to dispatch the requests.
+        executor (ThreadPoolExecutor): The executor running the synchronous handlers.
+        keep_alive_timeout (float): Idle seconds before a persistent connection is closed, 0 disables keep-alive.
+        max_keep_alive_requests (int): Maximum requests served on one connection.
+        max_upload_size (Optional[int]): Largest accepted request body; larger ones get a 413.
+        request_timeout (float): Seconds the first request, and any request once it has started, may go
+            without receiving data. A connection sending nothing is closed; one stopping in the middle
+            of a request gets a 408.
+    """
+    loop = asyncio.get_running_loop()
+    requests_served = 0
+    try:
+        while True:
+            try:
+                timeout = keep_alive_timeout if requests_served else request_timeout
+                request = await read_full_request_async(reader, max_upload_size, timeout, request_timeout)
+            except asyncio.TimeoutError:
+                break  # Idle connection
+            except RequestTimeoutError as e:
+                logger.warning("Timed out reading request: %s", e)
+                count_error("bad_request")
+                writer.write(http_408_response())
+                await writer.drain()
+                break
+            except asyncio.LimitOverrunError:
+                logger.warning("Request headers too large, closing connection")
+                break
+            except PayloadTooLargeError as e:
+                # The body was not read, so the connection cannot be reused
+                logger.warning("Rejected request: %s", e)
+                count_error("bad_request")
+                writer.write(http_413_response())
+                await writer.drain()
+                break
+            except ValueError as e:
+                logger.warning("Malformed request: %s", e)
+                count_error("bad_request")
+                break
+
+            if request is None:
+                break
+
+            requests_served += 1
+            keep_alive = (keep_alive_timeout > 0 and server_running and requests_served < max_keep_alive_requests
+                          and should_keep_alive(request.version, request.headers))
+            metrics = v1_Metrics.metrics
+            if metrics is not None:
+                metrics.add_in_flight(1)  # On the event loop thread, as is the decrement
+            try:
+                try:
+                    response = await loop.run_in_executor(executor, handle_request, router, request, keep_alive)
+                except Exception as e:
+                    logger.exception("Failed to process request: %s", e)
+                    count_error("handler")
+                    keep_alive = False
+                    response = http_500_response()
 
+                if response is None:
+                    break
 
-def start_http_server(router: Type[V1Router], host: str = "127.0.0.1", port: int = 8080) -> None:
+                started = time.perf_counter()
+                sent = await send_response_async(writer, response, executor)
+                if metrics is not None:
+                    metrics.observe_phase("send", time.perf_counter() - started)
+                    metrics.add_response_bytes(sent)
+            finally:
+                if metrics is not None:
+                    metrics.add_in_flight(-1)
+            if not keep_alive or (isinstance(response, StreamingResponse) and not response.chunked):
+                break
+    except Exception as e:  # Connection errors, or a view failing half-way through a streamed body
+        logger.warning("Failed to send response: %s", e)
+        count_error("send")
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+async def serve_async(router: Type[V1Router], host: str, port: int, backlog: int, workers: Optional[int],
+                      keep_alive_timeout: float, max_keep_alive_requests: int, max_upload_size: Optional[int],
+                      request_timeout: float) -> None:
+    """Runs the asyncio server until stop_http_server is called."""
+    global async_loop, async_stop_event, server_running
+    async_loop = asyncio.get_running_loop()
+    async_stop_event = asyncio.Event()
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http-async-worker")
+
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_async_connection(reader, writer, router, executor,
+                                                       keep_alive_timeout, max_keep_alive_requests, max_upload_size,
+                                                       request_timeout),
+        host, port, backlog=backlog, limit=MAX_HEADER_SIZE,
+    )
+    server_running = True
+    logger.info("Async server started at http://%s:%s (Press CTRL+C to stop)", host, port)
+
+    try:
+        async with server:
+            await async_stop_event.wait()
+    finally:
+        server_running = False
+        async_loop = None
+        async_stop_event = None
+        executor.shutdown(wait=True)
+        logger.info("Async server stopped.")
+
+
+def run_async_server(router: Type[V1Router], host: str = "127.0.0.1", port: int = 8080, backlog: int = 100,
+                     workers: Optional[int] = None, keep_alive_timeout: float = 5.0,
+                     max_keep_alive_requests: int = 100, max_upload_size: Optional[int] = None,
+                     request_timeout: float = 10.0) -> None:
+    """
+    Runs the asyncio HTTP server engine. Connections are served by the event loop,
+    so idle clients only cost their stream buffers, while the synchronous router,
+    controllers and views run on an executor.
+
+    Args:
+        router (Type[V1Router]): The router used to dispatch requests.
+        host (str): The interface to bind to.
+        port (int): The port to bind to.
+        backlog (int): The listen() backlog of the server socket.
+        workers (Optional[int]): Size of the executor running controllers. Defaults to the asyncio default.
+        keep_alive_timeout (float): Idle seconds before a persistent connection is closed, 0 disables keep-alive.
+        max_keep_alive_requests (int): Maximum requests served on one persistent connection.
+        max_upload_size (Optional[int]): Largest accepted request body in bytes, None for no limit.
+        request_timeout (float): Seconds a request may go without receiving data, idle keep-alive
+            connections excepted.
+    """
+    try:
+        asyncio.run(serve_async(router, host, port, backlog, workers or None, keep_alive_timeout,
+                                max_keep_alive_requests, max_upload_size, request_timeout))
+    except KeyboardInterrupt:
+        logger.info("Shutting down server...")
+    except Exception as e:
+        logger.exception("Server error: %s", e)
+
+
+def start_http_server(router: Type[V1Router], host: str = "127.0.0.1", port: int = 8080, **server_options) -> None:
     """Starts the HTTP server and allows graceful shutdown with KeyboardInterrupt."""
-    run_server(router, host, port)
+    run_server(router, host, port, **server_options)
+
+
+def start_async_http_server(router: Type[V1Router], host: str = "127.0.0.1", port: int = 8080, **server_options) -> None:
+    """Starts the asyncio HTTP server engine."""
+    run_async_server(router, host, port, **server_options)
@@ -0,0 +1,120 @@
+from servers.v1_RequestParser import HttpRequest
+from servers.v1_ResponseBuilder import HttpResponse
+from typing import Any, Callable, Iterable, Optional
+
+# A composed request handler: (router, request, keep_alive) -> response, or None to skip the request
+RequestHandler = Callable[[Any, HttpRequest, bool], Optional[HttpResponse]]
+
+
+class V1Middleware:
+    """
+    Base class of middleware, hooking into the request/response cycle.
+
+    Override any of the three hooks; the ones left alone cost nothing, as compose_middleware
+    leaves them out of the chain. Middleware run in the order they are configured: every
+    before_routing hook in order, then the route, then every after_routing hook in reverse
+    order, like the layers of an onion. The same instance serves every request, possibly on
+    several threads at once, so keep per-request state out of attributes.
+    """
+
+    def before_routing(self, request: HttpRequest, keep_alive: bool) -> Optional[HttpResponse]:
+        """
+        Runs before the request is dispatched, e.g. to authenticate it, rate limit it or answer it from a cache.
+
+        Args:
+            request (HttpRequest): The request, with its body not parsed yet.
+            keep_alive (bool): Whether a response built here should announce a persistent connection.
+
+        Returns:
+            Optional[HttpResponse]: A response to send instead of dispatching the request, or None to go on.
+        """
+        return None
+
+    def after_routing(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        """
+        Runs on the response of a request, e.g. to add headers or store it in a cache.
+
+        Returns:
+            HttpResponse: The response to send, the given one or a replacement.
+        """
+        return response
+
+    def on_error(self, request: HttpRequest, error: Exception, keep_alive: bool) -> Optional[HttpResponse]:
+        """
+        Runs when a controller, view or inner middleware raises.
+
+        Returns:
+            Optional[HttpResponse]: A response to send instead, or None to let the error propagate,
+                ultimately to a 500 Internal Server Error.
+        """
+        return None
+
+
+def _overrides(middleware: Any, hook: str) -> bool:
+    """Whether middleware implements hook, rather than inheriting the no-op of V1Middleware or lacking it."""
+    implementation = getattr(type(middleware), hook, None)
+    return implementation is not None and implementation is not getattr(V1Middleware, hook)
+
+
+def _before_layer(before_routing, inner: RequestHandler) -> RequestHandler:
+    def handle(router, request: HttpRequest, keep_alive: bool) -> Optional[HttpResponse]:
+        response = before_routing(request, keep_alive)
+        if response is not None:
+            return response
+        return inner(router, request, keep_alive)
+    return handle
+
+
+def _after_layer(after_routing, inner: RequestHandler) -> RequestHandler:
+    def handle(router, request: HttpRequest, keep_alive: bool) -> Optional[HttpResponse]:
+        response = inner(router, request, keep_alive)
+        if response is None:  # Skipped request, nothing is sent
+            return None
+        return after_routing(request, response)
+    return handle
+
+
+def _error_layer(on_error, inner: RequestHandler) -> RequestHandler:
+    def handle(router, request: HttpRequest, keep_alive: bool) -> Optional[HttpResponse]:
+        try:
+            return inner(router, request, keep_alive)
+        except Exception as error:
+            response = on_error(request, error, keep_alive)
+            if response is None:
+                raise
+            return response
+    return handle
+
+
+def compose_middleware(middlewares: Iterable[Any], endpoint: RequestHandler) -> RequestHandler:
+    """
+    Composes middleware around endpoint into a single callable, once, at startup.
+
+    Each implemented hook becomes one closure wrapping the next, so a request runs straight
+    through them without iterating over the middleware list or checking which hooks exist.
+    A middleware's on_error sees the errors of the route and of the middleware after it, not
+    those of its own hooks.
+
+    Args:
+        middlewares (Iterable[Any]): V1Middleware instances, or objects with any of its hooks, outermost first.
+        endpoint (RequestHandler): The handler dispatching the request to the router.
+
+    Returns:
+        RequestHandler: endpoint itself when no middleware implements a hook.
+
+    Raises:
+        TypeError: If a middleware implements none of the hooks.
+    """
+    handler = endpoint
+    for middleware in reversed(list(middlewares)):
+        hooks = [hook for hook in ("before_routing", "after_routing", "on_error") if _overrides(middleware, hook)]
+        if not hooks and not isinstance(middleware, V1Middleware):
+            raise TypeError(f"{type(middleware).__name__} implements none of before_routing, after_routing "
+                            f"and on_error.")
+        if "on_error" in hooks:
+            handler = _error_layer(middleware.on_error, handler)
+        if "after_routing" in hooks:
+            handler = _after_layer(middleware.after_routing, handler)
+        if "before_routing" in hooks:
+            handler = _before_layer(middleware.before_routing, handler)
+    return handler
@@ -0,0 +1,138 @@
+from loggings.v1_Logging import get_logger, stop_logging
+from models.v1_Model import flush_write_behind_models
+from routers.v1_Router import V1Router
+from servers import v1_HttpServer
+from servers.v1_HttpServer import create_listen_socket, run_server
+import os
+import signal
+import socket
+import time
+from typing import Dict, Optional, Type
+
+logger = get_logger("prefork_server")
+
+# Seconds a worker must stay up before an exit counts as a crash worth an immediate restart
+MIN_WORKER_UPTIME = 1.0
+
+
+def spawn_worker(router: Type[V1Router], host: str, port: int, listen_socket: Optional[socket.socket],
+                 reuse_port: bool, server_options: dict) -> int:
+    """
+    Forks a worker process running run_server and returns its pid in the parent.
+
+    The worker stops gracefully on SIGTERM and ignores SIGINT, leaving Ctrl+C to the
+    supervisor so that workers are shut down one at a time.
+    """
+    pid = os.fork()
+    if pid:
+        return pid
+
+    exit_code = 0
+    try:
+        signal.signal(signal.SIGTERM, v1_HttpServer.signal_handler)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        run_server(router, host, port, listen_socket=listen_socket, reuse_port=reuse_port, **server_options)
+    except BaseException:
+        logger.exception("Worker %d failed", os.getpid())
+        exit_code = 1
+    finally:
+        flush_write_behind_models()  # os._exit skips atexit, so write out the pending changes
+        stop_logging()  # and the queued records first
+        os._exit(exit_code)
+
+
+def stop_worker(pid: int, graceful_timeout: float) -> None:
+    """Sends SIGTERM to a worker and waits for it, killing it once graceful_timeout expires."""
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+
+    deadline = time.time() + graceful_timeout
+    while time.time() < deadline:
+        try:
+            finished_pid, _ = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if finished_pid:
+            return
+        time.sleep(0.1)
+
+    logger.warning("Worker %d did not stop within %ss, killing it", pid, graceful_timeout)
+    os.kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+
+
+def run_prefork_server(router: Type[V1Router], host: str = "127.0.0.1", port: int = 8080, processes: int = 2,
+                       reuse_port: bool = False, graceful_timeout: float = 30.0, **server_options) -> None:
+    """
+    Runs a supervisor that pre-forks worker processes, each running run_server.
+
+    Workers either accept from one listening socket created before the fork, or with
+    reuse_port each bind their own SO_REUSEPORT socket and let the kernel balance
+    connections. The router is loaded once in the supervisor and shared with the
+    workers copy-on-write. Workers that exit are restarted; SIGTERM or SIGINT stops
+    them one at a time, each finishing its in-flight requests first.
+
+    Args:
+        router (Type[V1Router]): The router used to dispatch requests.
+        host (str): The interface to bind to.
+        port (int): The port to bind to.
+        processes (int): Number of worker processes.
+        reuse_port (bool): Give each worker its own SO_REUSEPORT socket instead of sharing one.
+        graceful_timeout (float): Seconds a worker is given to stop before it is killed.
+        **server_options: Extra keyword arguments for run_server (workers, keep_alive_timeout, ...).
+
+    Raises:
+        RuntimeError: If the platform cannot fork.
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Pre-fork mode requires os.fork, which is not available on this platform.")
+
+    listen_socket = None
+    if not reuse_port:
+        listen_socket = create_listen_socket(host, port, server_options.pop("backlog", 5))
+
+    shutdown_requested = False
+
+    def request_shutdown(signum, frame):
+        nonlocal shutdown_requested
+        logger.info("Received termination signal. Stopping workers...")
+        shutdown_requested = True
+
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(signal.SIGTERM, request_shutdown)
+
+    workers: Dict[int, float] = {}  # pid -> start time
+    for _ in range(processes):
+        pid = spawn_worker(router, host, port, listen_socket, reuse_port, server_options)
+        workers[pid] = time.time()
+    logger.info("Started %d workers at http://%s:%s: %s", processes, host, port, sorted(workers))
+
+    try:
+        while not shutdown_requested:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid, status = 0, 0
+            if not pid:
+                time.sleep(0.5)
+                continue
+
+            started = workers.pop(pid, time.time())
+            if shutdown_requested:
+                break
+
+            logger.warning("Worker %d exited with status %d, restarting it", pid, status)
+            if time.time() - started < MIN_WORKER_UPTIME:
+                time.sleep(MIN_WORKER_UPTIME)  # Avoid a tight restart loop on a worker crashing at startup
+            new_pid = spawn_worker(router, host, port, listen_socket, reuse_port, server_options)
+            workers[new_pid] = time.time()
+    finally:
+        # Rolling shutdown: one worker at a time, each draining its in-flight requests
+        for pid in list(workers):
+            stop_worker(pid, graceful_timeout)
+            workers.pop(pid, None)
+        if listen_socket is not None:
+            listen_socket.close()
+        logger.info("All workers stopped.")
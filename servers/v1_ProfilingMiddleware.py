@@ -0,0 +1,54 @@
+from loggings import v1_Profiling
+from routers.v1_Router import V1Router
+from servers.v1_Middleware import V1Middleware
+from servers.v1_RequestParser import HttpRequest
+from servers.v1_ResponseBuilder import HttpResponse
+import threading
+from typing import Optional
+
+
+class V1ProfilingMiddleware(V1Middleware):
+    """
+    Profiles the requests sampled by the configured profiler (see loggings/v1_Profiling.py),
+    from the moment the request reaches this middleware until its response is built.
+
+    Put it first in the chain to include the other middleware in the profiles. Only requests
+    matching a route of V1Router are profiled, grouped by the route's pattern; while profiling
+    is turned off, a request costs one check of the profiler global.
+    """
+
+    def __init__(self):
+        self._local = threading.local()  # The profiler and profile of the request being handled on each thread
+
+    def before_routing(self, request: HttpRequest, keep_alive: bool) -> Optional[HttpResponse]:
+        self._finish()  # Left by a skipped request, which gets no after_routing
+        profiler = v1_Profiling.profiler
+        if profiler is None or not profiler.should_profile(request.headers.get(v1_Profiling.PROFILE_HEADER)):
+            return None
+        route = get_route_pattern(request)
+        if route is not None:
+            self._local.profile = profiler, profiler.start(route, request.method.upper())
+        return None
+
+    def after_routing(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        self._finish()
+        return response
+
+    def on_error(self, request: HttpRequest, error: Exception, keep_alive: bool) -> Optional[HttpResponse]:
+        self._finish()
+        return None
+
+    def _finish(self) -> None:
+        profiler, session = getattr(self._local, "profile", (None, None))
+        if session is not None:
+            self._local.profile = None, None
+            profiler.finish(session)
+
+
+def get_route_pattern(request: HttpRequest) -> Optional[str]:
+    """Returns the pattern of the V1Router route handling a request, None if no route handles its method."""
+    match = V1Router.get_route_table().match(request.path.split("?", 1)[0])
+    if match is None:
+        return None
+    handler = match[0].get(request.method.upper())
+    return handler.route if handler is not None else None
@@ -1,117 +1,470 @@
+from loggings.v1_Logging import get_logger
 import re
-from typing import Tuple, Dict, Union
+from servers.v1_UploadToServer import open_upload_temp_file
+from typing import Any, BinaryIO, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
 from urllib.parse import parse_qs
 import json
+import os
 
-def parse_http_request(request_data: str) -> Tuple[str, str, Dict[str, Union[str, bytes]]]:
+logger = get_logger("request_parser")
+
+RawBody = Union[bytes, bytearray]
+
+# Largest header block accepted for a single multipart part
+MAX_PART_HEADER_SIZE = 16384
+
+
+class PayloadTooLargeError(ValueError):
+    """Raised when a request body is larger than the configured maximum upload size."""
+    pass
+
+
+class RequestTimeoutError(Exception):
+    """Raised when a client stops sending in the middle of a request."""
+    pass
+
+
+class RequestHeaders(dict):
+    """
+    A dictionary of request headers with case-insensitive keys.
+    Keys are stored lowercased, so lookups work whatever case the client used.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __setitem__(self, key: str, value: str) -> None:
+        super().__setitem__(key.lower(), value)
+
+    def __getitem__(self, key: str) -> str:
+        return super().__getitem__(key.lower())
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and super().__contains__(key.lower())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return super().get(key.lower(), default)
+
+
+class HttpRequest(NamedTuple):
+    """
+    A request as read from the socket: the parsed head and the still raw body.
+    Multipart bodies are parsed while they stream in, in which case body is empty
+    and form holds the parsed fields.
+    """
+    method: str
+    path: str
+    version: str
+    headers: RequestHeaders
+    body: RawBody
+    form: Optional[Dict[str, Any]] = None
+
+
+def parse_request_head(head: RawBody) -> Tuple[str, str, str, RequestHeaders]:
+    """
+    Parses the request line and headers of an HTTP request, once.
+
+    Args:
+        head (bytes): The raw request head, without the blank line that ends it.
+
+    Returns:
+        Tuple[str, str, str, RequestHeaders]: The method, path, HTTP version and headers.
+
+    Raises:
+        ValueError: If the request line is malformed.
+    """
+    # Header bytes are ISO-8859-1 per the HTTP spec, so this decode never fails
+    lines = head.decode("iso-8859-1").split("\r\n")
+
+    request_line = lines[0].split()
+    if len(request_line) < 2:
+        raise ValueError("Malformed request line")
+
+    method, path = request_line[:2]
+    version = request_line[2] if len(request_line) > 2 else "HTTP/1.0"
+
+    headers = RequestHeaders()
+    for line in lines[1:]:
+        key, separator, value = line.partition(":")
+        if separator:
+            headers[key.strip()] = value.strip()
+
+    return method, path, version, headers
+
+
+def get_content_length(headers: RequestHeaders) -> int:
+    """
+    Returns the request's Content-Length, 0 if absent.
+
+    Raises:
+        ValueError: If the header is not a non-negative integer.
+    """
+    content_length = headers.get("content-length", "0").strip() or "0"
+    if not content_length.isdigit():
+        raise ValueError(f"Invalid Content-Length: {content_length}")
+    return int(content_length)
+
+
+def get_multipart_boundary(headers: RequestHeaders) -> Optional[str]:
+    """
+    Returns the boundary of a multipart/form-data request, None for other content types.
+
+    Raises:
+        ValueError: If the request is multipart but has no boundary.
+    """
+    content_type = headers.get("content-type", "")
+    if "multipart/form-data" not in content_type:
+        return None
+    boundary_match = re.search(r'boundary=([^;]+)', content_type)
+    if not boundary_match:
+        raise ValueError("No boundary found in Content-Type header")
+    return boundary_match.group(1).strip().strip('"')
+
+
+def should_keep_alive(version: str, headers: RequestHeaders) -> bool:
+    """
+    Decides whether the client wants the connection kept open after the response.
+
+    HTTP/1.1 connections are persistent unless the client sends "Connection: close",
+    HTTP/1.0 connections only when the client sends "Connection: keep-alive".
+
+    Args:
+        version (str): The HTTP version from the request line.
+        headers (RequestHeaders): The request headers.
+
+    Returns:
+        bool: True if the connection should be kept open.
+    """
+    connection_tokens = {token.strip().lower() for token in headers.get("connection", "").split(",")}
+    if version.upper() == "HTTP/1.1":
+        return "close" not in connection_tokens
+    return "keep-alive" in connection_tokens
+
+
+def parse_multipart_body(raw_body: RawBody, boundary: str) -> Dict[str, Union[str, Dict[str, Any]]]:
+    """
+    Parses a multipart/form-data body without copying file contents.
+
+    File parts are returned as memoryview slices of raw_body, so they stay bit-exact
+    and cost no extra memory; only text fields are decoded.
+
+    Args:
+        raw_body (bytes): The raw request body.
+        boundary (str): The boundary from the Content-Type header.
+
+    Returns:
+        Dict[str, Union[str, Dict[str, Any]]]: Text fields as str and files as
+            {"filename", "content_type", "data"} dictionaries.
+    """
+    body: Dict[str, Union[str, Dict[str, Any]]] = {}
+    view = memoryview(raw_body)
+    delimiter = b"--" + boundary.encode("iso-8859-1")
+
+    position = raw_body.find(delimiter)
+    while position != -1:
+        position += len(delimiter)
+        if raw_body[position:position + 2] == b"--":  # Closing boundary
+            break
+
+        # Each part ends right before the CRLF preceding the next delimiter
+        part_end = raw_body.find(b"\r\n" + delimiter, position)
+        if part_end == -1:
+            part_end = len(raw_body)  # Tolerate a missing closing boundary
+
+        part_start = raw_body.find(b"\r\n", position, part_end)
+        split_index = raw_body.find(b"\r\n\r\n", part_start, part_end) if part_start != -1 else -1
+        position = raw_body.find(delimiter, part_end)
+        if split_index == -1:
+            continue  # Malformed part; skip
+
+        headers_part = bytes(view[part_start + 2:split_index]).decode("utf-8", errors="replace")
+        body_part = view[split_index + 4:part_end]
+
+        disposition_match = re.search(r'name="([^"]+)"(?:; filename="([^"]+)")?', headers_part)
+        if not disposition_match:
+            continue  # No valid Content-Disposition; skip
+
+        field_name, file_name = disposition_match.groups()
+
+        if file_name:  # File upload
+            content_type_match = re.search(r'Content-Type: *(.+)', headers_part, re.IGNORECASE)
+            file_content_type = content_type_match.group(1).strip() if content_type_match else "application/octet-stream"
+
+            body[field_name] = {
+                "filename": file_name,
+                "content_type": file_content_type,
+                "data": body_part  # Zero-copy view of the raw bytes
+            }
+        else:  # Text field
+            body[field_name] = bytes(body_part).decode("utf-8", errors="replace").strip()
+
+    return body
+
+
+class MultipartStreamParser:
+    """
+    Incremental multipart/form-data parser. It is fed the body chunk by chunk as it
+    is received and writes file parts straight to temporary files under
+    static/uploads/<ext>/, so an upload never has to fit in memory.
+
+    Example:
+        parser = MultipartStreamParser(boundary)
+        parser.feed(chunk)  # as many times as needed
+        fields = parser.close()
+    """
+
+    def __init__(self, boundary: str, open_file: Callable[[str], Tuple[BinaryIO, str]] = open_upload_temp_file):
+        """
+        Args:
+            boundary (str): The boundary from the Content-Type header.
+            open_file (Callable): Opens the temporary file of an upload from its file name
+                and returns it with its path.
+        """
+        self._delimiter = b"--" + boundary.encode("iso-8859-1")
+        self._part_end_marker = b"\r\n" + self._delimiter
+        self._open_file = open_file
+        self._buffer = bytearray()
+        self._state = "preamble"
+        self._fields: Dict[str, Union[str, Dict[str, Any]]] = {}
+        self._temp_paths: List[str] = []
+        self._part_name: Optional[str] = None
+        self._part_info: Optional[Dict[str, Any]] = None
+        self._part_file: Optional[BinaryIO] = None
+        self._part_text: Optional[bytearray] = None
+
+    def feed(self, data: Union[bytes, bytearray, memoryview]) -> None:
+        """Consumes the next chunk of the body."""
+        self._buffer += data
+        while self._state != "done" and self._advance():
+            pass
+
+    def close(self) -> Dict[str, Union[str, Dict[str, Any]]]:
+        """
+        Finishes parsing and returns the fields: text fields as str, files as
+        {"filename", "content_type", "temp_path", "size"} dictionaries.
+        """
+        if self._state == "data":
+            # Tolerate a missing closing boundary: whatever is left belongs to the last part
+            self._write(self._buffer)
+            self._buffer.clear()
+            self._finish_part()
+        self._state = "done"
+        return self._fields
+
+    def abort(self) -> None:
+        """Stops parsing and deletes every temporary file written so far."""
+        if self._part_file is not None:
+            self._part_file.close()
+            self._part_file = None
+        for temp_path in self._temp_paths:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        self._state = "done"
+
+    def _advance(self) -> bool:
+        """Runs one step of the state machine; returns False when more data is needed."""
+        if self._state == "preamble":
+            index = self._buffer.find(self._delimiter)
+            if index == -1:
+                del self._buffer[:max(0, len(self._buffer) - len(self._delimiter))]
+                return False
+            del self._buffer[:index + len(self._delimiter)]
+            self._state = "boundary"
+            return True
+
+        if self._state == "boundary":
+            if len(self._buffer) < 2:
+                return False
+            if self._buffer[:2] == b"--":  # Closing boundary
+                self._buffer.clear()
+                self._state = "done"
+                return False
+            line_end = self._buffer.find(b"\r\n")
+            if line_end == -1:
+                return False
+            del self._buffer[:line_end + 2]
+            self._state = "headers"
+            return True
+
+        if self._state == "headers":
+            if self._buffer[:2] == b"\r\n":
+                header_end, headers_part = 0, ""  # A part without headers
+            else:
+                header_end = self._buffer.find(b"\r\n\r\n")
+                if header_end == -1:
+                    if len(self._buffer) > MAX_PART_HEADER_SIZE:
+                        raise ValueError("Multipart part headers too large")
+                    return False
+                headers_part = self._buffer[:header_end].decode("utf-8", errors="replace")
+                header_end += 2
+            del self._buffer[:header_end + 2]
+            self._start_part(headers_part)
+            self._state = "data"
+            return True
+
+        if self._state == "data":
+            index = self._buffer.find(self._part_end_marker)
+            if index == -1:
+                # Everything but a possible partial end marker can be written out
+                safe_length = len(self._buffer) - len(self._part_end_marker) + 1
+                if safe_length > 0:
+                    self._write(self._buffer[:safe_length])
+                    del self._buffer[:safe_length]
+                return False
+            self._write(self._buffer[:index])
+            del self._buffer[:index + len(self._part_end_marker)]
+            self._finish_part()
+            self._state = "boundary"
+            return True
+
+        return False
+
+    def _start_part(self, headers_part: str) -> None:
+        disposition_match = re.search(r'name="([^"]+)"(?:; filename="([^"]+)")?', headers_part)
+        if not disposition_match:
+            self._part_name = None  # No valid Content-Disposition; skip
+            return
+
+        field_name, file_name = disposition_match.groups()
+        self._part_name = field_name
+        if file_name:  # File upload
+            content_type_match = re.search(r'Content-Type: *(.+)', headers_part, re.IGNORECASE)
+            self._part_file, temp_path = self._open_file(file_name)
+            self._temp_paths.append(temp_path)
+            self._part_info = {
+                "filename": file_name,
+                "content_type": content_type_match.group(1).strip() if content_type_match else "application/octet-stream",
+                "temp_path": temp_path,
+                "size": 0,
+            }
+        else:  # Text field
+            self._part_text = bytearray()
+
+    def _write(self, data: Union[bytes, bytearray]) -> None:
+        if self._part_file is not None:
+            self._part_file.write(data)
+            self._part_info["size"] += len(data)
+        elif self._part_text is not None:
+            self._part_text += data
+
+    def _finish_part(self) -> None:
+        if self._part_file is not None:
+            self._part_file.close()
+            self._fields[self._part_name] = self._part_info
+        elif self._part_text is not None:
+            self._fields[self._part_name] = self._part_text.decode("utf-8", errors="replace").strip()
+        self._part_name, self._part_info, self._part_file, self._part_text = None, None, None, None
+
+
+def parse_http_body(headers: RequestHeaders, raw_body: RawBody) -> Dict[str, Union[str, Dict[str, Any]]]:
+    """
+    Parses a request body according to its Content-Type.
+
+    Args:
+        headers (RequestHeaders): The request headers.
+        raw_body (bytes): The raw request body.
+
+    Returns:
+        Dict[str, Union[str, Dict[str, Any]]]: Contains text fields (str) and file data (dict).
+
+    Raises:
+        ValueError: If the body cannot be parsed or the Content-Type is unsupported.
+    """
+    # Initialize body dictionary
+    body: Dict[str, Union[str, Dict[str, Any]]] = {}
+
+    # Check for Content-Type to determine how to parse the body
+    content_type = headers.get("content-type", "")
+
+    if "multipart/form-data" in content_type:
+        # Handle multipart/form-data
+        body.update(parse_multipart_body(raw_body, get_multipart_boundary(headers)))
+
+    elif "application/json" in content_type:
+        # Handle JSON data
+        try:
+            if raw_body:
+                body.update(json.loads(raw_body))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid JSON in request body: {e}")
+
+    elif "application/x-www-form-urlencoded" in content_type or not content_type:
+        # Handle application/x-www-form-urlencoded or no Content-Type
+        decoded_body = raw_body.decode("utf-8", errors="ignore")
+        body.update({k: v[0] for k, v in parse_qs(decoded_body).items()})
+
+    else:
+        raise ValueError(f"Unsupported Content-Type: {content_type}")
+    return body
+
+
+def parse_http_request(request_data: Union[RawBody, str]) -> Tuple[str, str, Dict[str, Union[str, Dict[str, Any]]]]:
     """
     Parses an HTTP request, handling both application/x-www-form-urlencoded
     and multipart/form-data correctly.
 
     Args:
-        request_data (str): The raw HTTP request data.
+        request_data (bytes): The raw HTTP request data. str is accepted for backward compatibility.
 
     Returns:
-        Tuple[str, str, Dict[str, Union[str, bytes]]]: 
+        Tuple[str, str, Dict[str, Union[str, Dict[str, Any]]]]:
             - method (str): HTTP method (e.g., "GET", "POST").
             - path (str): The request path (e.g., "/some-route").
-            - body (dict): Contains text fields (str) and file data (bytes).
+            - body (dict): Contains text fields (str) and file data (dict with a "data" view).
     """
     try:
+        if isinstance(request_data, str):
+            request_data = request_data.encode("utf-8")
+
         # Skip empty requests
         if not request_data or not request_data.strip():
             return "", "", {}
 
         # Split headers and body
-        if "\r\n\r\n" not in request_data:
+        header_end = request_data.find(b"\r\n\r\n")
+        if header_end == -1:
             raise ValueError("Malformed request, no headers found")
 
-        headers, raw_body = request_data.split("\r\n\r\n", 1)
-        header_lines = headers.split("\r\n")
-
-        # Extract method and path
-        request_line = header_lines[0].split()
-        if len(request_line) < 2:
-            raise ValueError("Malformed request line")
-
-        method, path = request_line[:2]
+        method, path, _, headers = parse_request_head(request_data[:header_end])
 
         # Skip requests for favicon.ico and other browser-generated requests
         if path == "/favicon.ico" or not path.startswith("/"):
             return "", "", {}
 
-        # Extract headers
-        header_dict = {}
-        for line in header_lines[1:]:
-            if ": " in line:
-                key, value = line.split(": ", 1)
-                header_dict[key.lower()] = value.strip()
-
-        # Initialize body dictionary
-        body: Dict[str, Union[str, bytes]] = {}
-
-        # Check for Content-Type to determine how to parse the body
-        content_type = header_dict.get("content-type", "")
-        
-        if "multipart/form-data" in content_type:
-            # Handle multipart/form-data
-            boundary_match = re.search(r'boundary=([^;]+)', content_type)
-            if not boundary_match:
-                raise ValueError("No boundary found in Content-Type header")
-
-            boundary = f"--{boundary_match.group(1)}"
-            
-            # Ensure the request ends with the correct boundary
-            if not raw_body.endswith(f"{boundary}--"):
-                raw_body += f"\r\n{boundary}--"
-
-            parts = raw_body.split(boundary)
-            for part in parts:
-                part = part.strip()
-                if not part or part == "--":  # Skip empty parts and closing boundary
-                    continue
-
-                split_index = part.find("\r\n\r\n")
-                if split_index == -1:
-                    continue  # Malformed part; skip
-
-                headers_part = part[:split_index]
-                body_part = part[split_index + 4:]  # Skip "\r\n\r\n"
-
-                disposition_match = re.search(r'name="([^"]+)"(?:; filename="([^"]+)")?', headers_part)
-                if not disposition_match:
-                    continue  # No valid Content-Disposition; skip
-
-                field_name, file_name = disposition_match.groups()
-
-                if file_name:  # File upload
-                    content_type_match = re.search(r'Content-Type: (.+)', headers_part)
-                    file_content_type = content_type_match.group(1) if content_type_match else "application/octet-stream"
-                    
-                    body[field_name] = {
-                        "filename": file_name,
-                        "content_type": file_content_type,
-                        "data": body_part.encode("utf-8")  # Use utf-8 for binary data
-                    }
-                else:  # Text field
-                    body[field_name] = body_part.strip()
-
-        elif "application/json" in content_type:
-            # Handle JSON data
-            try:
-                if raw_body:
-                    body.update(json.loads(raw_body))
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Invalid JSON in request body: {e}")
+        return method, path, parse_http_body(headers, request_data[header_end + 4:])
+
+    except Exception as e:
+        logger.error("Error parsing request: %s", e)
+        return "", "", {}
+
+
+def parse_request(request: Optional[HttpRequest]) -> Tuple[str, str, Dict[str, Union[str, Dict[str, Any]]]]:
+    """
+    Parses the body of a request read by the server, applying the same rules as parse_http_request.
 
-        elif "application/x-www-form-urlencoded" in content_type or not content_type:
-            # Handle application/x-www-form-urlencoded or no Content-Type
-            body.update({k: v[0] for k, v in parse_qs(raw_body).items()})
+    Args:
+        request (Optional[HttpRequest]): The request, or None if nothing was read.
 
-        else:
-            raise ValueError(f"Unsupported Content-Type: {content_type}")
-        return method, path, body
+    Returns:
+        Tuple[str, str, Dict[str, Union[str, Dict[str, Any]]]]: The method, path and body,
+            or empty values if the request should be skipped.
+    """
+    if request is None:
+        return "", "", {}
 
+    # Skip requests for favicon.ico and other browser-generated requests
+    if request.path == "/favicon.ico" or not request.path.startswith("/"):
+        return "", "", {}
+
+    if request.form is not None:  # Already parsed while streaming in
+        return request.method, request.path, request.form
+
+    try:
+        return request.method, request.path, parse_http_body(request.headers, request.body)
     except Exception as e:
-        print(f"Error parsing request: {e}")
-        return "", "", {}
\ No newline at end of file
+        logger.error("Error parsing request: %s", e)
+        return "", "", {}
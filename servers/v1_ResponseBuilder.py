@@ -1,4 +1,70 @@
-def construct_http_response(status_code: int, body: bytes, content_type: str = "text/html") -> bytes:
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, NamedTuple, Optional, Union
+
+STATUS_MESSAGES = {
+    200: "OK", 206: "Partial Content", 304: "Not Modified", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 413: "Payload Too Large", 416: "Range Not Satisfiable", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+# Streamed bodies are sent in pieces of at least this many bytes, so a generator yielding
+# one small row at a time does not cost one write (and one chunk header) per row
+STREAM_FLUSH_SIZE = 16384
+
+LAST_CHUNK = b"0\r\n\r\n"
+
+Chunk = Union[str, bytes, bytearray]
+
+
+class StreamingResponse(NamedTuple):
+    """A response whose body is produced by an iterator and sent while it is generated."""
+    head: bytes
+    chunks: Union[Iterable[Chunk], AsyncIterable[Chunk]]
+    chunked: bool = True  # False (HTTP/1.0 clients) sends the raw body and ends it by closing the connection
+
+
+class FileResponse(NamedTuple):
+    """A response whose body is sent from a file with sendfile instead of being built in memory."""
+    head: bytes
+    file_path: str
+    offset: int
+    count: int
+
+
+# Everything handle_request can answer with
+HttpResponse = Union[bytes, FileResponse, StreamingResponse]
+
+
+def build_response_head(status_code: int, content_type: Optional[str] = None, content_length: Optional[int] = None,
+                        keep_alive: bool = False, headers: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    Builds the status line and headers of an HTTP response, up to and including the blank line.
+
+    Args:
+        status_code (int): The HTTP status code (e.g., 200, 404).
+        content_type (Optional[str]): The Content-Type header, used verbatim. Omitted if None.
+        content_length (Optional[int]): The Content-Length header. Omitted if None.
+        keep_alive (bool): Whether the connection stays open for further requests.
+        headers (Optional[Dict[str, str]]): Extra headers, e.g. ETag or Cache-Control.
+
+    Returns:
+        bytes: The formatted response head.
+    """
+    status_message = STATUS_MESSAGES.get(status_code, "Unknown Status")
+
+    lines = [f"HTTP/1.1 {status_code} {status_message}"]
+    if content_type is not None:
+        lines.append(f"Content-Type: {content_type}")
+    if content_length is not None:
+        lines.append(f"Content-Length: {content_length}")
+    if headers:
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+    lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")  # Convert headers to bytes
+
+
+def construct_http_response(status_code: int, body: bytes, content_type: str = "text/html", keep_alive: bool = False,
+                            headers: Optional[Dict[str, str]] = None) -> bytes:
     """
     Constructs a full HTTP response for both text and binary data.
 
@@ -6,31 +72,135 @@ def construct_http_response(status_code: int, body: bytes, content_type: str = "
         status_code (int): The HTTP status code (e.g., 200, 404).
         body (bytes): The response body (can be binary).
         content_type (str): The content type of the response.
+        keep_alive (bool): Whether the connection stays open for further requests.
+        headers (Optional[Dict[str, str]]): Extra headers to send.
 
     Returns:
         bytes: The formatted HTTP response.
     """
-    status_messages = {200: "OK", 404: "Not Found", 500: "Internal Server Error"}
-    status_message = status_messages.get(status_code, "Unknown Status")
+    head = build_response_head(status_code, f"{content_type}; charset=utf-8", len(body), keep_alive, headers)
+    return head + body  # Append headers and binary body
 
-    headers = (
-        f"HTTP/1.1 {status_code} {status_message}\r\n"
-        f"Content-Type: {content_type}; charset=utf-8\r\n"
-        f"Content-Length: {len(body)}\r\n"
-        "Connection: close\r\n\r\n"
-    ).encode("utf-8")  # Convert headers to bytes
 
-    return headers + body  # Append headers and binary body
+def construct_streaming_response(status_code: int, chunks: Union[Iterable[Chunk], AsyncIterable[Chunk]],
+                                 content_type: str = "text/html", keep_alive: bool = False,
+                                 headers: Optional[Dict[str, str]] = None, chunked: bool = True) -> StreamingResponse:
+    """
+    Constructs a response whose body is sent as the iterator produces it, with
+    Transfer-Encoding: chunked, so it never has to be held in memory as a whole.
 
+    Args:
+        status_code (int): The HTTP status code.
+        chunks (Union[Iterable, AsyncIterable]): The body, as str or bytes pieces.
+        content_type (str): The content type of the response.
+        keep_alive (bool): Whether the connection stays open for further requests.
+        headers (Optional[Dict[str, str]]): Extra headers to send.
+        chunked (bool): Use chunked framing. Without it (for HTTP/1.0 clients) the end of the
+            body is marked by closing the connection, so keep_alive is ignored.
+
+    Returns:
+        StreamingResponse: The response head and the chunks to send with write_chunks.
+    """
+    headers = dict(headers or {})
+    if chunked:
+        headers["Transfer-Encoding"] = "chunked"
+    head = build_response_head(status_code, f"{content_type}; charset=utf-8", None, keep_alive and chunked, headers)
+    return StreamingResponse(head, chunks, chunked)
+
+
+def encode_chunk(data: Union[bytes, bytearray]) -> bytes:
+    """Frames data as one chunk of a chunked body."""
+    return b"%x\r\n%s\r\n" % (len(data), data)
+
+
+def write_chunks(chunks: Iterable[Chunk], chunked: bool = True, flush_size: int = STREAM_FLUSH_SIZE) -> Iterator[bytes]:
+    """
+    Turns the pieces produced by a view into the bytes to send: str is UTF-8 encoded, small
+    pieces are coalesced up to flush_size, and with chunked framing every write is a chunk,
+    followed by the last (empty) chunk.
+
+    Args:
+        chunks (Iterable[Chunk]): The body, as str or bytes pieces.
+        chunked (bool): Frame the body with Transfer-Encoding: chunked.
+        flush_size (int): Bytes gathered before a write.
+
+    Yields:
+        bytes: The next bytes to send.
+    """
+    buffer = bytearray()
+    try:
+        for chunk in chunks:
+            buffer += chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+            if len(buffer) >= flush_size:
+                yield encode_chunk(buffer) if chunked else bytes(buffer)
+                buffer.clear()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:  # Stop a generator when the client went away
+            close()
+    if buffer:
+        yield encode_chunk(buffer) if chunked else bytes(buffer)
+    if chunked:
+        yield LAST_CHUNK
 
 
-def http_404_response():
+async def write_chunks_async(chunks: AsyncIterable[Chunk], chunked: bool = True,
+                             flush_size: int = STREAM_FLUSH_SIZE) -> AsyncIterator[bytes]:
+    """The same as write_chunks, for an async generator."""
+    buffer = bytearray()
+    try:
+        async for chunk in chunks:
+            buffer += chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+            if len(buffer) >= flush_size:
+                yield encode_chunk(buffer) if chunked else bytes(buffer)
+                buffer.clear()
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    if buffer:
+        yield encode_chunk(buffer) if chunked else bytes(buffer)
+    if chunked:
+        yield LAST_CHUNK
+
+
+def response_status(response: HttpResponse) -> int:
+    """Returns the status code of a built response, read from its status line."""
+    head = response if isinstance(response, bytes) else response.head
+    return int(head[9:12])
+
+
+def http_404_response(keep_alive: bool = False):
     """Returns a 404 Not Found response."""
     body = b'<h1>404 Not Found</h1><p>The requested resource was not found.</p>'
-    return construct_http_response(404, body)
+    return construct_http_response(404, body, keep_alive=keep_alive)
+
+
+def http_405_response(allowed_methods, keep_alive: bool = False):
+    """Returns a 405 Method Not Allowed response listing the allowed methods in the Allow header."""
+    body = b'<h1>405 Method Not Allowed</h1><p>The requested resource does not support this method.</p>'
+    return construct_http_response(405, body, keep_alive=keep_alive, headers={"Allow": ", ".join(allowed_methods)})
 
 
-def http_500_response():
+def http_408_response(keep_alive: bool = False):
+    """Returns a 408 Request Timeout response."""
+    body = b'<h1>408 Request Timeout</h1><p>The request was not received in time.</p>'
+    return construct_http_response(408, body, keep_alive=keep_alive)
+
+
+def http_413_response(keep_alive: bool = False):
+    """Returns a 413 Payload Too Large response."""
+    body = b'<h1>413 Payload Too Large</h1><p>The request body exceeds the maximum upload size.</p>'
+    return construct_http_response(413, body, keep_alive=keep_alive)
+
+
+def http_500_response(keep_alive: bool = False):
     """Returns a 500 Internal Server Error response."""
     body = b'<h1>500 Internal Server Error</h1><p>Something went wrong.</p>'
-    return construct_http_response(500, body)
+    return construct_http_response(500, body, keep_alive=keep_alive)
+
+
+def http_503_response(keep_alive: bool = False):
+    """Returns a 503 Service Unavailable response."""
+    body = b'<h1>503 Service Unavailable</h1><p>The server is busy, please retry shortly.</p>'
+    return construct_http_response(503, body, keep_alive=keep_alive)
@@ -0,0 +1,125 @@
+from collections import OrderedDict
+import os
+from servers.v1_Compression import ENCODERS, is_compressible
+import threading
+from typing import Dict, NamedTuple, Optional
+
+# Variants are compressed once per file version, so at the highest level of each coding
+PRECOMPRESSION_LEVEL = 22
+
+
+class CachedFile(NamedTuple):
+    """A cached static file: the stat it was read with and its body per content coding."""
+    mtime_ns: int
+    size: int
+    variants: Dict[str, bytes]  # "identity", plus every coding in ENCODERS that is smaller
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(body) for body in self.variants.values())
+
+
+def compress_variants(data: bytes, content_type: str) -> Dict[str, bytes]:
+    """
+    Builds the body of a file in every supported content coding.
+
+    Args:
+        data (bytes): The file contents.
+        content_type (str): The file's Content-Type; only compressible types get compressed variants.
+
+    Returns:
+        Dict[str, bytes]: The identity body, plus the compressed bodies that are smaller than it.
+    """
+    variants = {"identity": data}
+    if not is_compressible(content_type):
+        return variants
+
+    for encoding, compress in ENCODERS.items():
+        body = compress(data, PRECOMPRESSION_LEVEL)
+        if len(body) < len(data):
+            variants[encoding] = body
+    return variants
+
+
+class V1StaticCache:
+    """
+    Keeps small static files in memory, with precompressed variants, evicting the least
+    recently used ones once the total size of all variants exceeds max_bytes.
+
+    Entries are keyed by absolute path and checked against the file's mtime and size on
+    every lookup, so a changed file is read again; invalidate() drops entries eagerly.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, max_file_size: int = 256 * 1024):
+        """
+        Args:
+            max_bytes (int): Total size of the cached bodies, all variants included.
+            max_file_size (int): Files larger than this are never cached.
+        """
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str, stat_result: os.stat_result, content_type: str) -> Optional[CachedFile]:
+        """
+        Returns the cached file, reading and compressing it on a miss or after it changed.
+
+        Args:
+            file_path (str): The path of the file.
+            stat_result (os.stat_result): The file's current stat, used to validate the entry.
+            content_type (str): The file's Content-Type, deciding which variants are built.
+
+        Returns:
+            Optional[CachedFile]: The cached file, or None if it is too large to cache or cannot be read.
+        """
+        if stat_result.st_size > self.max_file_size:
+            return None
+
+        key = os.path.abspath(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.mtime_ns, entry.size) == (stat_result.st_mtime_ns, stat_result.st_size):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        try:
+            with open(file_path, "rb") as file:
+                data = file.read(stat_result.st_size + 1)
+        except OSError:
+            return None
+        if len(data) != stat_result.st_size:
+            return None  # Changed since the stat, serve it from disk this time
+
+        entry = CachedFile(stat_result.st_mtime_ns, stat_result.st_size, compress_variants(data, content_type))
+        if entry.nbytes <= self.max_bytes:
+            with self._lock:
+                self._discard(key)
+                self._entries[key] = entry
+                self.current_bytes += entry.nbytes
+                while self.current_bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.current_bytes -= evicted.nbytes
+        return entry
+
+    def invalidate(self, file_path: Optional[str] = None) -> None:
+        """Drops the entry of file_path, or every entry if no path is given."""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+                self.current_bytes = 0
+            else:
+                self._discard(os.path.abspath(file_path))
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.nbytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
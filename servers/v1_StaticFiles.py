@@ -0,0 +1,333 @@
+from email.utils import formatdate, parsedate_to_datetime
+from loggings.v1_Logging import get_logger
+import os
+from pathlib import Path
+from servers.v1_Compression import choose_encoding
+from servers.v1_RequestParser import RequestHeaders
+from servers.v1_ResponseBuilder import FileResponse, build_response_head, construct_http_response
+from servers.v1_StaticCache import V1StaticCache
+import stat
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import unquote
+import uuid
+
+logger = get_logger("static_files")
+
+STATIC_DIR = "static"
+
+# In-memory cache of small static files, set up with configure_static_cache (disabled by default)
+static_cache: Optional[V1StaticCache] = None
+
+# Files up to this size are read and sent with their headers in one write; larger ones use sendfile
+SENDFILE_MIN_SIZE = 65536
+
+CACHE_CONTROL = {
+    ".html": "no-cache",
+    ".css": "public, max-age=3600",
+    ".js": "public, max-age=3600",
+    ".jpg": "public, max-age=86400",
+    ".jpeg": "public, max-age=86400",
+    ".png": "public, max-age=86400",
+    ".gif": "public, max-age=86400",
+    ".svg": "public, max-age=86400",
+    ".ico": "public, max-age=86400",
+    ".mp4": "public, max-age=604800",
+    ".webm": "public, max-age=604800",
+}
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+# Multi-range responses are assembled in memory, so they are limited in count and total size.
+# Beyond these the Range header is ignored and the whole file is sent with 200.
+MAX_RANGES = 16
+MAX_MULTI_RANGE_SIZE = 1048576
+
+
+def get_content_type(file_path: str) -> str:
+    """Returns the appropriate Content-Type based on the file extension."""
+    ext = Path(file_path).suffix
+    return {
+        ".html": "text/html",
+        ".css": "text/css",
+        ".js": "application/javascript",
+        ".jpg": "image/jpeg",
+        ".jpeg": "image/jpeg",
+        ".png": "image/png",
+        ".gif": "image/gif",
+        ".svg": "image/svg+xml",
+        ".ico": "image/x-icon",
+        ".mp4": "video/mp4",
+        ".webm": "video/webm",
+    }.get(ext, "application/octet-stream")  # Default binary data type
+
+
+def resolve_static_path(url_path: str) -> Optional[str]:
+    """
+    Maps a /static/ URL to a file path inside STATIC_DIR.
+
+    Args:
+        url_path (str): The request path, possibly with a query string.
+
+    Returns:
+        Optional[str]: The file path, or None if the URL points outside STATIC_DIR.
+    """
+    relative = unquote(url_path.split("?", 1)[0])[len("/static/"):]
+    file_path = os.path.normpath(os.path.join(STATIC_DIR, relative))
+    if not file_path.startswith(os.path.normpath(STATIC_DIR) + os.sep):
+        return None
+    return file_path
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """Builds a strong ETag from a file's modification time and size."""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def is_not_modified(headers: RequestHeaders, etag: str, mtime: float) -> bool:
+    """
+    Evaluates If-None-Match, or If-Modified-Since when there is no If-None-Match.
+
+    Args:
+        headers (RequestHeaders): The request headers.
+        etag (str): The current ETag of the file.
+        mtime (float): The current modification time of the file.
+
+    Returns:
+        bool: True if the client's copy is current and a 304 can be sent.
+    """
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison, as required for If-None-Match
+        return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False  # Unparsable dates are ignored
+    return False
+
+
+def configure_static_cache(max_bytes: int, max_file_size: int = 256 * 1024) -> Optional[V1StaticCache]:
+    """
+    Enables the in-memory static file cache, or disables it when max_bytes is 0.
+
+    Args:
+        max_bytes (int): Total size of the cached bodies, precompressed variants included.
+        max_file_size (int): Files larger than this are always served from disk.
+
+    Returns:
+        Optional[V1StaticCache]: The cache in use, None if disabled.
+    """
+    global static_cache
+    static_cache = V1StaticCache(max_bytes, max_file_size) if max_bytes > 0 else None
+    return static_cache
+
+
+def invalidate_static_file(file_path: Optional[str] = None) -> None:
+    """Drops a changed file (or every file) from the static cache, if it is enabled."""
+    if static_cache is not None:
+        static_cache.invalidate(file_path)
+
+
+def parse_range_header(range_header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parses a Range header into byte windows of a file, merging overlapping or adjacent ones.
+
+    Args:
+        range_header (str): The Range header, e.g. "bytes=0-499, -500".
+        size (int): The size of the file.
+
+    Returns:
+        Optional[List[Tuple[int, int]]]: Sorted (start, end) windows with an inclusive end. An empty
+            list if none is satisfiable, None if the header is malformed and must be ignored.
+    """
+    unit, _, range_set = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not range_set.strip():
+        return None
+
+    ranges = []
+    for spec in range_set.split(","):
+        first, dash, last = spec.strip().partition("-")
+        if not dash or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+            return None
+        if not first:  # Suffix range: the last N bytes
+            if int(last) == 0:
+                continue
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+        if start < size:
+            ranges.append((start, end))
+
+    ranges.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def if_range_matches(if_range: Optional[str], etag: str, last_modified: str) -> bool:
+    """Returns True if there is no If-Range, or if it names the current (strong) ETag or Last-Modified date."""
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag  # Strong comparison, weak tags never match
+    return if_range == last_modified
+
+
+def read_file_window(file_path: str, start: int, count: int) -> bytes:
+    """Reads count bytes of a file starting at offset start."""
+    with open(file_path, "rb") as file:
+        file.seek(start)
+        return file.read(count)
+
+
+def build_range_response(file_path: str, ranges: List[Tuple[int, int]], size: int, content_type: str,
+                         keep_alive: bool, response_headers: Dict[str, str],
+                         method: str) -> Optional[Union[bytes, FileResponse]]:
+    """
+    Builds a 206 Partial Content response for the satisfiable ranges of a file.
+
+    A single range is sent from disk like a whole file; several are read and sent as
+    multipart/byteranges.
+
+    Returns:
+        Optional[Union[bytes, FileResponse]]: The response, or None if the ranges are too many or
+            too large to assemble, in which case the whole file should be sent.
+    """
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        count = end - start + 1
+        headers = dict(response_headers, **{"Content-Range": f"bytes {start}-{end}/{size}"})
+        head = build_response_head(206, content_type, count, keep_alive, headers)
+        if method == "HEAD":
+            return head
+        if count > SENDFILE_MIN_SIZE:
+            return FileResponse(head, file_path, start, count)
+        return head + read_file_window(file_path, start, count)
+
+    if len(ranges) > MAX_RANGES or sum(end - start + 1 for start, end in ranges) > MAX_MULTI_RANGE_SIZE:
+        return None
+
+    boundary = uuid.uuid4().hex
+    body = bytearray()
+    for start, end in ranges:
+        body += (f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+                 f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n").encode("utf-8")
+        body += read_file_window(file_path, start, end - start + 1)
+        body += b"\r\n"
+    body += f"--{boundary}--\r\n".encode("utf-8")
+
+    head = build_response_head(206, f"multipart/byteranges; boundary={boundary}", len(body), keep_alive,
+                               response_headers)
+    return head if method == "HEAD" else head + bytes(body)
+
+
+def serve_static_file(url_path: str, headers: Optional[RequestHeaders] = None, method: str = "GET",
+                      keep_alive: bool = False) -> Union[bytes, FileResponse]:
+    """
+    Builds the response for a /static/ request from the file's stat, without reading large files.
+
+    ETag and Last-Modified come from the stat, a matching If-None-Match or If-Modified-Since
+    gets a 304, and Cache-Control is chosen by extension. A Range header (honoured unless an
+    If-Range no longer matches) gets a 206 with only the requested bytes, or a 416 if none of
+    them exist. Small bodies are returned in memory; larger ones as a FileResponse whose body
+    the server sends with sendfile.
+
+    With the static cache enabled, small files are served from memory, in the precompressed
+    coding chosen from Accept-Encoding.
+
+    Args:
+        url_path (str): The request path, starting with /static/.
+        headers (Optional[RequestHeaders]): The request headers, for conditional requests.
+        method (str): The request method. HEAD gets the headers only.
+        keep_alive (bool): Whether the response announces a persistent connection.
+
+    Returns:
+        Union[bytes, FileResponse]: The response, or its head and the file to send after it.
+    """
+    headers = headers if headers is not None else RequestHeaders()
+    file_path = resolve_static_path(url_path)
+    try:
+        stat_result = os.stat(file_path) if file_path else None
+    except OSError:
+        stat_result = None
+    if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+        return construct_http_response(404, b"File Not Found", "text/plain", keep_alive)
+
+    content_type = get_content_type(file_path)
+    range_header = headers.get("Range")
+    # Ranges are always served from disk, and only ever of the identity coding
+    cached = None
+    if static_cache is not None and range_header is None:
+        cached = static_cache.get(file_path, stat_result, content_type)
+
+    etag = make_etag(stat_result)
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    response_headers: Dict[str, str] = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": CACHE_CONTROL.get(Path(file_path).suffix.lower(), DEFAULT_CACHE_CONTROL),
+        "Accept-Ranges": "bytes",
+    }
+
+    encoding = "identity"
+    if cached is not None and len(cached.variants) > 1:
+        encoding = choose_encoding(headers.get("Accept-Encoding"), cached.variants)
+        response_headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            etag = f'{etag[:-1]}-{encoding}"'  # Each coding is a different representation
+            response_headers["ETag"] = etag
+            response_headers["Content-Encoding"] = encoding
+
+    if is_not_modified(headers, etag, stat_result.st_mtime):
+        return build_response_head(304, keep_alive=keep_alive, headers=response_headers)
+
+    if content_type.startswith("text/"):
+        content_type += "; charset=utf-8"
+
+    if cached is not None:
+        body = cached.variants[encoding]
+        head = build_response_head(200, content_type, len(body), keep_alive, response_headers)
+        return head if method == "HEAD" else head + body
+
+    if range_header is not None and if_range_matches(headers.get("If-Range"), etag, last_modified):
+        ranges = parse_range_header(range_header, stat_result.st_size)
+        if ranges == []:
+            unsatisfiable = dict(response_headers, **{"Content-Range": f"bytes */{stat_result.st_size}"})
+            return construct_http_response(416, b"Range Not Satisfiable", "text/plain", keep_alive, unsatisfiable)
+        if ranges:
+            try:
+                response = build_range_response(file_path, ranges, stat_result.st_size, content_type, keep_alive,
+                                                response_headers, method)
+            except OSError as e:
+                logger.error("Error reading static file %s: %s", file_path, e)
+                return construct_http_response(500, b"Internal Server Error", "text/plain", keep_alive)
+            if response is not None:
+                return response
+
+    head = build_response_head(200, content_type, stat_result.st_size, keep_alive, response_headers)
+
+    if method == "HEAD":
+        return head
+    if stat_result.st_size > SENDFILE_MIN_SIZE:
+        return FileResponse(head, file_path, 0, stat_result.st_size)
+
+    try:
+        with open(file_path, "rb") as file:  # Read in binary mode
+            file_data = file.read(stat_result.st_size)
+    except OSError as e:
+        logger.error("Error reading static file %s: %s", file_path, e)
+        return construct_http_response(500, b"Internal Server Error", "text/plain", keep_alive)
+    if len(file_data) != stat_result.st_size:  # Truncated since the stat
+        head = build_response_head(200, content_type, len(file_data), keep_alive, response_headers)
+    return head + file_data
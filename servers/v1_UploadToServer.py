@@ -1,45 +1,96 @@
+from loggings.v1_Logging import get_logger
 import os
-from typing import Dict, Union
+import tempfile
+from typing import Any, BinaryIO, Dict, Tuple, Union
 
-def save_uploaded_file(file_info: Dict[str, Union[str, bytes]]) -> str:
+logger = get_logger("upload")
+
+UPLOAD_BASE_DIR = "static/uploads"
+
+
+def get_upload_path(filename: str) -> str:
     """
-    Saves an uploaded file to a subdirectory based on its extension.
+    Returns where an uploaded file is stored: a subdirectory of static/uploads named
+    after its extension. The directory is created if needed.
 
     Args:
-        file_info (dict): A dictionary containing 'filename', 'content_type', and 'data'.
+        filename (str): The client-supplied file name.
 
     Returns:
-        str: The path of the saved file.
+        str: The path of the file inside its upload directory.
     """
-    upload_base_dir = "static/uploads" 
-    os.makedirs(upload_base_dir, exist_ok=True)
-
-    filename = file_info['filename']
+    filename = os.path.basename(filename.replace("\\", "/"))  # Never let the client pick the directory
     file_extension = os.path.splitext(filename)[1][1:].lower()
 
     folder_name = file_extension if file_extension else 'others'
-    upload_dir = os.path.join(upload_base_dir, folder_name)
+    upload_dir = os.path.join(UPLOAD_BASE_DIR, folder_name)
 
     os.makedirs(upload_dir, exist_ok=True)
 
-    file_path = os.path.join(upload_dir, filename)
+    return os.path.join(upload_dir, filename)
+
+
+def open_upload_temp_file(filename: str) -> Tuple[BinaryIO, str]:
+    """
+    Opens a temporary file next to where the upload will be stored, so it can be
+    written as it streams in and later moved into place with a cheap rename.
+
+    Args:
+        filename (str): The client-supplied file name.
+
+    Returns:
+        Tuple[BinaryIO, str]: The open temporary file and its path.
+    """
+    upload_dir = os.path.dirname(get_upload_path(filename))
+    fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix=".upload-", suffix=".part")
+    return os.fdopen(fd, "wb"), temp_path
+
 
-    with open(file_path, 'wb') as f:
-        f.write(file_info['data'])
+def save_uploaded_file(file_info: Dict[str, Any]) -> str:
+    """
+    Saves an uploaded file to a subdirectory based on its extension.
+
+    Args:
+        file_info (dict): A dictionary containing 'filename', 'content_type', and either 'data'
+            (the file content) or 'temp_path' (a file already streamed to disk).
+
+    Returns:
+        str: The path of the saved file.
+    """
+    file_path = get_upload_path(file_info['filename'])
+
+    if 'temp_path' in file_info:
+        os.replace(file_info['temp_path'], file_path)
+    else:
+        with open(file_path, 'wb') as f:
+            f.write(file_info['data'])
 
     return file_path
 
 
-def handle_file_uploads(body: Dict[str, Union[str, bytes]]) -> None:
+def handle_file_uploads(body: Dict[str, Union[str, Dict[str, Any]]]) -> None:
     """
     Handles the processing of uploaded files from the request body.
+    Each file ends up under static/uploads/<ext>/ and its entry in the body gets a
+    'path' key in place of the raw 'data' or temporary file.
 
     Args:
         body (dict): The parsed request body containing form data.
-        upload_directory (str): The fixed directory where files should be saved.
     """
     for key, value in body.items():
-        if isinstance(value, dict) and 'data' in value:
+        if isinstance(value, dict) and ('data' in value or 'temp_path' in value):
             saved_file_path = save_uploaded_file(value)
-            del body[key]["data"]
-            print(f"File saved at: {saved_file_path}")
+            value.pop("data", None)
+            value.pop("temp_path", None)
+            value["path"] = saved_file_path
+            logger.info("File saved at: %s", saved_file_path)
+
+
+def discard_file_uploads(body: Dict[str, Union[str, Dict[str, Any]]]) -> None:
+    """Deletes the temporary files of uploads that will not be handled."""
+    for value in body.values():
+        if isinstance(value, dict) and 'temp_path' in value:
+            try:
+                os.remove(value.pop('temp_path'))
+            except OSError:
+                pass
@@ -1,5 +1,14 @@
+import argparse
+from loggings.v1_Logging import configure_logging, get_logger
+from loggings.v1_Metrics import configure_metrics
+from loggings.v1_Profiling import configure_profiling
+from routers.v1_RouteHandler import import_dotted_path
 from routers.v1_Router import V1Router
-from servers.v1_HttpServer import start_http_server, stop_http_server
+from servers.v1_Compression import configure_compression
+from servers.v1_HttpServer import configure_middleware, start_async_http_server, start_http_server, stop_http_server
+from servers.v1_PreforkServer import run_prefork_server
+from servers.v1_ProfilingMiddleware import V1ProfilingMiddleware
+from servers.v1_StaticFiles import STATIC_DIR, configure_static_cache, invalidate_static_file
 import os
 import signal
 import sys
@@ -10,8 +19,14 @@ from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import threading
 
-# Ensure the router_state.pkl path is absolute for consistency
-router_state_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'router_state.pkl')
+logger = get_logger("runserver")
+
+# Ensure the route manifest path is absolute for consistency
+router_state_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'router_manifest.json')
+# Routes registered before the manifest format are in the pickled state, used until a manifest is written
+legacy_router_state_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'router_state.pkl')
+if not os.path.exists(router_state_path) and os.path.exists(legacy_router_state_path):
+    router_state_path = legacy_router_state_path
 
 # Global variables for server management
 server_thread = None
@@ -23,47 +38,148 @@ class ServerReloader(FileSystemEventHandler):
         self.reload_cooldown = 2  # Minimum seconds between reloads
 
     def on_modified(self, event):
-        print(f"[V1_RUNSERVER_DEBUG] on_modified triggered for: {event.src_path}, is_directory: {event.is_directory}")
+        logger.debug("on_modified triggered for: %s, is_directory: %s", event.src_path, event.is_directory)
         if event.is_directory:
             return
-        
+
+        # Changed static files are evicted from the cache, without a reload
+        if is_static_file(event.src_path):
+            invalidate_static_file(event.src_path)
+            return
+
         # Only reload on Python file changes
         if not event.src_path.endswith('.py'):
-            print(f"[V1_RUNSERVER_DEBUG] Skipping non-Python file: {event.src_path}")
+            logger.debug("Skipping non-Python file: %s", event.src_path)
             return
 
         current_time = time.time()
         if current_time - self.last_reload < self.reload_cooldown:
-            print(f"[V1_RUNSERVER_DEBUG] Skipping reload due to cooldown for: {event.src_path}")
+            logger.debug("Skipping reload due to cooldown for: %s", event.src_path)
             return
 
-        print(f"\n[V1_RUNSERVER] Detected change in {event.src_path}")
-        print("[V1_RUNSERVER] Hot reloading server...")
+        logger.info("Detected change in %s. Hot reloading server...", event.src_path)
         self.last_reload = current_time
         restart_server()
 
+    def on_deleted(self, event):
+        if is_static_file(event.src_path):
+            invalidate_static_file(event.src_path)
+
+    def on_moved(self, event):
+        # Editors often save by renaming a temporary file over the original
+        for path in (event.src_path, event.dest_path):
+            if is_static_file(path):
+                invalidate_static_file(path)
+
+def is_static_file(path: str) -> bool:
+    """Whether a watched path lies in the static directory."""
+    return os.path.abspath(path).startswith(os.path.abspath(STATIC_DIR) + os.sep)
+
 MVC_HOST = os.environ.get("MVC_HOST", "127.0.0.1")
 MVC_PORT = int(os.environ.get("PORT", os.environ.get("MVC_PORT", "8080")))
+# Worker-pool mode: MVC_WORKERS=0 keeps the single-threaded accept loop
+MVC_WORKERS = int(os.environ.get("MVC_WORKERS", "0"))
+MVC_BACKLOG = int(os.environ.get("MVC_BACKLOG", "5"))
+MVC_MAX_CONNECTIONS = int(os.environ.get("MVC_MAX_CONNECTIONS", "0")) or None
+# Persistent connections: MVC_KEEP_ALIVE_TIMEOUT=0 answers every request with "Connection: close"
+MVC_KEEP_ALIVE_TIMEOUT = float(os.environ.get("MVC_KEEP_ALIVE_TIMEOUT", "5"))
+MVC_KEEP_ALIVE_MAX_REQUESTS = int(os.environ.get("MVC_KEEP_ALIVE_MAX_REQUESTS", "100"))
+# Seconds a new connection may stay silent before its first request is complete
+MVC_REQUEST_TIMEOUT = float(os.environ.get("MVC_REQUEST_TIMEOUT", "10"))
+# Largest accepted request body in bytes (0 for no limit); larger requests get 413
+MVC_MAX_UPLOAD_SIZE = int(os.environ.get("MVC_MAX_UPLOAD_SIZE", str(100 * 1024 * 1024))) or None
+# Import every route's controller and view at startup instead of on each route's first request
+MVC_PRELOAD = os.environ.get("MVC_PRELOAD", "0").lower() not in ("0", "false", "no", "off")
+# Server engine: "sync" (socket accept loop) or "async" (asyncio streams)
+MVC_ENGINE = os.environ.get("MVC_ENGINE", "sync").lower()
+# In-memory cache of small static files in bytes, precompressed variants included (0 disables it)
+MVC_STATIC_CACHE_SIZE = int(os.environ.get("MVC_STATIC_CACHE_SIZE", str(16 * 1024 * 1024)))
+# Compression of route responses: MVC_COMPRESSION=0 turns it off
+MVC_COMPRESSION = os.environ.get("MVC_COMPRESSION", "1").lower() not in ("0", "false", "no", "off")
+MVC_COMPRESSION_MIN_SIZE = int(os.environ.get("MVC_COMPRESSION_MIN_SIZE", "1024"))
+MVC_COMPRESSION_LEVEL = int(os.environ.get("MVC_COMPRESSION_LEVEL", "6"))
+MVC_COMPRESSION_TYPES = os.environ.get("MVC_COMPRESSION_TYPES")  # Comma-separated content type prefixes
+# Console log level; when unset, DEBUG (every request) with hot reload and INFO with pre-forked workers
+MVC_LOG_LEVEL = os.environ.get("MVC_LOG_LEVEL")
+# Log files: directory, rotation ("size", "time" or "none") and format ("text" or "json" lines)
+MVC_LOG_DIR = os.environ.get("MVC_LOG_DIR", ".")
+MVC_LOG_ROTATION = os.environ.get("MVC_LOG_ROTATION", "size").lower()
+MVC_LOG_MAX_BYTES = int(os.environ.get("MVC_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+MVC_LOG_BACKUP_COUNT = int(os.environ.get("MVC_LOG_BACKUP_COUNT", "5"))
+MVC_LOG_FORMAT = os.environ.get("MVC_LOG_FORMAT", "text").lower()
+# Request metrics, served in the Prometheus text format at /metrics: MVC_METRICS=1 turns them on
+MVC_METRICS = os.environ.get("MVC_METRICS", "0").lower() not in ("0", "false", "no", "off")
+# Request profiling: MVC_PROFILE_DIR turns it on; requests are sampled at MVC_PROFILE_SAMPLE_RATE, or
+# profiled when they carry an "X-V1-Profile" header equal to MVC_PROFILE_TOKEN
+MVC_PROFILE_DIR = os.environ.get("MVC_PROFILE_DIR")
+MVC_PROFILE_SAMPLE_RATE = float(os.environ.get("MVC_PROFILE_SAMPLE_RATE", "0"))
+MVC_PROFILE_CPU = os.environ.get("MVC_PROFILE_CPU", "1").lower() not in ("0", "false", "no", "off")
+MVC_PROFILE_MEMORY = os.environ.get("MVC_PROFILE_MEMORY", "0").lower() not in ("0", "false", "no", "off")
+MVC_PROFILE_TOKEN = os.environ.get("MVC_PROFILE_TOKEN") or None
+# Middleware every request runs through, outermost first: comma-separated "package.module:ClassName"
+# paths of V1Middleware subclasses, each built once with no arguments
+MVC_MIDDLEWARE = [path.strip() for path in os.environ.get("MVC_MIDDLEWARE", "").split(",") if path.strip()]
+
+configure_static_cache(MVC_STATIC_CACHE_SIZE)
+configure_metrics(MVC_METRICS)
+configure_profiling(MVC_PROFILE_DIR, MVC_PROFILE_SAMPLE_RATE, MVC_PROFILE_CPU, MVC_PROFILE_MEMORY, MVC_PROFILE_TOKEN)
+configure_middleware([*([V1ProfilingMiddleware()] if MVC_PROFILE_DIR else []),
+                      *(import_dotted_path(path)() for path in MVC_MIDDLEWARE)])
+configure_compression(MVC_COMPRESSION, MVC_COMPRESSION_MIN_SIZE, MVC_COMPRESSION_LEVEL,
+                      MVC_COMPRESSION_TYPES.split(",") if MVC_COMPRESSION_TYPES else None)
+
+def get_server_options() -> dict:
+    """Server options shared by every engine, from the MVC_* environment variables."""
+    return {
+        "workers": MVC_WORKERS,
+        "backlog": MVC_BACKLOG,
+        "keep_alive_timeout": MVC_KEEP_ALIVE_TIMEOUT,
+        "max_keep_alive_requests": MVC_KEEP_ALIVE_MAX_REQUESTS,
+        "max_upload_size": MVC_MAX_UPLOAD_SIZE,
+        "request_timeout": MVC_REQUEST_TIMEOUT,
+    }
 
 def server_thread_function():
     """Function to run the server in a separate thread."""
     global server_running
     try:
-        print(f"[V1_RUNSERVER] Initializing V1Router with file: {router_state_path}")
+        logger.info("Initializing V1Router with file: %s", router_state_path)
         route_router = V1Router(file_path=router_state_path)
-        print(f"[V1_RUNSERVER] Router instance created. Registered routes: {route_router.routes.keys()}")
-        print(f"[V1_RUNSERVER] Starting HTTP server on {MVC_HOST}:{MVC_PORT}...")
-        start_http_server(route_router, host=MVC_HOST, port=MVC_PORT)
+        if MVC_PRELOAD:
+            route_router.resolve_routes()  # Import every route's controller and view now
+        else:
+            route_router.get_route_table()  # Compile the dispatch table; classes are imported on first request
+        logger.info("Router instance created. Registered routes: %s", list(route_router.routes))
+        logger.info("Starting HTTP server on %s:%s (%s engine)...", MVC_HOST, MVC_PORT, MVC_ENGINE)
+        if MVC_ENGINE == "async":
+            start_async_http_server(route_router, host=MVC_HOST, port=MVC_PORT, **get_server_options())
+        else:
+            start_http_server(route_router, host=MVC_HOST, port=MVC_PORT, max_connections=MVC_MAX_CONNECTIONS,
+                              **get_server_options())
     except Exception as e:
-        print(f"[V1_RUNSERVER] Server thread error: {e}")
+        logger.exception("Server thread error: %s", e)
     finally:
         server_running = False
 
+def run_prefork(processes: int, reuse_port: bool = False):
+    """Run the server as a supervisor with pre-forked worker processes (no hot reload)."""
+    logger.info("Initializing V1Router with file: %s", router_state_path)
+    route_router = V1Router(file_path=router_state_path)
+    # Compiled once in the supervisor and inherited by every worker, with the imported classes if preloading
+    if MVC_PRELOAD:
+        route_router.resolve_routes()
+    else:
+        route_router.get_route_table()
+    if MVC_ENGINE == "async":
+        logger.warning("Pre-fork mode runs the sync engine in every worker; MVC_ENGINE is ignored.")
+    run_prefork_server(route_router, host=MVC_HOST, port=MVC_PORT, processes=processes, reuse_port=reuse_port,
+                       max_connections=MVC_MAX_CONNECTIONS, **get_server_options())
+
 def start_server():
     """Start the server in a separate thread."""
     global server_thread, server_running
     if server_thread and server_thread.is_alive():
-        print("[V1_RUNSERVER] Server is already running")
+        logger.info("Server is already running")
         return
 
     server_running = True
@@ -74,14 +190,14 @@ def start_server():
 def restart_server():
     """Restart the server by stopping the current instance and starting a new one."""
     global server_running
-    print("[V1_RUNSERVER] Restarting server...")
+    logger.info("Restarting server...")
     stop_http_server()
     time.sleep(1)  # Give a small delay to ensure clean shutdown
     start_server()
 
 def signal_handler(signum, frame):
     """Handle termination signals."""
-    print("\n[V1_RUNSERVER] Received termination signal. Shutting down server...")
+    logger.info("Received termination signal. Shutting down server...")
     stop_http_server()
     sys.exit(0)
 
@@ -90,6 +206,20 @@ signal.signal(signal.SIGINT, signal_handler)  # Ctrl+C
 signal.signal(signal.SIGTERM, signal_handler)  # Termination signal
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the V1 MVC Framework HTTP server.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of pre-forked server processes. More than 1 disables hot reload.")
+    parser.add_argument("--reuse-port", action="store_true",
+                        help="Give each worker process its own SO_REUSEPORT socket instead of sharing one.")
+    args = parser.parse_args()
+    configure_logging(MVC_LOG_LEVEL or ("INFO" if args.workers > 1 else "DEBUG"), log_dir=MVC_LOG_DIR,
+                      rotation=MVC_LOG_ROTATION, max_bytes=MVC_LOG_MAX_BYTES, backup_count=MVC_LOG_BACKUP_COUNT,
+                      json_format=MVC_LOG_FORMAT == "json")
+
+    if args.workers > 1:
+        run_prefork(args.workers, reuse_port=args.reuse_port)
+        sys.exit(0)
+
     # Start the server
     start_server()
 
@@ -99,12 +229,11 @@ if __name__ == "__main__":
     
     # Watch the entire project directory
     project_root = os.path.dirname(os.path.dirname(__file__))
-    print(f"[V1_RUNSERVER_DEBUG] Watchdog watching directory: {project_root}")
+    logger.debug("Watchdog watching directory: %s", project_root)
     observer.schedule(event_handler, project_root, recursive=True)
     observer.start()
 
-    print("\n[V1_RUNSERVER] Hot reload enabled. Server will automatically restart when Python files change.")
-    print("  - Ctrl+C: Stop server")
+    logger.info("Hot reload enabled. Server will automatically restart when Python files change. Ctrl+C: Stop server")
     
     try:
         while True:
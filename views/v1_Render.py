@@ -1,6 +1,12 @@
+import csv
+import io
 import json
+from loggings.v1_Logging import get_logger
 import os
 import re
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+logger = get_logger("render")
 
 
 def clean_unmatched_placeholders(template: str) -> str:
@@ -33,7 +39,7 @@ def render_template(template_name: str, data: dict) -> str:
 
     # Check if file exists
     if not os.path.exists(filepath):
-        print("failed in finding file path")
+        logger.error("Template file not found: %s", filepath)
         raise FileNotFoundError(f"Template '{template_name}' not found in 'templates/' directory.")
 
     try:
@@ -49,11 +55,11 @@ def render_template(template_name: str, data: dict) -> str:
         # clean unmatched place holders
         file_string = clean_unmatched_placeholders(file_string)
 
-        print("Template successfully rendered.")
+        logger.debug("Template successfully rendered.")
         return file_string
 
     except Exception as e:
-        print("Failed to find render template.")
+        logger.error("Failed to render template: %s", e)
         raise ValueError(f"Error rendering template: {e}")
 
 def render_json(data: dict) -> str:
@@ -70,3 +76,53 @@ def render_json(data: dict) -> str:
         return json.dumps(data)
     except TypeError as e:
         raise ValueError(f"Error rendering JSON: {e}")
+
+
+def render_json_stream(items: Iterable[Any]) -> Iterator[str]:
+    """
+    Renders an iterable as a JSON array one item at a time, for views that stream large
+    listings instead of building the whole string.
+
+    Args:
+        items (Iterable[Any]): The items of the array, e.g. a generator over model data.
+
+    Yields:
+        str: Pieces of the JSON document.
+
+    Raises:
+        ValueError: If an item cannot be serialized.
+    """
+    yield "["
+    for index, item in enumerate(items):
+        try:
+            yield ("," if index else "") + json.dumps(item)
+        except TypeError as e:
+            raise ValueError(f"Error rendering JSON: {e}")
+    yield "]"
+
+
+def render_csv_stream(rows: Iterable[Sequence[Any]], header: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """
+    Renders rows as CSV one line at a time.
+
+    Args:
+        rows (Iterable[Sequence[Any]]): The rows, e.g. a generator over model data.
+        header (Optional[Sequence[str]]): Column names written as the first line.
+
+    Yields:
+        str: One CSV line per row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def render_row(row: Sequence[Any]) -> str:
+        writer.writerow(row)
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    if header:
+        yield render_row(header)
+    for row in rows:
+        yield render_row(row)
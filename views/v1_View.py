@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from views.v1_Render import render_json, render_template
+from typing import Any, Iterable, Iterator, Optional, Sequence, Union
+from views.v1_Render import render_csv_stream, render_json, render_json_stream, render_template
 
 
 class V1BaseView(ABC):
@@ -9,6 +10,7 @@ class V1BaseView(ABC):
         "JSON": "application/json",
         "PLAIN": "text/plain",
         "XML": "application/xml",
+        "CSV": "text/csv",
         "PDF": "application/pdf",
         # Add more as needed
     }
@@ -20,8 +22,13 @@ class V1BaseView(ABC):
         pass # Subclasses must implement this, but no specific content_type assignment here.
 
     @abstractmethod
-    def render(self, **kwargs) -> str:
-        """Abstract method to render the data returned by the controller."""
+    def render(self, **kwargs) -> Union[str, Iterable[str]]:
+        """
+        Abstract method to render the data returned by the controller.
+
+        Returning an iterator or generator (async generators too, on the asyncio engine) instead
+        of a str streams the response with Transfer-Encoding: chunked as it is produced.
+        """
         pass
 
     @staticmethod
@@ -33,3 +40,13 @@ class V1BaseView(ABC):
     def render_json(data: dict) -> str:
         """Utility function to render data as JSON."""
         return render_json(data)
+
+    @staticmethod
+    def render_json_stream(items: Iterable[Any]) -> Iterator[str]:
+        """Utility function to stream items as a JSON array."""
+        return render_json_stream(items)
+
+    @staticmethod
+    def render_csv_stream(rows: Iterable[Sequence[Any]], header: Optional[Sequence[str]] = None) -> Iterator[str]:
+        """Utility function to stream rows as CSV."""
+        return render_csv_stream(rows, header)